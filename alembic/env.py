@@ -32,6 +32,22 @@ if config.config_file_name is not None:
 # target_metadata = mymodel.Base.metadata
 target_metadata= Base.metadata
 
+# The reflection of the indexes loses the collation of the expressions, so these indexes are only
+# compared by name
+NAME_COMPARED_INDEXES = {"ix_profiles_first_name_prefix", "ix_profiles_last_name_prefix"}
+# Indexes created only when the server ships their extension
+OPTIONAL_INDEX_SUFFIX = "_trgm"
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Skip the indexes that the autogenerate can't compare with the models"""
+    if type_ != "index":
+        return True
+    if name in NAME_COMPARED_INDEXES:
+        return compare_to is None
+    return not (reflected and name.endswith(OPTIONAL_INDEX_SUFFIX))
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -56,6 +72,7 @@ def run_migrations_offline() -> None:
         target_metadata = target_metadata,
         literal_binds = True,
         dialect_opts = {"paramstyle": "named"},
+        include_object = include_object,
     )
 
     with context.begin_transaction():
@@ -77,7 +94,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,44 @@
+"""Add profile name search indexes
+
+Revision ID: b7e3f1a9c2d4
+Revises: 6102d8fec8f8
+Create Date: 2026-10-18 10:12:41.512337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f1a9c2d4'
+down_revision: Union[str, None] = '6102d8fec8f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Full-text document of the profile names, it must match the search expression of the profile controller
+NAME_SEARCH_VECTOR = "to_tsvector('simple', coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"
+
+
+def upgrade() -> None:
+    # Trigram indexes serve the substring search when the pg_trgm extension is shipped with the server
+    bind = op.get_bind()
+    trigram_available = bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first() is not None
+    if trigram_available:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.create_index('ix_profiles_first_name_trgm', 'profiles', ['first_name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'first_name': 'gin_trgm_ops'})
+        op.create_index('ix_profiles_last_name_trgm', 'profiles', ['last_name'], unique=False,
+                        postgresql_using='gin', postgresql_ops={'last_name': 'gin_trgm_ops'})
+
+    # Full-text index of the names, used for word prefix search without the extension
+    op.create_index('ix_profiles_name_search', 'profiles', [sa.text(NAME_SEARCH_VECTOR)], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profiles_name_search', table_name='profiles')
+    op.execute("DROP INDEX IF EXISTS ix_profiles_last_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_profiles_first_name_trgm")
@@ -0,0 +1,31 @@
+"""Add profile name prefix indexes
+
+Revision ID: c4d8e2f6a1b3
+Revises: b7e3f1a9c2d4
+Create Date: 2026-10-18 14:41:08.204519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d8e2f6a1b3'
+down_revision: Union[str, None] = 'b7e3f1a9c2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Byte-wise ordered lowercase names, so the prefix matches are index range scans already sorted
+    op.create_index('ix_profiles_first_name_prefix', 'profiles',
+                    [sa.text('lower(first_name) COLLATE "C"'), 'id'], unique=False)
+    op.create_index('ix_profiles_last_name_prefix', 'profiles',
+                    [sa.text('lower(last_name) COLLATE "C"'), 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profiles_last_name_prefix', table_name='profiles')
+    op.drop_index('ix_profiles_first_name_prefix', table_name='profiles')
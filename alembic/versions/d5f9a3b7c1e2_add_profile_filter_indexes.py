@@ -0,0 +1,35 @@
+"""Add profile filter indexes
+
+Revision ID: d5f9a3b7c1e2
+Revises: c4d8e2f6a1b3
+Create Date: 2026-10-18 16:12:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f9a3b7c1e2'
+down_revision: Union[str, None] = 'c4d8e2f6a1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Location filters with the default sort, so the filtered pages are read in order without sorting
+    op.create_index('ix_profiles_state_created_at', 'profiles', ['state', 'created_at', 'id'], unique=False)
+    op.create_index('ix_profiles_city_created_at', 'profiles', ['city', 'created_at', 'id'], unique=False)
+    op.create_index('ix_profiles_zipcode_created_at', 'profiles', ['zipcode', 'created_at', 'id'], unique=False)
+    # Only the available profiles are usually listed, the partial index skips the rest
+    op.create_index('ix_profiles_available_created_at', 'profiles', ['created_at', 'id'], unique=False,
+                    postgresql_where=sa.text('available'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profiles_available_created_at', table_name='profiles')
+    op.drop_index('ix_profiles_zipcode_created_at', table_name='profiles')
+    op.drop_index('ix_profiles_city_created_at', table_name='profiles')
+    op.drop_index('ix_profiles_state_created_at', table_name='profiles')
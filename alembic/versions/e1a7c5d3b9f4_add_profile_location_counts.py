@@ -0,0 +1,38 @@
+"""Add profile location counts
+
+Revision ID: e1a7c5d3b9f4
+Revises: d5f9a3b7c1e2
+Create Date: 2026-10-18 17:05:52.731946
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1a7c5d3b9f4'
+down_revision: Union[str, None] = 'd5f9a3b7c1e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('profile_location_counts',
+                    sa.Column('state', sa.String(), nullable=True),
+                    sa.Column('city', sa.String(), nullable=True),
+                    sa.Column('zipcode', sa.String(), nullable=True),
+                    sa.Column('profiles', sa.Integer(), server_default='0', nullable=False)
+                    )
+    # Profiles without location share the same row, so the NULL values are not distinct
+    op.create_index('ix_profile_location_counts_location', 'profile_location_counts',
+                    ['state', 'city', 'zipcode'], unique=True, postgresql_nulls_not_distinct=True)
+    # Count the existing profiles, the profile writes keep the counts up to date from now on
+    op.execute("INSERT INTO profile_location_counts (state, city, zipcode, profiles) "
+               "SELECT state, city, zipcode, count(*) FROM profiles GROUP BY state, city, zipcode")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_profile_location_counts_location', table_name='profile_location_counts')
+    op.drop_table('profile_location_counts')
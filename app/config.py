@@ -0,0 +1,48 @@
+"""
+Service configuration loaded from environment variables
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Keep the friendship graph in memory to answer the connection queries without SQL
+GRAPH_INDEX_ENABLED = os.getenv("GRAPH_INDEX_ENABLED", "true").lower() == "true"
+# Merge the pending index changes once they reach this ratio of the indexed friendships
+GRAPH_INDEX_COMPACT_RATIO = float(os.getenv("GRAPH_INDEX_COMPACT_RATIO", "0.05"))
+GRAPH_INDEX_COMPACT_MIN = int(os.getenv("GRAPH_INDEX_COMPACT_MIN", "1024"))
+# Keep the connected components in memory to answer unreachable pairs without searching
+COMPONENT_INDEX_ENABLED = os.getenv("COMPONENT_INDEX_ENABLED", "true").lower() == "true"
+# File with the landmark distance table built by scripts/build_landmarks.py, loaded on startup
+LANDMARKS_PATH = os.getenv("LANDMARKS_PATH", "data/landmarks.bin")
+
+# Default strategy used to search the connection between two profiles (auto, index, bfs, sql or landmark)
+CONNECTION_SEARCH_MODE = os.getenv("CONNECTION_SEARCH_MODE", "auto").lower()
+# Limits of the connection search: hops, visited profiles and wall-clock time
+CONNECTION_MAX_DEPTH = int(os.getenv("CONNECTION_MAX_DEPTH", "6"))
+CONNECTION_MAX_VISITED = int(os.getenv("CONNECTION_MAX_VISITED", "100000"))
+CONNECTION_TIMEOUT_MS = int(os.getenv("CONNECTION_TIMEOUT_MS", "2000"))
+# Maximum number of pairs accepted by the bulk friendship create and delete
+FRIENDSHIP_BULK_MAX_PAIRS = int(os.getenv("FRIENDSHIP_BULK_MAX_PAIRS", "10000"))
+# Maximum number of pairs accepted by the batch connection search
+CONNECTION_BATCH_MAX_PAIRS = int(os.getenv("CONNECTION_BATCH_MAX_PAIRS", "1000"))
+# Cache of the connection results: maximum number of pairs (0 disables it) and time to live in seconds
+CONNECTION_CACHE_SIZE = int(os.getenv("CONNECTION_CACHE_SIZE", "10000"))
+CONNECTION_CACHE_TTL = float(os.getenv("CONNECTION_CACHE_TTL", "300"))
+# Maximum number of profiles accepted by the batch mutual friends count
+MUTUAL_BATCH_MAX_PROFILES = int(os.getenv("MUTUAL_BATCH_MAX_PROFILES", "200"))
+# Friend-of-friend recommendations kept per profile and seconds between rebuilds (0 only builds on startup)
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+RECOMMENDATIONS_REFRESH_SECONDS = float(os.getenv("RECOMMENDATIONS_REFRESH_SECONDS", "3600"))
+# Profiles written by each insert statement of the bulk profile ingest
+PROFILE_BULK_BATCH_SIZE = int(os.getenv("PROFILE_BULK_BATCH_SIZE", "1000"))
+# Cache of the profiles read by id: memory bound in bytes (0 disables it) and time to live in seconds
+PROFILE_CACHE_MAX_BYTES = int(os.getenv("PROFILE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "60"))
+# Profile name search: trigram substring search, full-text word prefix search or auto to use trigrams when installed
+PROFILE_SEARCH_MODE = os.getenv("PROFILE_SEARCH_MODE", "auto").lower()
+# SQL statements slower than these milliseconds are logged with the route that ran them
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+# Requests running the same statement more than these times are logged as possible N+1 queries
+SQL_REPEATED_STATEMENT_MAX = int(os.getenv("SQL_REPEATED_STATEMENT_MAX", "10"))
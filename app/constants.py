@@ -5,3 +5,16 @@ PROFILE_NOT_FOUND = "profile-not-found"
 FRIEND_NOT_FOUND = "friend-profile-not-found"
 FRIENDSHIP_NOT_FOUND = "friendship-not-found"
 FRIENDSHIP_SAME_PROFILE = "profiles-should-be-different"
+LANDMARKS_NOT_LOADED = "landmarks-not-loaded"
+RECOMMENDATIONS_NOT_READY = "recommendations-not-ready"
+INVALID_BULK_BODY = "invalid-bulk-body"
+INVALID_CURSOR = "invalid-cursor"
+
+# Headers of the read-your-writes guarantee with a read replica
+WRITE_LSN_HEADER = "X-Write-LSN"
+MIN_LSN_HEADER = "X-Min-LSN"
+
+# Headers with the SQL statements run by a request, only in development
+DB_QUERIES_HEADER = "X-DB-Queries"
+DB_TIME_HEADER = "X-DB-Time-Ms"
+DB_REPEATED_HEADER = "X-DB-Repeated-Statements"
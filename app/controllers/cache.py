@@ -0,0 +1,135 @@
+"""
+In-process caches.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class LRUCache:  # pylint: disable=too-many-instance-attributes
+    """
+    Least Recently Used cache bounded by number of entries, by memory or by both, with a time
+    to live per entry. `max_entries=None` removes the bound on the number of entries, and
+    `max_bytes` bounds the sum of the sizes given by `size_of`.
+
+    `is_valid` can reject stored values on read, and `on_evict` is called for every entry that
+    leaves the cache (evicted, expired, invalidated or deleted).
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_entries: int | None,
+        ttl: float,
+        is_valid: Callable[[Any], bool] | None = None,
+        on_evict: Callable[[Hashable, Any], None] | None = None,
+        max_bytes: int | None = None,
+        size_of: Callable[[Any], int] | None = None
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._is_valid = is_valid
+        self._on_evict = on_evict
+        self._size_of = size_of
+        self._entries: OrderedDict[Hashable, tuple[float, Any, int]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _drop(self, key: Hashable):
+        """
+        Remove an entry notifying the eviction callback
+        """
+        (_, value, size) = self._entries.pop(key)
+        self.bytes -= size
+        if self._on_evict is not None:
+            self._on_evict(key, value)
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Get a value marking it as the most recently used, or None when it is missing,
+        expired or no longer valid
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        (expires_at, value, _) = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        if self._is_valid is not None and not self._is_valid(value):
+            self._drop(key)
+            self.invalidations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def _is_full(self) -> bool:
+        """
+        Check if the cache is over one of its bounds
+        """
+        return ((self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self.bytes > self.max_bytes))
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Store a value evicting the least recently used entries when the cache is full. A value
+        bigger than the whole memory bound is not stored.
+        """
+        size = self._size_of(value) if self._size_of is not None else 0
+        if ((self.max_entries is not None and self.max_entries <= 0)
+                or (self.max_bytes is not None and size > self.max_bytes)):
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self.bytes += size
+        while self._is_full():
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """
+        Remove a value from the cache
+        """
+        if key not in self._entries:
+            return False
+        self._drop(key)
+        self.invalidations += 1
+        return True
+
+    def clear(self):
+        """
+        Remove all the values from the cache
+        """
+        for key in list(self._entries):
+            self._drop(key)
+
+    def stats(self) -> dict:
+        """
+        Get the cache usage counters
+        """
+        requests = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,119 @@
+"""
+Cache of the connections between profiles.
+"""
+from app.config import CONNECTION_CACHE_SIZE, CONNECTION_CACHE_TTL
+from app.controllers.cache import LRUCache
+from app.controllers.graph_search import SearchResult
+
+
+class ConnectionCache:
+    """
+    Cache of complete connection results keyed by the ordered pair of profiles, as the path of a
+    direction is not the reverse of the other one when there are ties between shorter paths.
+
+    A new friendship can shorten any connection, so it bumps a graph version that invalidates
+    every entry stored before it. A deleted friendship only breaks the connections passing
+    through it, so those entries are found with an index from relationship to entries and
+    dropped at once; the unreachable pairs stay unreachable.
+
+    A search awaiting the database records the snapshot of the graph when it starts, and its
+    result is dropped if a friendship was created or deleted meanwhile, as the relationship
+    index can't drop an entry stored after the deletion it depends on.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.version = 0
+        self.deletions = 0
+        self._keys_by_edge: dict[tuple[int, int], set[tuple[int, int]]] = {}
+        self._cache = LRUCache(max_entries, ttl, is_valid=self._is_current, on_evict=self._unlink)
+
+    @staticmethod
+    def _edge_key(profile_id: int, friend_id: int) -> tuple[int, int]:
+        """
+        Get the unordered key of a relationship
+        """
+        return (min(profile_id, friend_id), max(profile_id, friend_id))
+
+    @staticmethod
+    def _edges(path: list[int]):
+        """
+        Iterate the relationships of a path as unordered keys
+        """
+        for (profile_id, friend_id) in zip(path, path[1:]):
+            yield ConnectionCache._edge_key(profile_id, friend_id)
+
+    def _is_current(self, entry: tuple[int, list[int]]) -> bool:
+        """
+        Check that an entry was stored after the last friendship creation
+        """
+        return entry[0] == self.version
+
+    def _unlink(self, key: tuple[int, int], entry: tuple[int, list[int]]):
+        """
+        Remove an entry from the relationship index
+        """
+        for edge in self._edges(entry[1]):
+            keys = self._keys_by_edge.get(edge)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_edge[edge]
+
+    def get(self, profile_id: int, friend_id: int, max_depth: int | None = None) -> SearchResult | None:
+        """
+        Get the cached connection between two profiles if it is within the maximum depth
+        """
+        entry = self._cache.get((profile_id, friend_id))
+        if entry is None:
+            return None
+        path = entry[1]
+        if max_depth is not None and len(path) - 1 > max_depth:
+            return None
+        return SearchResult(path=list(path))
+
+    def snapshot(self) -> tuple[int, int]:
+        """
+        Get the number of friendship creations and deletions seen by the cache
+        """
+        return (self.version, self.deletions)
+
+    def put(self, profile_id: int, friend_id: int, result: SearchResult, snapshot: tuple[int, int] | None = None):
+        """
+        Store a connection result, only the complete ones searched over the current graph are
+        cached
+        """
+        if not result.complete or (snapshot is not None and snapshot != self.snapshot()):
+            return
+        key = (profile_id, friend_id)
+        self._cache.set(key, (self.version, result.path))
+        for edge in self._edges(result.path):
+            self._keys_by_edge.setdefault(edge, set()).add(key)
+
+    def on_created(self):
+        """
+        Invalidate all the entries after a new friendship
+        """
+        self.version += 1
+
+    def on_deleted(self, profile_id: int, friend_id: int):
+        """
+        Invalidate the connections passing through a deleted friendship
+        """
+        self.deletions += 1
+        for key in list(self._keys_by_edge.get(self._edge_key(profile_id, friend_id), ())):
+            self._cache.delete(key)
+
+    def clear(self):
+        """
+        Remove all the entries
+        """
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache usage counters and the graph version
+        """
+        return {**self._cache.stats(), "version": self.version}
+
+
+connection_cache = ConnectionCache(CONNECTION_CACHE_SIZE, CONNECTION_CACHE_TTL)
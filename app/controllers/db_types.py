@@ -22,3 +22,59 @@ class ProfileOrderFieldEnum(str, Enum):
     ZIPCODE = "zipcode"
     CREATED_AT = "created_at"
     UPDATED_AT = "updated_at"
+
+
+class ProfileSearchModeEnum(str, Enum):
+    """
+    Profile name search allowed values
+    """
+    AUTO = "auto"
+    TRIGRAM = "trigram"
+    FULLTEXT = "fulltext"
+
+
+class PaginationEnum(str, Enum):
+    """
+    Pagination allowed values
+    """
+    OFFSET = "offset"
+    CURSOR = "cursor"
+
+
+class TotalModeEnum(str, Enum):
+    """
+    Total count allowed values of the paginated results
+    """
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class ConnectionSearchModeEnum(str, Enum):
+    """
+    Connection search mode allowed values
+    """
+    AUTO = "auto"
+    INDEX = "index"
+    BFS = "bfs"
+    SQL = "sql"
+    LANDMARK = "landmark"
+
+
+class ConnectionLimitEnum(str, Enum):
+    """
+    Limits that can stop a connection search
+    """
+    MAX_DEPTH = "max-depth"
+    MAX_VISITED = "max-visited"
+    DEADLINE = "deadline"
+
+
+class BulkStatusEnum(str, Enum):
+    """
+    Outcome of each record of a bulk operation
+    """
+    CREATED = "created"
+    EXISTING = "existing"
+    DELETED = "deleted"
+    FAILED = "failed"
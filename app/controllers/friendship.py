@@ -1,19 +1,87 @@
 """
 Logic for managing friendship relationships between profiles.
 """
-from collections import deque
-from sqlalchemy import select, delete
+import time
+from typing import Callable, Iterable, Iterator
+from sqlalchemy import select, delete, union_all, text, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.config import (CONNECTION_SEARCH_MODE, CONNECTION_MAX_DEPTH,
+                        CONNECTION_MAX_VISITED, CONNECTION_TIMEOUT_MS)
+from app.constants import PROFILE_NOT_FOUND, FRIEND_NOT_FOUND, FRIENDSHIP_NOT_FOUND, FRIENDSHIP_SAME_PROFILE
+from app.controllers.connection_cache import connection_cache
+from app.controllers.db_types import BulkStatusEnum, ConnectionSearchModeEnum, ConnectionLimitEnum
+from app.controllers.graph_components import component_index
+from app.controllers.graph_index import graph_index
+from app.controllers.graph_landmarks import landmark_index
+from app.controllers.graph_search import GraphSearch, NeighborsFn, SearchLimits, SearchResult
+from app.controllers.metrics import FRIENDSHIPS_CREATED, FRIENDSHIPS_DELETED, observe_connection_search
+from app.db.config import SessionLocal
 from app.db.models import Profile, friendship
+from app.models.friendship import FriendshipBulkResponse, FriendshipBulkResult
 
+# Level-synchronous BFS over both directions of the friendship table. The search is rooted at the target
+# with the lowest parent of each profile, so walking the parents from the source picks the lowest next
+# profile at every step and gives the lexicographically smallest shortest path, as the Python searches do
+CONNECTION_QUERY = text("""
+WITH RECURSIVE search(depth, frontier, parents, visited) AS (
+    SELECT 0, ARRAY[CAST(:target AS INTEGER)], ARRAY[CAST(NULL AS INTEGER)], ARRAY[CAST(:target AS INTEGER)]
+    UNION ALL
+    SELECT s.depth + 1, level.frontier, level.parents, s.visited || level.frontier
+    FROM search s
+    CROSS JOIN LATERAL (
+        SELECT array_agg(edge.friend_id ORDER BY edge.friend_id) AS frontier,
+               array_agg(edge.profile_id ORDER BY edge.friend_id) AS parents
+        FROM (
+            SELECT DISTINCT ON (e.friend_id) e.friend_id, e.profile_id
+            FROM (
+                SELECT f.profile_id, f.friend_id FROM friendship f WHERE f.profile_id = ANY(s.frontier)
+                UNION ALL
+                SELECT f.friend_id, f.profile_id FROM friendship f WHERE f.friend_id = ANY(s.frontier)
+            ) e
+            WHERE NOT EXISTS (SELECT 1 FROM unnest(s.visited) v(id) WHERE v.id = e.friend_id)
+            ORDER BY e.friend_id, e.profile_id
+        ) edge
+    ) level
+    WHERE s.depth < :max_depth
+        AND (CAST(:max_visited AS INTEGER) IS NULL OR cardinality(s.visited) < :max_visited)
+        AND NOT CAST(:source AS INTEGER) = ANY(s.frontier)
+        AND level.frontier IS NOT NULL
+), walk(depth, profile_id) AS (
+    SELECT depth, CAST(:source AS INTEGER) FROM search WHERE CAST(:source AS INTEGER) = ANY(frontier)
+    UNION ALL
+    SELECT w.depth - 1, s.parents[array_position(s.frontier, w.profile_id)]
+    FROM walk w
+    JOIN search s ON s.depth = w.depth
+    WHERE w.depth > 0
+)
+SELECT (SELECT array_agg(profile_id ORDER BY depth DESC) FROM walk), depth, cardinality(visited)
+FROM search
+ORDER BY depth DESC
+LIMIT 1
+""")
 
-class Friendship:
+# Set the statement timeout of the current transaction returning the previous one
+STATEMENT_TIMEOUT_QUERY = text("""
+SELECT current_setting('statement_timeout'), set_config('statement_timeout', :timeout, true)
+""")
+QUERY_CANCELED = "57014"
+# Foreign keys of the friendship table that report the missing profiles
+PROFILE_FOREIGN_KEY = "friendship_profile_id_fkey"
+FRIEND_FOREIGN_KEY = "friendship_friend_id_fkey"
+# Rows written by each statement of the bulk operations
+BULK_CHUNK_SIZE = 5000
+
+
+class Friendship:  # pylint: disable=too-many-public-methods
     """
     Logic for managing friendship relationships between profiles.
     """
 
     @staticmethod
-    def exists(db: Session, profile_id: int, friend_id: int):
+    async def exists(db: AsyncSession, profile_id: int, friend_id: int):
         """
         Check if a friendship relationship exists
         """
@@ -21,38 +89,47 @@ class Friendship:
             friendship.c.profile_id == profile_id,
             friendship.c.friend_id == friend_id
         )
-        relationship = db.execute(stmt).first()
+        relationship = (await db.execute(stmt)).first()
         return relationship is not None
 
     @staticmethod
-    async def create(db: Session, profile_id: int, friend_id: int):
+    async def create(db: AsyncSession, profile_id: int, friend_id: int):
         """
-        Create a new friendship relationship
+        Create a new friendship relationship with a single statement. Existing relationships
+        are left untouched and missing profiles are reported by the foreign keys.
         """
-        # Check that both profiles exist
-        profile = db.query(Profile).filter(Profile.id == profile_id).first()
-        if not profile:
-            return (None, friend_id)
-        friend = db.query(Profile).filter(Profile.id == friend_id).first()
-        if not friend:
-            return (profile_id, None)
-
-        # Check that the friendship relationship doesn't already exist
-        if Friendship.exists(db, profile_id, friend_id):
-            return (profile_id, friend_id)
+        stmt = (
+            pg_insert(friendship)
+            .values(profile_id=profile_id, friend_id=friend_id)
+            .on_conflict_do_nothing()
+            .returning(friendship.c.profile_id)
+        )
+        try:
+            inserted = (await db.execute(stmt)).first() is not None
+            await db.commit()
+        except IntegrityError as e:
+            await db.rollback()
+            # The asyncpg error raised by the driver tells the violated constraint
+            constraint = getattr(e.orig.__cause__, "constraint_name", None)
+            if constraint == PROFILE_FOREIGN_KEY:
+                return (None, friend_id)
+            if constraint == FRIEND_FOREIGN_KEY:
+                # The friend key is checked first, keep reporting the missing profile before it
+                if await db.get(Profile, profile_id) is None:
+                    return (None, friend_id)
+                return (profile_id, None)
+            raise
 
-        # Create the friendship relationship
-        profile.friends.append(friend)
-        db.add(profile)
-        db.commit()
+        if inserted:
+            Friendship.on_created(profile_id, friend_id)
         return (profile_id, friend_id)
 
     @staticmethod
-    async def delete(db: Session, profile_id: int, friend_id: int):
+    async def delete(db: AsyncSession, profile_id: int, friend_id: int):
         """
         Delete a friendship relationship
         """
-        if not Friendship.exists(db, profile_id, friend_id):
+        if not await Friendship.exists(db, profile_id, friend_id):
             return False
 
         # Delete the friendship relationship
@@ -60,15 +137,184 @@ class Friendship:
             friendship.c.profile_id == profile_id,
             friendship.c.friend_id == friend_id
         )
-        db.execute(stmt)
-        db.commit()
+        await db.execute(stmt)
+        await db.commit()
+
+        # The relationship could be also stored in the opposite direction
+        inverse_exists = await Friendship.exists(db, profile_id=friend_id, friend_id=profile_id)
+        if not inverse_exists:
+            Friendship.on_deleted(profile_id, friend_id)
         return True
 
     @staticmethod
-    def get_all_friends(db: Session, profile_id: int) -> list[int]:
+    def bulk_response(pairs: list[tuple[int, int]], outcomes: dict) -> FriendshipBulkResponse:
+        """
+        Build the bulk response with the (status, detail) outcome of each pair in order
+        """
+        results = [FriendshipBulkResult(profile_id=profile_id, friend_id=friend_id,
+                                        status=outcomes[(profile_id, friend_id)][0],
+                                        detail=outcomes[(profile_id, friend_id)][1])
+                   for (profile_id, friend_id) in pairs]
+        failed = sum(1 for result in results if result.status == BulkStatusEnum.FAILED)
+        return FriendshipBulkResponse(succeeded=len(results) - failed, failed=failed, results=results)
+
+    @staticmethod
+    async def bulk_create(db: AsyncSession, pairs: list[tuple[int, int]]) -> FriendshipBulkResponse:
+        """
+        Create many friendship relationships in a single transaction.
+
+        The profiles of all the pairs are validated with one query and the valid pairs are
+        written with multi-row inserts that skip the existing relationships.
+        """
+        outcomes: dict[tuple[int, int], tuple[BulkStatusEnum, str | None]] = {}
+        profile_ids = {profile_id for pair in pairs for profile_id in pair}
+        existing_ids = set(await db.scalars(select(Profile.id).where(Profile.id.in_(profile_ids))))
+        for (profile_id, friend_id) in pairs:
+            if profile_id == friend_id:
+                outcomes[(profile_id, friend_id)] = (BulkStatusEnum.FAILED, FRIENDSHIP_SAME_PROFILE)
+            elif profile_id not in existing_ids:
+                outcomes[(profile_id, friend_id)] = (BulkStatusEnum.FAILED, PROFILE_NOT_FOUND)
+            elif friend_id not in existing_ids:
+                outcomes[(profile_id, friend_id)] = (BulkStatusEnum.FAILED, FRIEND_NOT_FOUND)
+            else:
+                outcomes[(profile_id, friend_id)] = (BulkStatusEnum.EXISTING, None)
+
+        # Insert the valid pairs, the returned rows are the new relationships
+        valid = [pair for (pair, (status, _)) in outcomes.items() if status == BulkStatusEnum.EXISTING]
+        created = []
+        for start in range(0, len(valid), BULK_CHUNK_SIZE):
+            stmt = (
+                pg_insert(friendship)
+                .values([{"profile_id": profile_id, "friend_id": friend_id}
+                         for (profile_id, friend_id) in valid[start:start + BULK_CHUNK_SIZE]])
+                .on_conflict_do_nothing()
+                .returning(friendship.c.profile_id, friendship.c.friend_id)
+            )
+            created.extend((await db.execute(stmt)).tuples())
+        await db.commit()
+
+        for (profile_id, friend_id) in created:
+            outcomes[(profile_id, friend_id)] = (BulkStatusEnum.CREATED, None)
+            Friendship.on_created(profile_id, friend_id)
+        return Friendship.bulk_response(pairs, outcomes)
+
+    @staticmethod
+    async def bulk_delete(db: AsyncSession, pairs: list[tuple[int, int]]) -> FriendshipBulkResponse:
+        """
+        Delete many friendship relationships in a single transaction
+        """
+        outcomes = {pair: (BulkStatusEnum.FAILED, FRIENDSHIP_NOT_FOUND) for pair in pairs}
+        keys = list(outcomes)
+        deleted = []
+        for start in range(0, len(keys), BULK_CHUNK_SIZE):
+            stmt = (
+                delete(friendship)
+                .where(tuple_(friendship.c.profile_id, friendship.c.friend_id).in_(keys[start:start + BULK_CHUNK_SIZE]))
+                .returning(friendship.c.profile_id, friendship.c.friend_id)
+            )
+            deleted.extend((await db.execute(stmt)).tuples())
+
+        # The relationships could be also stored in the opposite direction
+        inverse = list({(friend_id, profile_id) for (profile_id, friend_id) in deleted})
+        remaining = set()
+        for start in range(0, len(inverse), BULK_CHUNK_SIZE):
+            stmt = select(friendship.c.profile_id, friendship.c.friend_id).where(
+                tuple_(friendship.c.profile_id, friendship.c.friend_id).in_(inverse[start:start + BULK_CHUNK_SIZE]))
+            remaining.update((await db.execute(stmt)).tuples())
+        await db.commit()
+
+        removed = set()
+        for (profile_id, friend_id) in deleted:
+            outcomes[(profile_id, friend_id)] = (BulkStatusEnum.DELETED, None)
+            edge = (min(profile_id, friend_id), max(profile_id, friend_id))
+            if (friend_id, profile_id) not in remaining and edge not in removed:
+                removed.add(edge)
+                Friendship.on_deleted(profile_id, friend_id)
+        return Friendship.bulk_response(pairs, outcomes)
+
+    @staticmethod
+    def on_created(profile_id: int, friend_id: int):
+        """
+        Update the in-memory graph structures after a new friendship relationship
+        """
+        graph_index.add_edge(profile_id, friend_id)
+        component_index.add_edge(profile_id, friend_id)
+        landmark_index.on_created()
+        connection_cache.on_created()
+        FRIENDSHIPS_CREATED.inc()
+
+    @staticmethod
+    def on_deleted(profile_id: int, friend_id: int):
+        """
+        Update the in-memory graph structures after two profiles are no longer friends
+        """
+        graph_index.remove_edge(profile_id, friend_id)
+        component_index.remove_edge(profile_id, friend_id)
+        landmark_index.on_deleted()
+        connection_cache.on_deleted(profile_id, friend_id)
+        FRIENDSHIPS_DELETED.inc()
+
+    @staticmethod
+    def get_all_edges(db: Session) -> Iterator[tuple[int, int]]:
+        """
+        Stream all the friendship relationships as (profile_id, friend_id) rows
+        """
+        stmt = select(friendship.c.profile_id, friendship.c.friend_id)
+        for (profile_id, friend_id) in db.execute(stmt.execution_options(yield_per=10000)):
+            yield (profile_id, friend_id)
+
+    @staticmethod
+    async def load_graph_index(db: AsyncSession):
+        """
+        Load the in-memory graph index streaming the friendship table
+        """
+        await db.run_sync(lambda session: graph_index.load(Friendship.get_all_edges(session)))
+
+    @staticmethod
+    async def load_component_index(db: AsyncSession):
+        """
+        Build the connected components from the graph index, or from the friendship table
+        when the index is not loaded
+        """
+        if graph_index.is_ready:
+            component_index.load(graph_index.edges())
+        else:
+            await db.run_sync(lambda session: component_index.load(Friendship.get_all_edges(session)))
+
+    @staticmethod
+    def read_all_edges() -> Iterator[tuple[int, int]]:
+        """
+        Stream all the friendship relationships with a synchronous session of its own, for the
+        jobs running in a worker thread
+        """
+        db = SessionLocal()
+        try:
+            yield from Friendship.get_all_edges(db)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def get_component(db: AsyncSession, profile_id: int) -> tuple[int, int]:
+        """
+        Get the (component id, component size) of a profile. When relationships were deleted
+        since the last build the components are rebuilt in the background, and the profiles of a
+        split component are reported together until the rebuild finishes.
+        """
+        if not component_index.is_ready:
+            await Friendship.load_component_index(db)
+        elif component_index.is_dirty:
+            component_index.rebuild_in_background(
+                graph_index.snapshot_edges if graph_index.is_ready else Friendship.read_all_edges)
+        return component_index.get_component(profile_id)
+
+    @staticmethod
+    async def get_all_friends(db: AsyncSession, profile_id: int) -> list[int]:
         """
         Get all friends of a profile by id
         """
+        if graph_index.is_ready:
+            return graph_index.get_friends(profile_id)
+
         friend_ids_stmt = (
             select(friendship.c.friend_id)
             .where(friendship.c.profile_id == profile_id)
@@ -77,26 +323,264 @@ class Friendship:
                 .where(friendship.c.friend_id == profile_id)
             )
         )
-        return db.scalars(friend_ids_stmt).all()
+        return (await db.scalars(friend_ids_stmt)).all()
+
+    @staticmethod
+    async def get_frontier_friends(db: AsyncSession, profile_ids: Iterable[int]) -> dict[int, list[int]]:
+        """
+        Get the friends of a whole set of profiles with a single query
+        """
+        if graph_index.is_ready:
+            return graph_index.get_frontier_friends(profile_ids)
+        return await db.run_sync(Friendship.query_frontier_friends, profile_ids)
+
+    @staticmethod
+    def query_frontier_friends(db: Session, profile_ids: Iterable[int]) -> dict[int, list[int]]:
+        """
+        Query the database for the friends of a whole set of profiles. The searches over level
+        queries call it with the synchronous view of the session given by `AsyncSession.run_sync`.
+        """
+        profile_ids = list(profile_ids)
+        edges_stmt = union_all(
+            select(friendship.c.profile_id, friendship.c.friend_id)
+            .where(friendship.c.profile_id.in_(profile_ids)),
+            select(friendship.c.friend_id, friendship.c.profile_id)
+            .where(friendship.c.friend_id.in_(profile_ids))
+        )
+        adjacency: dict[int, list[int]] = {profile_id: [] for profile_id in profile_ids}
+        for (profile_id, friend_id) in db.execute(edges_stmt):
+            adjacency[profile_id].append(friend_id)
+        for friends in adjacency.values():
+            friends.sort()
+        return adjacency
 
     @staticmethod
-    async def get_connection(db: Session, profile_id: int, friend_id: int) -> list[int]:
+    def search_levels(
+        db: Session,
+        search: Callable[[NeighborsFn], SearchResult | dict[int, SearchResult]],
+        limits: SearchLimits
+    ) -> SearchResult | dict[int, SearchResult]:
         """
-        Get the shorter connection between two profiles applying Breadth First Search algorithm
+        Run a search over level queries with the synchronous view of the session. Every level
+        query is limited to the time left before the deadline with the statement timeout of the
+        transaction, so a level of a high degree profile can't hold the search past it.
         """
-        # Initialize the queue with the starting profile
-        queue = deque([(profile_id, [profile_id])])
-        visited = set()
+        previous_timeout = None
+
+        def neighbors(profile_ids: Iterable[int]) -> dict[int, list[int]]:
+            nonlocal previous_timeout
+            if limits.deadline is not None:
+                timeout = max(1, int((limits.deadline - time.monotonic()) * 1000))
+                timeout_setting = db.execute(STATEMENT_TIMEOUT_QUERY, {"timeout": str(timeout)}).scalar()
+                if previous_timeout is None:
+                    previous_timeout = timeout_setting
+            return Friendship.query_frontier_friends(db, profile_ids)
+
+        result = search(neighbors)
+        if previous_timeout is not None:
+            db.execute(STATEMENT_TIMEOUT_QUERY, {"timeout": previous_timeout})
+        return result
+
+    @staticmethod
+    def is_query_canceled(error: DBAPIError) -> bool:
+        """
+        Indicate if a statement was canceled by the statement timeout
+        """
+        return getattr(error.orig, "pgcode", None) == QUERY_CANCELED
+
+    @staticmethod
+    async def query_connection(
+        db: AsyncSession,
+        profile_id: int,
+        friend_id: int,
+        limits: SearchLimits
+    ) -> SearchResult:
+        """
+        Get the shorter connection between two profiles with a single recursive query.
+
+        Each recursion step produces a whole BFS level from the target with the parent of every
+        new profile, carrying the visited profiles to prune cycles. The path is rebuilt walking
+        the levels from the source. The deadline is enforced with the statement timeout.
+        """
+        max_depth = limits.max_depth or CONNECTION_MAX_DEPTH
+        previous_timeout = None
+        if limits.deadline is not None:
+            timeout = max(1, int((limits.deadline - time.monotonic()) * 1000))
+            previous_timeout = (await db.execute(STATEMENT_TIMEOUT_QUERY, {"timeout": str(timeout)})).scalar()
+        try:
+            (path, depth, visited) = (await db.execute(CONNECTION_QUERY, {
+                "source": profile_id,
+                "target": friend_id,
+                "max_depth": max_depth,
+                "max_visited": limits.max_visited,
+            })).one()
+        except DBAPIError as e:
+            if not Friendship.is_query_canceled(e):
+                raise
+            await db.rollback()
+            return SearchResult(complete=False, limit=ConnectionLimitEnum.DEADLINE)
+        if previous_timeout is not None:
+            await db.execute(STATEMENT_TIMEOUT_QUERY, {"timeout": previous_timeout})
+
+        if path:
+            return SearchResult(path=path, visited=visited)
+        if depth >= max_depth:
+            return SearchResult(complete=False, limit=ConnectionLimitEnum.MAX_DEPTH, visited=visited)
+        if limits.max_visited is not None and visited >= limits.max_visited:
+            return SearchResult(complete=False, limit=ConnectionLimitEnum.MAX_VISITED, visited=visited)
+        return SearchResult(visited=visited)
 
-        # Perform BFS
-        while queue:
-            current_profile, path = queue.popleft()
-            if current_profile == friend_id:
-                return path
-            if current_profile not in visited:
-                visited.add(current_profile)
-                friends = Friendship.get_all_friends(db, current_profile)
-                for friend in friends:
-                    if friend not in visited:
-                        queue.append((friend, path + [friend]))
-        return []
+    @staticmethod
+    def get_search_limits(
+        max_depth: int | None = None,
+        max_visited: int | None = None,
+        timeout_ms: int | None = None
+    ) -> SearchLimits:
+        """
+        Get the limits of a search starting now, they can't exceed the configured ones
+        """
+        return SearchLimits(
+            max_depth=min(max_depth or CONNECTION_MAX_DEPTH, CONNECTION_MAX_DEPTH),
+            max_visited=min(max_visited or CONNECTION_MAX_VISITED, CONNECTION_MAX_VISITED),
+            deadline=time.monotonic() + min(timeout_ms or CONNECTION_TIMEOUT_MS, CONNECTION_TIMEOUT_MS) / 1000
+        )
+
+    @staticmethod
+    async def search_connection(  # pylint: disable=too-many-arguments
+        db: AsyncSession,
+        profile_id: int,
+        friend_id: int,
+        mode: ConnectionSearchModeEnum | None = None,
+        max_depth: int | None = None,
+        max_visited: int | None = None,
+        timeout_ms: int | None = None
+    ) -> SearchResult:
+        """
+        Search the shorter connection between two profiles within the given limits.
+
+        The `index` and `bfs` modes apply a bidirectional Breadth First Search over the in-memory
+        index or level queries, the `sql` mode runs the search inside the database, the `landmark`
+        mode applies A* over the index guided by the landmark distances while they are valid, and
+        `auto` uses the index when it is loaded. The limits can't exceed the configured ones.
+        """
+        # Profiles in different components are never connected
+        if component_index.are_disconnected(profile_id, friend_id):
+            return SearchResult()
+
+        limits = Friendship.get_search_limits(max_depth, max_visited, timeout_ms)
+        result = connection_cache.get(profile_id, friend_id, limits.max_depth)
+        if result is None:
+            snapshot = connection_cache.snapshot()
+            result = await Friendship.run_search(db, profile_id, friend_id, mode, limits)
+            connection_cache.put(profile_id, friend_id, result, snapshot)
+        return result
+
+    @staticmethod
+    async def run_search(
+        db: AsyncSession,
+        profile_id: int,
+        friend_id: int,
+        mode: ConnectionSearchModeEnum | None,
+        limits: SearchLimits
+    ) -> SearchResult:
+        """
+        Run the connection search with the given mode. The searches over level queries run in
+        the synchronous view of the session, awaiting each query without blocking the event loop.
+        """
+        mode = mode or ConnectionSearchModeEnum(CONNECTION_SEARCH_MODE)
+        if mode == ConnectionSearchModeEnum.SQL:
+            result = await Friendship.query_connection(db, profile_id, friend_id, limits)
+        elif (mode == ConnectionSearchModeEnum.LANDMARK and graph_index.is_ready and
+                landmark_index.can_guide_search()):
+            result = landmark_index.astar(graph_index, profile_id, friend_id, limits)
+        elif mode == ConnectionSearchModeEnum.BFS or not graph_index.is_ready:
+            mode = ConnectionSearchModeEnum.BFS
+            try:
+                result = await db.run_sync(lambda session: Friendship.search_levels(
+                    session, lambda neighbors: GraphSearch.bidirectional_bfs(neighbors, profile_id, friend_id, limits),
+                    limits))
+            except DBAPIError as e:
+                if not Friendship.is_query_canceled(e):
+                    raise
+                await db.rollback()
+                result = SearchResult(complete=False, limit=ConnectionLimitEnum.DEADLINE)
+        else:
+            mode = ConnectionSearchModeEnum.INDEX
+            result = GraphSearch.bidirectional_bfs(graph_index.get_frontier_friends, profile_id, friend_id, limits)
+        observe_connection_search(mode.value, result)
+        return result
+
+    @staticmethod
+    async def search_connections(  # pylint: disable=too-many-arguments, too-many-locals
+        db: AsyncSession,
+        profile_id: int,
+        friend_ids: Iterable[int],
+        mode: ConnectionSearchModeEnum | None = None,
+        max_depth: int | None = None,
+        max_visited: int | None = None,
+        timeout_ms: int | None = None
+    ) -> dict[int, SearchResult]:
+        """
+        Search the shorter connections from one profile to many profiles.
+
+        A single Breadth First Search tree rooted at the profile serves all the friends, over the
+        in-memory index or over level queries. The `sql` mode runs one recursive query per friend.
+        """
+        results = {}
+        pending = set()
+        limits = Friendship.get_search_limits(max_depth, max_visited, timeout_ms)
+        for friend_id in set(friend_ids):
+            # Profiles in different components are never connected
+            if component_index.are_disconnected(profile_id, friend_id):
+                results[friend_id] = SearchResult()
+                continue
+            cached = connection_cache.get(profile_id, friend_id, limits.max_depth)
+            if cached is not None:
+                results[friend_id] = cached
+            else:
+                pending.add(friend_id)
+        if not pending:
+            return results
+
+        mode = mode or ConnectionSearchModeEnum(CONNECTION_SEARCH_MODE)
+        snapshot = connection_cache.snapshot()
+        if mode == ConnectionSearchModeEnum.SQL:
+            searched = {friend_id: await Friendship.query_connection(db, profile_id, friend_id, limits)
+                        for friend_id in pending}
+        elif mode == ConnectionSearchModeEnum.BFS or not graph_index.is_ready:
+            mode = ConnectionSearchModeEnum.BFS
+            try:
+                searched = await db.run_sync(lambda session: Friendship.search_levels(
+                    session, lambda neighbors: GraphSearch.single_source_bfs(neighbors, profile_id, pending, limits),
+                    limits))
+            except DBAPIError as e:
+                if not Friendship.is_query_canceled(e):
+                    raise
+                await db.rollback()
+                searched = {friend_id: SearchResult(complete=False, limit=ConnectionLimitEnum.DEADLINE)
+                            for friend_id in pending}
+        else:
+            mode = ConnectionSearchModeEnum.INDEX
+            searched = GraphSearch.single_source_bfs(
+                graph_index.get_frontier_friends, profile_id, pending, limits)
+        # The friends share one traversal except with the recursive query run per friend
+        traversal = max(searched.values(), key=lambda result: result.visited)
+        for (friend_id, result) in searched.items():
+            connection_cache.put(profile_id, friend_id, result, snapshot)
+            observe_connection_search(
+                mode.value, result, visited=mode == ConnectionSearchModeEnum.SQL or result is traversal)
+        results.update(searched)
+        return results
+
+    @staticmethod
+    async def get_connection(
+        db: AsyncSession,
+        profile_id: int,
+        friend_id: int,
+        mode: ConnectionSearchModeEnum | None = None
+    ) -> list[int]:
+        """
+        Get the shorter connection between two profiles within the configured limits
+        """
+        result = await Friendship.search_connection(db, profile_id, friend_id, mode)
+        return result.path
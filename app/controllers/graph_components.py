@@ -0,0 +1,194 @@
+"""
+Connected components of the friendship graph.
+"""
+import asyncio
+import logging
+from array import array
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentIndex:
+    """
+    Union-find over the profile ids that labels each connected component of the friendship graph.
+
+    A component is identified by its lowest profile id. New relationships merge components in
+    place. Deleting a relationship can split a component, so the index is marked as dirty until
+    it is rebuilt; while dirty, two profiles in different components are still known to be
+    disconnected, but two profiles in the same component may not be connected anymore.
+
+    The rebuild inside the requests runs in a worker thread over a copy of the relationships,
+    one at a time, and the dirty components keep answering meanwhile. The relationships changed
+    during the rebuild are logged and applied to the new components when they are swapped in.
+    """
+
+    def __init__(self):
+        self._parents = array("i")
+        self._sizes = array("i")
+        self._labels = array("i")
+        self._dirty = False
+        self._ready = False
+        # Relationships changed while the components are rebuilt, None when no rebuild runs
+        self._rebuild_log: list[tuple[bool, int, int]] | None = None
+        self._rebuild: asyncio.Task | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Indicate if the index was loaded and can answer queries
+        """
+        return self._ready
+
+    @property
+    def is_dirty(self) -> bool:
+        """
+        Indicate if relationships were deleted after the last build
+        """
+        return self._dirty
+
+    def reset(self):
+        """
+        Drop the index data and mark it as not ready
+        """
+        self._parents = array("i")
+        self._sizes = array("i")
+        self._labels = array("i")
+        self._dirty = False
+        self._ready = False
+        self._stop_rebuild()
+
+    def load(self, edges: Iterable[tuple[int, int]]):
+        """
+        Build the components from an iterable of (profile_id, friend_id) rows
+        """
+        self._parents = array("i")
+        self._sizes = array("i")
+        self._labels = array("i")
+        for (profile_id, friend_id) in edges:
+            self._union(profile_id, friend_id)
+        self._dirty = False
+        self._ready = True
+        self._stop_rebuild()
+        logger.info("Component index loaded")
+
+    def rebuild_in_background(self, read_edges: Callable[[], Iterable[tuple[int, int]]]) -> asyncio.Task:
+        """
+        Rebuild the components in a worker thread, unless a rebuild is already running. The
+        relationships are read when the rebuild starts, and iterated in the worker thread.
+        """
+        if self._rebuild is None:
+            self._rebuild_log = []
+            self._rebuild = asyncio.get_running_loop().create_task(
+                self._rebuild_components(read_edges(), self._rebuild_log))
+        return self._rebuild
+
+    async def _rebuild_components(self, edges: Iterable[tuple[int, int]], log: list[tuple[bool, int, int]]):
+        """
+        Build the components in a worker thread and swap them in with the changes made meanwhile
+        """
+        try:
+            rebuilt = ComponentIndex()
+            await asyncio.to_thread(rebuilt.load, edges)
+            # A load or reset replaced the components the rebuild started from
+            if self._rebuild_log is not log:
+                return
+            # pylint: disable-next=protected-access
+            (self._parents, self._sizes, self._labels) = (rebuilt._parents, rebuilt._sizes, rebuilt._labels)
+            self._dirty = False
+            for (added, profile_id, friend_id) in log:
+                if added:
+                    self._union(profile_id, friend_id)
+                else:
+                    self._dirty = True
+        except Exception:  # pylint: disable=broad-exception-caught
+            # The components stay dirty, the next request tries again
+            logger.exception("Component index rebuild failed")
+        finally:
+            if self._rebuild_log is log:
+                self._stop_rebuild()
+
+    def _stop_rebuild(self):
+        """
+        Discard the result of the rebuild running in the background, if any
+        """
+        self._rebuild_log = None
+        self._rebuild = None
+
+    def _grow(self, profile_id: int):
+        """
+        Add singleton components up to the given profile id
+        """
+        start = len(self._parents)
+        if profile_id < start:
+            return
+        self._parents.extend(range(start, profile_id + 1))
+        self._labels.extend(range(start, profile_id + 1))
+        self._sizes.extend([1] * (profile_id + 1 - start))
+
+    def _find(self, profile_id: int) -> int | None:
+        """
+        Get the root of the component of a profile halving the path on the way, or None for the
+        ids outside the index, which are singletons without relationships
+        """
+        parents = self._parents
+        if not 0 <= profile_id < len(parents):
+            return None
+        while parents[profile_id] != profile_id:
+            parents[profile_id] = parents[parents[profile_id]]
+            profile_id = parents[profile_id]
+        return profile_id
+
+    def _union(self, profile_id: int, friend_id: int):
+        """
+        Merge the components of two profiles, the index only grows for the related profiles
+        """
+        self._grow(max(profile_id, friend_id))
+        root = self._find(profile_id)
+        other = self._find(friend_id)
+        if root == other:
+            return
+        if self._sizes[root] < self._sizes[other]:
+            root, other = other, root
+        self._parents[other] = root
+        self._sizes[root] += self._sizes[other]
+        self._labels[root] = min(self._labels[root], self._labels[other])
+
+    def add_edge(self, profile_id: int, friend_id: int):
+        """
+        Register a new friendship relationship
+        """
+        if self._ready:
+            self._union(profile_id, friend_id)
+            if self._rebuild_log is not None:
+                self._rebuild_log.append((True, profile_id, friend_id))
+
+    def remove_edge(self, profile_id: int, friend_id: int):
+        """
+        Register a deleted friendship relationship, the index must be rebuilt to split components
+        """
+        if self._ready:
+            self._dirty = True
+            if self._rebuild_log is not None:
+                self._rebuild_log.append((False, profile_id, friend_id))
+
+    def are_disconnected(self, profile_id: int, friend_id: int) -> bool:
+        """
+        Check if two profiles are known to be in different components
+        """
+        if not self._ready or profile_id == friend_id:
+            return False
+        root = self._find(profile_id)
+        return root is None or root != self._find(friend_id)
+
+    def get_component(self, profile_id: int) -> tuple[int, int]:
+        """
+        Get the (component id, component size) of a profile
+        """
+        root = self._find(profile_id)
+        if root is None:
+            return (profile_id, 1)
+        return (self._labels[root], self._sizes[root])
+
+
+component_index = ComponentIndex()
@@ -0,0 +1,373 @@
+"""
+In-memory adjacency index of the friendship graph.
+"""
+import asyncio
+import logging
+from array import array
+from typing import Iterable, Iterator, Sequence
+from app.config import GRAPH_INDEX_COMPACT_RATIO, GRAPH_INDEX_COMPACT_MIN
+
+logger = logging.getLogger(__name__)
+
+
+class GraphIndex:  # pylint: disable=too-many-instance-attributes
+    """
+    Undirected adjacency of the friendship graph stored in Compressed Sparse Row layout.
+
+    The friends of the profile `i` are `neighbors[offsets[i]:offsets[i + 1]]`, sorted by id.
+    Profile ids are dense serial integers, so they are used directly as row numbers. Writes are
+    kept in a small overlay of added/removed edges that is merged into the arrays once it
+    grows past a fraction of the indexed edges.
+
+    Inside the requests the merge runs in a worker thread over a copy of the overlay, as the
+    arrays are never modified in place. The changes arriving meanwhile are logged and replayed
+    over the new arrays when they are swapped in, in a single step of the event loop.
+    """
+
+    def __init__(self):
+        self._offsets = array("q", [0])
+        self._neighbors = array("i")
+        self._added: dict[int, set[int]] = {}
+        self._removed: dict[int, set[int]] = {}
+        self._pending = 0
+        self._edges = 0
+        self._ready = False
+        # Changes made while the arrays are merged in the background, None when no merge runs
+        self._compaction_log: list[tuple[bool, int, int]] | None = None
+        self._compaction: asyncio.Task | None = None
+        self._generation = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Indicate if the index was loaded and can answer queries
+        """
+        return self._ready
+
+    @property
+    def total_edges(self) -> int:
+        """
+        Number of undirected edges in the index
+        """
+        return self._edges
+
+    @property
+    def max_profile_id(self) -> int:
+        """
+        Highest profile id that has a row in the index
+        """
+        return max(len(self._offsets) - 2, 0, *self._added)
+
+    def reset(self):
+        """
+        Drop the index data and mark it as not ready
+        """
+        self._offsets = array("q", [0])
+        self._neighbors = array("i")
+        self._added = {}
+        self._removed = {}
+        self._pending = 0
+        self._edges = 0
+        self._ready = False
+        self._stop_compaction()
+
+    def load(self, edges: Iterable[tuple[int, int]]):
+        """
+        Build the index from an iterable of (profile_id, friend_id) rows
+        """
+        adjacency = self._build(edges)
+        self._offsets, self._neighbors = adjacency
+        self._added = {}
+        self._removed = {}
+        self._pending = 0
+        self._edges = len(self._neighbors) // 2
+        self._ready = True
+        self._stop_compaction()
+        logger.info("Graph index loaded with %d friendships", self._edges)
+
+    @staticmethod
+    def _build(edges: Iterable[tuple[int, int]]) -> tuple[array, array]:
+        """
+        Build the CSR arrays from the edge rows removing duplicated relationships
+        """
+        sources = array("i")
+        targets = array("i")
+        for (profile_id, friend_id) in edges:
+            sources.append(profile_id)
+            targets.append(friend_id)
+        max_id = max(sources + targets, default=0)
+
+        # Count the degree of each profile in both directions
+        degrees = array("q", bytes(8 * (max_id + 2)))
+        for (profile_id, friend_id) in zip(sources, targets):
+            degrees[profile_id + 1] += 1
+            degrees[friend_id + 1] += 1
+        for i in range(1, max_id + 2):
+            degrees[i] += degrees[i - 1]
+
+        # Scatter the edges in their rows
+        raw = array("i", bytes(4 * degrees[-1]))
+        cursor = array("q", degrees)
+        for (profile_id, friend_id) in zip(sources, targets):
+            raw[cursor[profile_id]] = friend_id
+            cursor[profile_id] += 1
+            raw[cursor[friend_id]] = profile_id
+            cursor[friend_id] += 1
+        del sources, targets, cursor
+
+        # Sort each row and drop the relationships stored in both directions
+        offsets = array("q", [0])
+        neighbors = array("i")
+        for i in range(max_id + 1):
+            start, end = degrees[i], degrees[i + 1]
+            if end - start > 0:
+                neighbors.extend(sorted(set(raw[start:end])))
+            offsets.append(len(neighbors))
+        return (offsets, neighbors)
+
+    def _base_friends(self, profile_id: int) -> array:
+        """
+        Get the friends of a profile stored in the CSR arrays
+        """
+        if profile_id < 0 or profile_id >= len(self._offsets) - 1:
+            return array("i")
+        return self._neighbors[self._offsets[profile_id]:self._offsets[profile_id + 1]]
+
+    def has_edge(self, profile_id: int, friend_id: int) -> bool:
+        """
+        Check if two profiles are friends
+        """
+        if friend_id in self._added.get(profile_id, ()):
+            return True
+        if friend_id in self._removed.get(profile_id, ()):
+            return False
+        friends = self._base_friends(profile_id)
+        low, high = 0, len(friends)
+        while low < high:
+            middle = (low + high) // 2
+            if friends[middle] < friend_id:
+                low = middle + 1
+            else:
+                high = middle
+        return low < len(friends) and friends[low] == friend_id
+
+    def get_friends(self, profile_id: int) -> list[int]:
+        """
+        Get the sorted friends ids of a profile
+        """
+        friends = self._base_friends(profile_id).tolist()
+        added = self._added.get(profile_id)
+        removed = self._removed.get(profile_id)
+        if added or removed:
+            friends = sorted((set(friends) - (removed or set())) | (added or set()))
+        return friends
+
+    @staticmethod
+    def intersect_sorted(left: Sequence[int], right: Sequence[int]) -> list[int]:
+        """
+        Intersect two sorted id sequences walking both at once
+        """
+        common = []
+        i, j = 0, 0
+        while i < len(left) and j < len(right):
+            if left[i] < right[j]:
+                i += 1
+            elif left[i] > right[j]:
+                j += 1
+            else:
+                common.append(left[i])
+                i += 1
+                j += 1
+        return common
+
+    def get_mutual_friends(self, profile_id: int, other_id: int) -> list[int]:
+        """
+        Get the sorted ids of the friends shared by two profiles
+        """
+        return self.intersect_sorted(self.get_friends(profile_id), self.get_friends(other_id))
+
+    def get_frontier_friends(self, profile_ids: Iterable[int]) -> dict[int, list[int]]:
+        """
+        Get the friends of a whole set of profiles
+        """
+        return {profile_id: self.get_friends(profile_id) for profile_id in profile_ids}
+
+    def edges(self) -> Iterator[tuple[int, int]]:
+        """
+        Iterate the undirected edges once as (lower id, higher id) pairs
+        """
+        return self._merged_edges(self._offsets, self._neighbors, self._added, self._removed)
+
+    def snapshot_edges(self) -> Iterator[tuple[int, int]]:
+        """
+        Iterate the current undirected edges from a copy of the overlay, so they can be read
+        in a worker thread while the index keeps changing
+        """
+        added = {profile_id: set(friends) for (profile_id, friends) in self._added.items()}
+        removed = {profile_id: set(friends) for (profile_id, friends) in self._removed.items()}
+        return self._merged_edges(self._offsets, self._neighbors, added, removed)
+
+    @staticmethod
+    def _merged_edges(
+        offsets: array,
+        neighbors: array,
+        added: dict[int, set[int]],
+        removed: dict[int, set[int]]
+    ) -> Iterator[tuple[int, int]]:
+        """
+        Iterate the undirected edges of the CSR arrays with the overlay changes applied
+        """
+        rows = len(offsets) - 1
+        for profile_id in range(max(rows, max(added, default=-1) + 1)):
+            friends = neighbors[offsets[profile_id]:offsets[profile_id + 1]] if profile_id < rows else ()
+            if profile_id in added or profile_id in removed:
+                friends = sorted((set(friends) - removed.get(profile_id, set())) | added.get(profile_id, set()))
+            for friend_id in friends:
+                if profile_id < friend_id:
+                    yield (profile_id, friend_id)
+
+    def _link(self, overlay: dict[int, set[int]], profile_id: int, friend_id: int):
+        """
+        Register a relationship in both directions of an overlay
+        """
+        overlay.setdefault(profile_id, set()).add(friend_id)
+        overlay.setdefault(friend_id, set()).add(profile_id)
+
+    def _unlink(self, overlay: dict[int, set[int]], profile_id: int, friend_id: int) -> bool:
+        """
+        Remove a relationship from both directions of an overlay
+        """
+        if friend_id not in overlay.get(profile_id, ()):
+            return False
+        for (node, other) in ((profile_id, friend_id), (friend_id, profile_id)):
+            overlay[node].discard(other)
+            if not overlay[node]:
+                del overlay[node]
+        return True
+
+    def add_edge(self, profile_id: int, friend_id: int):
+        """
+        Add a friendship relationship to the index
+        """
+        if not self._ready or profile_id == friend_id or self.has_edge(profile_id, friend_id):
+            return
+        self._apply(True, profile_id, friend_id)
+        self._edges += 1
+        self._track_change(True, profile_id, friend_id)
+
+    def remove_edge(self, profile_id: int, friend_id: int):
+        """
+        Remove a friendship relationship from the index
+        """
+        if not self._ready or not self.has_edge(profile_id, friend_id):
+            return
+        self._apply(False, profile_id, friend_id)
+        self._edges -= 1
+        self._track_change(False, profile_id, friend_id)
+
+    def _apply(self, added: bool, profile_id: int, friend_id: int):
+        """
+        Register a change in the overlay, cancelling the opposite change when there is one
+        """
+        (cancelled, changed) = (self._removed, self._added) if added else (self._added, self._removed)
+        if not self._unlink(cancelled, profile_id, friend_id):
+            self._link(changed, profile_id, friend_id)
+
+    def _track_change(self, added: bool, profile_id: int, friend_id: int):
+        """
+        Merge the overlay into the arrays when it grows too much, in the background when there
+        is a running event loop
+        """
+        self._pending += 1
+        if self._compaction_log is not None:
+            self._compaction_log.append((added, profile_id, friend_id))
+            return
+        if self._pending < max(GRAPH_INDEX_COMPACT_MIN, self._edges * GRAPH_INDEX_COMPACT_RATIO):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.compact()
+            return
+        self._compaction_log = []
+        self._compaction = loop.create_task(self._compact_in_background())
+
+    def compact(self):
+        """
+        Rebuild the CSR arrays merging the pending changes
+        """
+        self._stop_compaction()
+        self._offsets, self._neighbors = self._build(list(self.edges()))
+        self._added = {}
+        self._removed = {}
+        self._pending = 0
+
+    async def _compact_in_background(self):
+        """
+        Rebuild the CSR arrays in a worker thread and swap them in with the changes made meanwhile
+        """
+        generation = self._generation
+        edges = self.snapshot_edges()
+        try:
+            (offsets, neighbors) = await asyncio.to_thread(lambda: self._build(list(edges)))
+            if generation != self._generation:
+                return
+
+            # Replay the changes made during the merge over the new arrays
+            log = self._compaction_log or []
+            self._offsets, self._neighbors = offsets, neighbors
+            self._added = {}
+            self._removed = {}
+            for (change_added, profile_id, friend_id) in log:
+                self._apply(change_added, profile_id, friend_id)
+            self._pending = len(log)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # The overlay still holds every change, the next one tries again
+            logger.exception("Graph index compaction failed")
+        finally:
+            if generation == self._generation:
+                self._compaction_log = None
+                self._compaction = None
+
+    async def wait_compaction(self):
+        """
+        Wait for the background merge of the pending changes, if one is running
+        """
+        if self._compaction is not None:
+            await asyncio.shield(self._compaction)
+
+    def _stop_compaction(self):
+        """
+        Discard the result of the background merge, as the arrays it started from were replaced
+        """
+        self._generation += 1
+        self._compaction_log = None
+        self._compaction = None
+
+    def memory_usage(self) -> int:
+        """
+        Get the approximated memory used by the index in bytes
+        """
+        arrays_size = (self._offsets.itemsize * len(self._offsets) +
+                       self._neighbors.itemsize * len(self._neighbors))
+        # Rough cost of a set entry plus its int object in the overlay
+        overlay_size = 2 * 64 * self._pending
+        return arrays_size + overlay_size
+
+    def stats(self) -> dict:
+        """
+        Get the size and memory usage of the index
+        """
+        memory = self.memory_usage()
+        return {
+            "ready": self._ready,
+            "profiles": self.max_profile_id + 1 if self._ready else 0,
+            "friendships": self._edges,
+            "pending_changes": self._pending,
+            "compacting": self._compaction is not None,
+            "memory_bytes": memory,
+            "bytes_per_friendship": memory / self._edges if self._edges else 0.0,
+        }
+
+
+graph_index = GraphIndex()
@@ -0,0 +1,333 @@
+"""
+Landmark distance oracle of the friendship graph (ALT: A*, Landmarks and Triangle inequality).
+"""
+import sys
+import json
+import heapq
+import hashlib
+import logging
+from array import array
+from datetime import datetime, timezone
+from typing import Iterable
+from app.controllers.db_types import ConnectionLimitEnum
+from app.controllers.graph_index import GraphIndex
+from app.controllers.graph_search import SearchLimits, SearchResult
+
+logger = logging.getLogger(__name__)
+
+# Distance stored for the profiles that a landmark can't reach
+UNREACHABLE = 0xFFFF
+FILE_VERSION = 1
+
+
+class LandmarkIndex:
+    """
+    Hop distances from a few landmark profiles to every profile.
+
+    For any landmark `L` the triangle inequality gives `|d(L, a) - d(L, b)| <= d(a, b) <= d(a, L) + d(L, b)`,
+    so the table answers distance bounds without searching and gives an admissible A* heuristic.
+    The table is a snapshot: friendships created after the build can shorten the distances
+    (invalidating the lower bounds) and deleted ones can stretch them (invalidating the upper
+    bounds), so the changes since the build are tracked and reported. The file keeps a fingerprint
+    of the friendships of the build, so a table loaded for a different graph is known to be stale
+    even when the number of friendships is the same.
+    """
+
+    def __init__(self):
+        self._landmarks: list[int] = []
+        self._distances: list[array] = []
+        self._friendships = 0
+        self._built_at: datetime | None = None
+        # Fingerprint of the friendships the table matches, None when it can't be checked
+        self._fingerprint: str | None = None
+        self._created = 0
+        self._deleted = 0
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Indicate if the distance table is loaded
+        """
+        return bool(self._landmarks)
+
+    @property
+    def landmarks(self) -> list[int]:
+        """
+        The landmark profile ids
+        """
+        return self._landmarks
+
+    @property
+    def is_stale(self) -> bool:
+        """
+        Indicate if friendships changed after the build, or if the table may not match the graph
+        """
+        return self._fingerprint is None or self._created > 0 or self._deleted > 0
+
+    def reset(self):
+        """
+        Drop the distance table
+        """
+        self._landmarks = []
+        self._distances = []
+        self._friendships = 0
+        self._built_at = None
+        self._fingerprint = None
+        self._created = 0
+        self._deleted = 0
+
+    @staticmethod
+    def fingerprint(edges: Iterable[tuple[int, int]]) -> str:
+        """
+        Get an order independent fingerprint of the undirected edges, adding the hashes of the
+        (lower id, higher id) pairs
+        """
+        total = 0
+        for (profile_id, friend_id) in edges:
+            pair = f"{min(profile_id, friend_id)}-{max(profile_id, friend_id)}".encode("ascii")
+            total += int.from_bytes(hashlib.blake2b(pair, digest_size=8).digest(), "little")
+        return f"{total % 2 ** 64:016x}"
+
+    @staticmethod
+    def _bfs(graph: GraphIndex, source: int, size: int) -> array:
+        """
+        Get the hop distances from a profile to every profile
+        """
+        distances = array("H", [UNREACHABLE]) * size
+        distances[source] = 0
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth = min(depth + 1, UNREACHABLE - 1)
+            next_frontier = []
+            for node in frontier:
+                for friend in graph.get_friends(node):
+                    if distances[friend] == UNREACHABLE:
+                        distances[friend] = depth
+                        next_frontier.append(friend)
+            frontier = next_frontier
+        return distances
+
+    def build(self, graph: GraphIndex, count: int):
+        """
+        Build the distance table selecting the landmarks farthest-first.
+
+        The first landmark is the profile with more friends. Each next one is the best connected
+        profile that no landmark reaches, if any, or the profile farthest from all the landmarks.
+        """
+        size = graph.max_profile_id + 1
+        degrees = [len(graph.get_friends(profile_id)) for profile_id in range(size)]
+        landmarks: list[int] = []
+        distances: list[array] = []
+        closest = array("H", [UNREACHABLE]) * size
+
+        while len(landmarks) < count:
+            candidates = [i for i in range(size) if closest[i] == UNREACHABLE and degrees[i] > 0]
+            if candidates:
+                landmark = max(candidates, key=lambda i: (degrees[i], -i))
+            else:
+                landmark = max(range(size), key=lambda i: (closest[i] if degrees[i] > 0 else -1, -i))
+                if degrees[landmark] == 0 or closest[landmark] == 0:
+                    break
+            landmark_distances = self._bfs(graph, landmark, size)
+            for i in range(size):
+                closest[i] = min(closest[i], landmark_distances[i])
+            landmarks.append(landmark)
+            distances.append(landmark_distances)
+
+        self._landmarks = landmarks
+        self._distances = distances
+        self._friendships = graph.total_edges
+        self._built_at = datetime.now(timezone.utc)
+        self._fingerprint = self.fingerprint(graph.edges())
+        self._created = 0
+        self._deleted = 0
+        logger.info("Landmark table built with %d landmarks", len(landmarks))
+
+    def save(self, path: str):
+        """
+        Save the distance table to a file: a JSON header line followed by the raw distance arrays
+        """
+        header = {
+            "version": FILE_VERSION,
+            "byteorder": sys.byteorder,
+            "landmarks": self._landmarks,
+            "size": len(self._distances[0]) if self._distances else 0,
+            "friendships": self._friendships,
+            "fingerprint": self._fingerprint,
+            "built_at": self._built_at.isoformat() if self._built_at else None,
+        }
+        with open(path, "wb") as f:
+            f.write(json.dumps(header).encode("utf-8") + b"\n")
+            for distances in self._distances:
+                distances.tofile(f)
+
+    def load(self, path: str, graph: GraphIndex | None = None):
+        """
+        Load the distance table from a file. The table is reported as stale unless the current
+        graph is given and its friendships match the fingerprint of the build.
+        """
+        with open(path, "rb") as f:
+            header = json.loads(f.readline().decode("utf-8"))
+            if header.get("version") != FILE_VERSION:
+                raise ValueError(f"Unsupported landmark file version: {header.get('version')}")
+            distances = []
+            for _ in header["landmarks"]:
+                landmark_distances = array("H")
+                landmark_distances.fromfile(f, header["size"])
+                if header["byteorder"] != sys.byteorder:
+                    landmark_distances.byteswap()
+                distances.append(landmark_distances)
+
+        self._landmarks = header["landmarks"]
+        self._distances = distances
+        self._friendships = header["friendships"]
+        self._built_at = datetime.fromisoformat(header["built_at"]) if header["built_at"] else None
+        self._fingerprint = None
+        self._created = 0
+        self._deleted = 0
+        if graph is not None:
+            fingerprint = header.get("fingerprint")
+            if fingerprint is not None and fingerprint == self.fingerprint(graph.edges()):
+                self._fingerprint = fingerprint
+            # The exact changes are unknown, count the difference on the proper side
+            self._created = max(0, graph.total_edges - self._friendships)
+            self._deleted = max(0, self._friendships - graph.total_edges)
+        if self._fingerprint is None:
+            logger.warning("Landmark table doesn't match the friendships, it is stale")
+        logger.info("Landmark table loaded with %d landmarks", len(self._landmarks))
+
+    def on_created(self):
+        """
+        Register a friendship created after the build
+        """
+        if self.is_ready:
+            self._created += 1
+
+    def on_deleted(self):
+        """
+        Register a friendship deleted after the build
+        """
+        if self.is_ready:
+            self._deleted += 1
+
+    def _distance(self, landmark_idx: int, profile_id: int) -> int:
+        """
+        Get the distance from a landmark to a profile
+        """
+        distances = self._distances[landmark_idx]
+        if 0 <= profile_id < len(distances):
+            return distances[profile_id]
+        return UNREACHABLE
+
+    def bounds(self, profile_id: int, friend_id: int) -> tuple[int | None, int | None, bool]:
+        """
+        Get the (lower bound, upper bound, disconnected) estimation of the distance between two
+        profiles. The bounds are None when the landmarks can't tell them.
+
+        Friendships created after the build can connect any two profiles, and the profiles
+        created after it are not in the table, so then only the trivial lower bound is known.
+        Deleted friendships leave the lower bounds valid but can stretch the upper ones.
+        """
+        if profile_id == friend_id:
+            return (0, 0, False)
+        size = len(self._distances[0]) if self._distances else 0
+        if not self.can_guide_search() or not (0 <= profile_id < size and 0 <= friend_id < size):
+            return (1, None, False)
+        lower = 0
+        upper = None
+        for i in range(len(self._landmarks)):
+            from_profile = self._distance(i, profile_id)
+            from_friend = self._distance(i, friend_id)
+            if from_profile == UNREACHABLE and from_friend == UNREACHABLE:
+                continue
+            if UNREACHABLE in (from_profile, from_friend):
+                # A landmark reaches only one of them, so they are in different components
+                return (None, None, True)
+            lower = max(lower, abs(from_profile - from_friend))
+            upper = from_profile + from_friend if upper is None else min(upper, from_profile + from_friend)
+        return (max(lower, 1), upper if self._deleted == 0 else None, False)
+
+    def heuristic(self, profile_id: int, target: int) -> int:
+        """
+        Get the landmark lower bound of the distance between two profiles, it never overestimates
+        """
+        lower = 0
+        for i in range(len(self._landmarks)):
+            from_profile = self._distance(i, profile_id)
+            from_target = self._distance(i, target)
+            if UNREACHABLE not in (from_profile, from_target):
+                lower = max(lower, abs(from_profile - from_target))
+        return lower
+
+    def can_guide_search(self) -> bool:
+        """
+        Indicate if the lower bounds are still valid, deleted friendships only stretch the distances
+        """
+        return self.is_ready and self._fingerprint is not None and self._created == 0
+
+    def astar(  # pylint: disable=too-many-locals
+        self,
+        graph: GraphIndex,
+        source: int,
+        target: int,
+        limits: SearchLimits | None = None
+    ) -> SearchResult:
+        """
+        Get the shorter path between two profiles applying A* guided by the landmark lower bounds.
+        Profiles whose bound goes beyond the maximum depth are pruned.
+        """
+        limits = limits or SearchLimits()
+        parents: dict[int, int | None] = {source: None}
+        costs = {source: 0}
+        heap = [(self.heuristic(source, target), 0, source)]
+        closed = set()
+        pruned = False
+
+        while heap:
+            (_, cost, node) = heapq.heappop(heap)
+            if node in closed or cost > costs[node]:
+                continue
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = parents[node]
+                return SearchResult(path=path[::-1], visited=len(costs))
+            closed.add(node)
+
+            # The depth is bounded pruning the estimations beyond it
+            limit = limits.reached(0, len(closed))
+            if limit is not None:
+                return SearchResult(complete=False, limit=limit, visited=len(costs))
+
+            for friend in graph.get_friends(node):
+                friend_cost = cost + 1
+                if friend_cost >= costs.get(friend, friend_cost + 1):
+                    continue
+                estimate = friend_cost + self.heuristic(friend, target)
+                if limits.max_depth is not None and estimate > limits.max_depth:
+                    pruned = True
+                    continue
+                costs[friend] = friend_cost
+                parents[friend] = node
+                heapq.heappush(heap, (estimate, friend_cost, friend))
+
+        if pruned:
+            return SearchResult(complete=False, limit=ConnectionLimitEnum.MAX_DEPTH, visited=len(costs))
+        return SearchResult(visited=len(costs))
+
+    def stats(self) -> dict:
+        """
+        Get the build information and the changes since the build
+        """
+        return {
+            "landmarks": len(self._landmarks),
+            "built_at": self._built_at,
+            "stale": self.is_stale,
+            "created_since_build": self._created,
+            "deleted_since_build": self._deleted,
+        }
+
+
+landmark_index = LandmarkIndex()
@@ -0,0 +1,222 @@
+"""
+Graph search algorithms used to resolve connections between profiles.
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable
+from app.controllers.db_types import ConnectionLimitEnum
+
+# Function that receives a whole frontier level and returns the adjacency of each node
+NeighborsFn = Callable[[Iterable[int]], dict[int, list[int]]]
+
+
+@dataclass
+class SearchLimits:
+    """
+    Limits applied to a graph search. `deadline` is a `time.monotonic()` timestamp.
+    """
+    max_depth: int | None = None
+    max_visited: int | None = None
+    deadline: float | None = None
+
+    def reached(self, depth: int, visited: int) -> ConnectionLimitEnum | None:
+        """
+        Get the limit reached by a search before expanding the next level
+        """
+        if self.max_depth is not None and depth >= self.max_depth:
+            return ConnectionLimitEnum.MAX_DEPTH
+        if self.max_visited is not None and visited >= self.max_visited:
+            return ConnectionLimitEnum.MAX_VISITED
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return ConnectionLimitEnum.DEADLINE
+        return None
+
+
+@dataclass
+class SearchResult:
+    """
+    Result of a graph search. The search is complete when the path was found or when it
+    proved that there is no path; otherwise `limit` tells the limit that stopped it.
+    """
+    path: list[int] = field(default_factory=list)
+    complete: bool = True
+    limit: ConnectionLimitEnum | None = None
+    visited: int = 0
+
+
+class GraphSearch:
+    """
+    Graph search algorithms over the friendship graph.
+    """
+
+    @staticmethod
+    def build_path(
+        source: int,
+        meetings: Iterable[int],
+        forward_parents: dict[int, list[int]],
+        backward_parents: dict[int, list[int]]
+    ) -> list[int]:
+        """
+        Build the lexicographically smallest shortest path through the meeting nodes. The visited
+        nodes keep all their parents of the previous level, so the path takes the lowest next
+        profile leading to a meeting node at every step, and then the lowest parent of the other
+        side down to its root.
+        """
+        # Next profiles of the forward side that lead to a meeting node
+        meetings = set(meetings)
+        children: dict[int, list[int]] = {}
+        reached = set(meetings)
+        pending = list(meetings)
+        while pending:
+            node = pending.pop()
+            for parent in forward_parents[node]:
+                children.setdefault(parent, []).append(node)
+                if parent not in reached:
+                    reached.add(parent)
+                    pending.append(parent)
+
+        path = [source]
+        node = source
+        while node not in meetings:
+            node = min(children[node])
+            path.append(node)
+        while backward_parents[node]:
+            node = min(backward_parents[node])
+            path.append(node)
+        return path
+
+    @staticmethod
+    def expand_level(
+        neighbors: NeighborsFn,
+        frontier: list[int],
+        parents: dict[int, list[int]],
+        limits: SearchLimits | None = None,
+        other_visited: int = 0
+    ) -> tuple[list[int], ConnectionLimitEnum | None]:
+        """
+        Get the next level of a search, keeping every parent of the nodes discovered by the level.
+
+        A single high degree node can discover more nodes than the whole search may visit, so the
+        level is given up as soon as the visited nodes, counting the `other_visited` ones of the
+        other side, pass the limit or the deadline is reached. The limit reached is returned with
+        the nodes discovered until then.
+        """
+        limits = limits or SearchLimits()
+        max_parents = None if limits.max_visited is None else limits.max_visited - other_visited
+        adjacency = neighbors(frontier)
+        next_frontier: list[int] = []
+        discovered: set[int] = set()
+        for node in frontier:
+            if limits.deadline is not None and time.monotonic() >= limits.deadline:
+                return (next_frontier, ConnectionLimitEnum.DEADLINE)
+            for friend in adjacency.get(node, []):
+                if friend in discovered:
+                    parents[friend].append(node)
+                elif friend not in parents:
+                    parents[friend] = [node]
+                    discovered.add(friend)
+                    next_frontier.append(friend)
+                    if max_parents is not None and len(parents) > max_parents:
+                        return (next_frontier, ConnectionLimitEnum.MAX_VISITED)
+        return (next_frontier, None)
+
+    @staticmethod
+    def bidirectional_bfs(  # pylint: disable=too-many-locals
+        neighbors: NeighborsFn,
+        source: int,
+        target: int,
+        limits: SearchLimits | None = None
+    ) -> SearchResult:
+        """
+        Get the shorter path between two nodes growing the search from both ends at once.
+
+        Each step expands the whole frontier level of the smaller side with a single call to
+        `neighbors`, and the visited nodes keep pointers to their parents instead of a copy
+        of the path. The search stops at the first level where both sides meet, or gives up
+        once one of the limits is reached, before or while expanding a level. Among the paths of the same
+        length the lexicographically smallest one is returned, as the SQL search does.
+        """
+        if source == target:
+            return SearchResult(path=[source], visited=1)
+
+        limits = limits or SearchLimits()
+        forward_parents: dict[int, list[int]] = {source: []}
+        backward_parents: dict[int, list[int]] = {target: []}
+        forward_frontier = [source]
+        backward_frontier = [target]
+        depth = 0
+
+        while forward_frontier and backward_frontier:
+            visited = len(forward_parents) + len(backward_parents)
+            limit = limits.reached(depth, visited)
+            if limit is not None:
+                return SearchResult(complete=False, limit=limit, visited=visited)
+
+            # Always expand the smaller frontier
+            expand_forward = len(forward_frontier) <= len(backward_frontier)
+            if expand_forward:
+                frontier, parents, other_parents = forward_frontier, forward_parents, backward_parents
+            else:
+                frontier, parents, other_parents = backward_frontier, backward_parents, forward_parents
+
+            (next_frontier, limit) = GraphSearch.expand_level(neighbors, frontier, parents, limits, len(other_parents))
+            if limit is not None:
+                return SearchResult(
+                    complete=False, limit=limit, visited=len(forward_parents) + len(backward_parents))
+            meetings = [friend for friend in next_frontier if friend in other_parents]
+            depth += 1
+
+            # Every meeting node of the level gives a path of the same length
+            if meetings:
+                return SearchResult(
+                    path=GraphSearch.build_path(source, meetings, forward_parents, backward_parents),
+                    visited=len(forward_parents) + len(backward_parents))
+
+            if expand_forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+        return SearchResult(visited=len(forward_parents) + len(backward_parents))
+
+    @staticmethod
+    def single_source_bfs(  # pylint: disable=too-many-locals
+        neighbors: NeighborsFn,
+        source: int,
+        targets: Iterable[int],
+        limits: SearchLimits | None = None
+    ) -> dict[int, SearchResult]:
+        """
+        Get the shorter paths from one node to many targets growing a single search tree.
+
+        The tree is expanded one whole level at a time until every target is reached, the
+        graph is exhausted or one of the limits is reached, before or while expanding a level.
+        """
+        limits = limits or SearchLimits()
+        parents: dict[int, list[int]] = {source: []}
+        pending = set(targets)
+        results: dict[int, SearchResult] = {}
+        frontier = [source]
+        depth = 0
+
+        while True:
+            # Collect the targets reached by the last level
+            for target in [target for target in pending if target in parents]:
+                path = GraphSearch.build_path(source, [target], parents, {target: []})
+                results[target] = SearchResult(path=path, visited=len(parents))
+                pending.discard(target)
+            if not pending or not frontier:
+                break
+
+            limit = limits.reached(depth, len(parents))
+            if limit is None:
+                (frontier, limit) = GraphSearch.expand_level(neighbors, frontier, parents, limits)
+            if limit is not None:
+                for target in pending:
+                    results[target] = SearchResult(complete=False, limit=limit, visited=len(parents))
+                return results
+            depth += 1
+
+        # The graph reachable from the source is exhausted
+        for target in pending:
+            results[target] = SearchResult(visited=len(parents))
+        return results
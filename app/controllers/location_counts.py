@@ -0,0 +1,79 @@
+"""
+Number of profiles of each location.
+"""
+from collections import Counter
+from typing import Iterable
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.models import profile_location_counts
+from app.models.profile import CityFacet, LocationFacetsResponse, StateFacet, ZipcodeFacet
+
+# Location of a profile as (state, city, zipcode)
+Location = tuple[str | None, str | None, str | None]
+
+
+class LocationCounts:
+    """
+    Summary table with the number of profiles of each (state, city, zipcode).
+
+    The profile writes apply their changes to the counts in the same transaction, so the
+    location facets are read from the summary rows instead of grouping the profiles table.
+    """
+
+    @staticmethod
+    def location(profile) -> Location:
+        """
+        Get the location of a profile
+        """
+        return (profile.state, profile.city, profile.zipcode)
+
+    @staticmethod
+    def upsert_statement(deltas: Counter[Location]):
+        """
+        Get the upsert adding the changes of the number of profiles of each location, or None
+        when nothing changes. The rows are written in a stable order so the concurrent writers
+        do not deadlock.
+        """
+        rows = [{"state": state, "city": city, "zipcode": zipcode, "profiles": delta}
+                for ((state, city, zipcode), delta) in sorted(
+                    deltas.items(), key=lambda item: tuple((value is None, value or "") for value in item[0]))
+                if delta != 0]
+        if not rows:
+            return None
+        stmt = pg_insert(profile_location_counts).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[profile_location_counts.c.state, profile_location_counts.c.city,
+                            profile_location_counts.c.zipcode],
+            set_={"profiles": profile_location_counts.c.profiles + stmt.excluded.profiles})
+
+    @staticmethod
+    async def apply(db: AsyncSession, deltas: Counter[Location]):
+        """
+        Add the changes of the number of profiles of each location with a single statement
+        """
+        stmt = LocationCounts.upsert_statement(deltas)
+        if stmt is not None:
+            await db.execute(stmt)
+
+    @staticmethod
+    def build_facets(rows: Iterable[tuple[str | None, str | None, str | None, int]]) -> LocationFacetsResponse:
+        """
+        Build the state, city and zipcode tree from the (state, city, zipcode, profiles) rows
+        ordered by location
+        """
+        states: dict[str | None, StateFacet] = {}
+        cities: dict[tuple[str | None, str | None], CityFacet] = {}
+        total = 0
+        for (state, city, zipcode, profiles) in rows:
+            state_facet = states.get(state)
+            if state_facet is None:
+                state_facet = states[state] = StateFacet(state=state, profiles=0, cities=[])
+            city_facet = cities.get((state, city))
+            if city_facet is None:
+                city_facet = cities[(state, city)] = CityFacet(city=city, profiles=0, zipcodes=[])
+                state_facet.cities.append(city_facet)
+            city_facet.zipcodes.append(ZipcodeFacet(zipcode=zipcode, profiles=profiles))
+            city_facet.profiles += profiles
+            state_facet.profiles += profiles
+            total += profiles
+        return LocationFacetsResponse(total=total, states=list(states.values()))
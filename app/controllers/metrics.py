@@ -0,0 +1,74 @@
+"""
+Prometheus metrics of the service
+"""
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from app.controllers.graph_search import SearchResult
+from app.db.config import async_engine, engine, replica_engine
+
+# Requests by route template, as the paths with ids would create a series per profile
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latency of the HTTP requests", ["method", "route", "status"])
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ["method"])
+# Route label of the requests not matching any route
+UNMATCHED_ROUTE = "unmatched"
+
+# Connection searches by the strategy that ran them
+CONNECTION_VISITED = Histogram(
+    "connection_search_visited_profiles", "Profiles visited by a connection search", ["mode"],
+    buckets=(1, 10, 100, 1000, 10000, 100000, 1000000))
+CONNECTION_PATH_LENGTH = Histogram(
+    "connection_path_length", "Hops of the connections found", ["mode"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10))
+
+FRIENDSHIPS_CREATED = Counter("friendships_created", "Friendship relationships created")
+FRIENDSHIPS_DELETED = Counter("friendships_deleted", "Friendship relationships deleted")
+PROFILE_SEARCHES = Counter(
+    "profile_searches", "Profile name searches by endpoint and search strategy", ["endpoint", "mode"])
+
+
+def observe_connection_search(mode: str, result: SearchResult, visited: bool = True):
+    """
+    Record the profiles visited by a connection search and the length of the connection found.
+    The visited profiles are skipped for the results sharing the traversal of another one.
+    """
+    if visited:
+        CONNECTION_VISITED.labels(mode).observe(result.visited)
+    if result.path:
+        CONNECTION_PATH_LENGTH.labels(mode).observe(len(result.path) - 1)
+
+
+class PoolCollector:  # pylint: disable=too-few-public-methods
+    """
+    Read the usage of the database connection pools when the metrics are scraped.
+    """
+
+    def collect(self):
+        """
+        Get the pool gauges and the checkout counters
+        """
+        size = GaugeMetricFamily("db_pool_size", "Connections kept open by the pool", labels=["pool"])
+        connections = GaugeMetricFamily(
+            "db_pool_connections", "Connections of the pool by state", labels=["pool", "state"])
+        checkouts = CounterMetricFamily("db_pool_checkouts", "Connections handed out by the pool", labels=["pool"])
+        timeouts = CounterMetricFamily(
+            "db_pool_timeouts", "Checkouts that gave up waiting for a connection", labels=["pool"])
+        wait = CounterMetricFamily(
+            "db_pool_wait_seconds", "Time spent getting a connection from the pool", labels=["pool"])
+        pools = (("requests", async_engine), ("background", engine), ("replica", replica_engine))
+        for (name, pool_engine) in pools:
+            if pool_engine is None:
+                continue
+            pool = pool_engine.pool
+            size.add_metric([name], pool.size())
+            connections.add_metric([name, "checked_out"], pool.checkedout())
+            connections.add_metric([name, "idle"], pool.checkedin())
+            connections.add_metric([name, "overflow"], max(pool.overflow(), 0))
+            checkouts.add_metric([name], pool.metrics.checkouts)
+            timeouts.add_metric([name], pool.metrics.timeouts)
+            wait.add_metric([name], pool.metrics.wait_seconds)
+        return [size, connections, checkouts, timeouts, wait]
+
+
+REGISTRY.register(PoolCollector())
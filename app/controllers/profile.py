@@ -1,21 +1,96 @@
 """
 Logic for managing profiles.
 """
+import re
 import math
-from sqlalchemy import asc, desc, select
+import json
+import base64
+import binascii
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterable, Iterable
+from urllib.parse import urlencode
+from pydantic import ValidationError
+from sqlalchemy import (and_, asc, case, delete, desc, func, insert, literal_column, or_, select, text, tuple_, union,
+                        union_all)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.controllers.db_types import OrderEnum, ProfileOrderFieldEnum
-from app.db.models import Profile as ProfileModel, friendship
-from app.models.profile import ProfileBase, ProfileResponse, PaginatedProfileResponse
+from app.config import RECOMMENDATIONS_TOP_K, PROFILE_BULK_BATCH_SIZE, PROFILE_SEARCH_MODE
+from app.controllers.db_types import (BulkStatusEnum, OrderEnum, PaginationEnum, ProfileOrderFieldEnum,
+                                      ProfileSearchModeEnum, TotalModeEnum)
+from app.controllers.friendship import Friendship
+from app.controllers.graph_index import GraphIndex, graph_index
+from app.controllers.location_counts import LocationCounts
+from app.controllers.metrics import PROFILE_SEARCHES
+from app.controllers.profile_cache import profile_cache
+from app.controllers.recommendations import recommendation_index
+from app.db.models import Profile as ProfileModel, friendship, profile_location_counts
+from app.models.profile import (ProfileBase, ProfileResponse, PaginatedProfileResponse,
+                                MutualCount, MutualCountsResponse, RecommendationResponse,
+                                RecommendationsResponse, ProfileBulkResult, ProfileBulkResponse,
+                                ProfileSuggestion, LocationFacetsResponse)
 
+# Full-text document of the profile names, matching the expression of the ix_profiles_name_search index
+NAME_SEARCH_VECTOR = literal_column(
+    "to_tsvector('simple', coalesce(profiles.first_name, '') || ' ' || coalesce(profiles.last_name, ''))")
 
-class Profile:
+
+@dataclass
+class ProfileCursor:
+    """
+    Position of a profile in a sorted listing. `forward` cursors point to the next page and
+    backward ones to the previous page.
+    """
+    value: Any
+    id: int
+    forward: bool = True
+
+
+@dataclass
+class ProfileFilters:
+    """
+    Structured filters of the profile listing. Each location filter matches any of its values.
+    """
+    city: list[str] | None = None
+    state: list[str] | None = None
+    zipcode: list[str] | None = None
+    available: bool | None = None
+
+    def conditions(self) -> list:
+        """
+        Get the conditions of the filters, a single value is an equality so it can use the
+        composite indexes ordered by the sort field
+        """
+        conditions = []
+        for (column, values) in ((ProfileModel.city, self.city), (ProfileModel.state, self.state),
+                                 (ProfileModel.zipcode, self.zipcode)):
+            if values:
+                conditions.append(column == values[0] if len(values) == 1 else column.in_(values))
+        if self.available is not None:
+            conditions.append(ProfileModel.available == self.available)
+        return conditions
+
+    def url_params(self) -> str:
+        """
+        Get the query string of the filters to keep them in the next and previous urls
+        """
+        params = [(name, value) for name in ("city", "state", "zipcode") for value in getattr(self, name) or []]
+        if self.available is not None:
+            params.append(("available", str(self.available).lower()))
+        return f"&{urlencode(params)}" if params else ""
+
+
+class Profile:  # pylint: disable=too-many-public-methods
     """
     Logic for managing profiles.
     """
 
+    # Name search strategy resolved on startup from the installed extensions
+    search_mode = ProfileSearchModeEnum.TRIGRAM
+
     @staticmethod
-    async def create(db: Session, profile: ProfileBase) -> ProfileModel:
+    async def create(db: AsyncSession, profile: ProfileBase) -> ProfileModel:
         """
         Create a new profile
         """
@@ -31,78 +106,373 @@ class Profile:
             available=profile.available
         )
         db.add(db_profile)
-        db.commit()
-        db.refresh(db_profile)
+        await LocationCounts.apply(db, Counter([LocationCounts.location(db_profile)]))
+        await db.commit()
+        await db.refresh(db_profile)
         return db_profile
 
+    @staticmethod
+    async def insert_batch(db: AsyncSession, batch: list[tuple[int, ProfileBase]]) -> list[ProfileBulkResult]:
+        """
+        Insert a batch of validated profiles with a single statement and commit it
+        """
+        stmt = insert(ProfileModel).returning(
+            ProfileModel.id, ProfileModel.created_at, ProfileModel.updated_at, sort_by_parameter_order=True)
+        rows = (await db.execute(stmt, [profile.model_dump() for (_, profile) in batch])).all()
+        await LocationCounts.apply(db, Counter(LocationCounts.location(profile) for (_, profile) in batch))
+        await db.commit()
+        return [ProfileBulkResult(index=index, status=BulkStatusEnum.CREATED, id=row.id,
+                                  created_at=row.created_at, updated_at=row.updated_at)
+                for ((index, _), row) in zip(batch, rows)]
+
+    @staticmethod
+    async def bulk_create(db: AsyncSession, records: AsyncIterable[Any]) -> ProfileBulkResponse:
+        """
+        Create many profiles from decoded JSON records or raw JSON lines.
+
+        The valid records are inserted in batches returning the generated fields, each batch
+        committed on its own, and the invalid ones are reported without stopping the ingest.
+        """
+        results: list[ProfileBulkResult] = []
+        batch: list[tuple[int, ProfileBase]] = []
+        index = 0
+        async for record in records:
+            try:
+                if isinstance(record, (str, bytes)):
+                    profile = ProfileBase.model_validate_json(record)
+                else:
+                    profile = ProfileBase.model_validate(record)
+                batch.append((index, profile))
+            except ValidationError as e:
+                errors = [f"{'.'.join(str(loc) for loc in error['loc']) or 'record'}: {error['msg']}"
+                          for error in e.errors()]
+                results.append(ProfileBulkResult(index=index, status=BulkStatusEnum.FAILED, errors=errors))
+            index += 1
+            if len(batch) >= PROFILE_BULK_BATCH_SIZE:
+                results.extend(await Profile.insert_batch(db, batch))
+                batch = []
+        if batch:
+            results.extend(await Profile.insert_batch(db, batch))
+
+        results.sort(key=lambda result: result.index)
+        failed = sum(1 for result in results if result.status == BulkStatusEnum.FAILED)
+        return ProfileBulkResponse(succeeded=len(results) - failed, failed=failed, results=results)
+
+    @staticmethod
+    def encode_cursor(profile: ProfileModel, field: ProfileOrderFieldEnum, order: OrderEnum, forward: bool) -> str:
+        """
+        Encode an opaque cursor pointing after (forward) or before (backward) a profile
+        """
+        value = getattr(profile, field.value)
+        data = {
+            "f": field.value,
+            "o": order.value,
+            "v": value.isoformat() if isinstance(value, datetime) else value,
+            "id": profile.id,
+            "d": "next" if forward else "prev",
+        }
+        return base64.urlsafe_b64encode(json.dumps(data).encode("utf-8")).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, field: ProfileOrderFieldEnum, order: OrderEnum) -> ProfileCursor:
+        """
+        Decode a cursor, it must belong to the same sort field and order
+        """
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            if data["f"] != field.value or data["o"] != order.value or data["d"] not in ("next", "prev"):
+                raise ValueError("Cursor of another sort")
+            value = data["v"]
+            if value is not None and field in (ProfileOrderFieldEnum.CREATED_AT, ProfileOrderFieldEnum.UPDATED_AT):
+                value = datetime.fromisoformat(value)
+            return ProfileCursor(value=value, id=int(data["id"]), forward=data["d"] == "next")
+        except (KeyError, TypeError, ValueError, binascii.Error) as e:
+            raise ValueError(f"Invalid cursor: {e}") from e
+
+    @staticmethod
+    def cursor_segments(field: ProfileOrderFieldEnum, ascending: bool, cursor: ProfileCursor | None) -> list:
+        """
+        Get the conditions of the profiles placed after a cursor, split in the segments of the scan
+        order. NULL values go last in ascending order and first in descending order, as in the
+        indexes, and each segment keeps a range condition that the index on the field can seek.
+        """
+        column = getattr(ProfileModel, field.value)
+        if ascending:
+            if cursor is None:
+                return [column.isnot(None), column.is_(None)]
+            if cursor.value is None:
+                return [and_(column.is_(None), ProfileModel.id > cursor.id)]
+            return [tuple_(column, ProfileModel.id) > tuple_(cursor.value, cursor.id), column.is_(None)]
+        if cursor is None:
+            return [column.is_(None), column.isnot(None)]
+        if cursor.value is None:
+            return [and_(column.is_(None), ProfileModel.id < cursor.id), column.isnot(None)]
+        return [tuple_(column, ProfileModel.id) < tuple_(cursor.value, cursor.id)]
+
+    @staticmethod
+    async def load_search_mode(db: AsyncSession):
+        """
+        Resolve the name search strategy, the trigram search needs the pg_trgm extension
+        """
+        mode = ProfileSearchModeEnum(PROFILE_SEARCH_MODE)
+        if mode == ProfileSearchModeEnum.AUTO:
+            installed = (await db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"))).first()
+            mode = ProfileSearchModeEnum.TRIGRAM if installed else ProfileSearchModeEnum.FULLTEXT
+        Profile.search_mode = mode
+
+    @staticmethod
+    def prefix_tsquery(q: str) -> str | None:
+        """
+        Build a full-text query matching the words that start with each word of the search
+        """
+        words = re.findall(r"\w+", q.lower())
+        return " & ".join(f"{word}:*" for word in words) or None
+
+    @staticmethod
+    def search_condition(q: str):
+        """
+        Get the name search condition. The substring search is served by the trigram indexes and
+        the full-text search by the names document index.
+        """
+        tsquery = Profile.prefix_tsquery(q)
+        if Profile.search_mode == ProfileSearchModeEnum.FULLTEXT and tsquery:
+            return NAME_SEARCH_VECTOR.op("@@")(func.to_tsquery("simple", tsquery))
+        return ProfileModel.first_name.ilike(f"%{q}%") | ProfileModel.last_name.ilike(f"%{q}%")
+
+    @staticmethod
+    def search_relevance(q: str):
+        """
+        Get the relevance of a name for a search: exact names first, then names starting with it
+        """
+        return case(
+            (or_(func.lower(ProfileModel.first_name) == q.lower(), func.lower(ProfileModel.last_name) == q.lower()), 0),
+            (or_(ProfileModel.first_name.ilike(f"{q}%"), ProfileModel.last_name.ilike(f"{q}%")), 1),
+            else_=2
+        )
+
+    @staticmethod
+    def name_prefix_select(column, prefix: str, limit: int):
+        """
+        Get the statement selecting the first profiles whose name starts with a prefix, served by
+        the range scan of the lowercase byte-wise ordered name index
+        """
+        key = func.lower(column).collate("C")
+        pattern = re.sub(r"([\\%_])", r"\\\1", prefix.lower()) + "%"
+        return (
+            select(ProfileModel.id, ProfileModel.first_name, ProfileModel.last_name, ProfileModel.img,
+                   key.label("key"))
+            .where(key.like(pattern))
+            .order_by(key, ProfileModel.id)
+            .limit(limit)
+        )
+
+    @staticmethod
+    async def autocomplete(db: AsyncSession, prefix: str, limit: int = 10) -> list[ProfileSuggestion]:
+        """
+        Get the profiles whose first or last name starts with a prefix, ordered by the matched
+        name. Each name is scanned up to the limit in a single statement.
+        """
+        PROFILE_SEARCHES.labels("autocomplete", "prefix").inc()
+        stmt = union_all(
+            Profile.name_prefix_select(ProfileModel.first_name, prefix, limit),
+            Profile.name_prefix_select(ProfileModel.last_name, prefix, limit)
+        )
+        rows = sorted((await db.execute(stmt)).all(), key=lambda row: (row.key, row.id))
+        suggestions = {}
+        for row in rows:
+            if row.id not in suggestions and len(suggestions) < limit:
+                suggestions[row.id] = ProfileSuggestion.model_validate(row)
+        return list(suggestions.values())
+
+    @staticmethod
+    async def estimate_count(db: AsyncSession, stmt) -> int:
+        """
+        Estimate the rows of a statement from the planner statistics without running it
+        """
+        connection = await db.connection()
+        # The IN lists of the filters are expanded so the statement can be explained
+        compiled = stmt.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+        params = tuple(compiled.params[name] for name in compiled.positiontup or ())
+        plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    @staticmethod
+    async def count_total(db: AsyncSession, stmt, total_mode: TotalModeEnum) -> int | None:
+        """
+        Get the total of a paginated statement: exact count, planner estimate or none
+        """
+        if total_mode == TotalModeEnum.EXACT:
+            return await db.scalar(
+                select(func.count()).select_from(stmt.order_by(None).subquery()))  # pylint: disable=not-callable
+        if total_mode == TotalModeEnum.ESTIMATE:
+            return await Profile.estimate_count(db, stmt)
+        return None
+
+    @staticmethod
+    def clamp_skip(skip: int, limit: int, total: int | None, total_mode: TotalModeEnum) -> int:
+        """
+        Ensure skip is not greater than total, only when the total is exact
+        """
+        if total_mode == TotalModeEnum.EXACT and skip >= total:
+            base_mult = math.floor(total / limit)
+            return limit * base_mult
+        return skip
+
     @staticmethod
     async def get_all(  # pylint: disable=too-many-arguments, too-many-locals
-        db: Session,
+        db: AsyncSession,
         base_url: str,
         q: str = None,
         skip: int = 0,
         limit: int = 10,
         field: ProfileOrderFieldEnum = ProfileOrderFieldEnum.CREATED_AT,
-        order: OrderEnum = OrderEnum.ASC
+        order: OrderEnum = OrderEnum.ASC,
+        pagination: PaginationEnum = PaginationEnum.OFFSET,
+        cursor: ProfileCursor | None = None,
+        total_mode: TotalModeEnum = TotalModeEnum.EXACT,
+        rank: bool = False,
+        filters: ProfileFilters | None = None
     ) -> PaginatedProfileResponse:
         """
-        Get all profiles using pagination
+        Get all profiles using pagination. Without the exact total, one extra row tells if
+        there is a next page. Searches can be ranked by relevance with offset pagination.
         """
-        query = db.query(ProfileModel)
+        query = select(ProfileModel)
+        filters = filters or ProfileFilters()
 
         # Filter profiles by name or last name
         if q:
-            query = query.filter(
-                ProfileModel.first_name.ilike(f"%{q}%") |
-                ProfileModel.last_name.ilike(f"%{q}%")
-            )
+            query = query.where(Profile.search_condition(q))
+            PROFILE_SEARCHES.labels("listing", Profile.search_mode.value).inc()
 
-        # Order profiles result by field and order
-        order_func = asc if order == OrderEnum.ASC else desc
-        query = query.order_by(order_func(getattr(ProfileModel, field.value)))
+        # Filter profiles by location and availability
+        query = query.where(*filters.conditions())
 
         # Get total of profiles for pagination
-        total = query.count()
+        total = await Profile.count_total(db, query, total_mode)
+
+        if pagination == PaginationEnum.CURSOR:
+            return await Profile.get_page_by_cursor(db, query, total, total_mode, base_url, q, limit, field, order,
+                                                    cursor, filters)
+
+        # Order profiles result by field and order, the id breaks the ties
+        order_func = asc if order == OrderEnum.ASC else desc
+        if q and rank:
+            query = query.order_by(Profile.search_relevance(q))
+        query = query.order_by(order_func(getattr(ProfileModel, field.value)), order_func(ProfileModel.id))
 
         # Ensure skip is not greater than total
-        if skip >= total:
-            base_mult = math.floor(total / limit)
-            skip = limit * base_mult
+        skip = Profile.clamp_skip(skip, limit, total, total_mode)
 
         # Get profiles data
-        profiles_db = query.offset(skip).limit(limit).all()
+        profiles_db = (await db.scalars(query.offset(skip).limit(limit + 1))).all()
+        has_next = len(profiles_db) > limit
         profiles = [ProfileResponse.model_validate(
-            profile) for profile in profiles_db]
+            profile) for profile in profiles_db[:limit]]
 
         # Get next and previous page urls
+        total_param = f"&total={total_mode.value}" if total_mode != TotalModeEnum.EXACT else ""
+        total_param += "&rank=true" if q and rank else ""
+        total_param += filters.url_params()
         next_skip = skip + limit
-        next_url = f"{base_url}?{f'q={q}&' if q else ''}skip={next_skip}&limit={limit}&field={field.value}&order={order.value}" if next_skip < total else None  # pylint: disable=line-too-long
+        next_url = f"{base_url}?{f'q={q}&' if q else ''}skip={next_skip}&limit={limit}&field={field.value}&order={order.value}{total_param}" if has_next else None  # pylint: disable=line-too-long
         previous_skip = skip - limit
-        previous_url = f"{base_url}?{f'q={q}&' if q else ''}skip={previous_skip}&limit={limit}&field={field.value}&order={order.value}" if previous_skip >= 0 else None  # pylint: disable=line-too-long
+        previous_url = f"{base_url}?{f'q={q}&' if q else ''}skip={previous_skip}&limit={limit}&field={field.value}&order={order.value}{total_param}" if previous_skip >= 0 else None  # pylint: disable=line-too-long
 
         # Return paginated profiles
         return PaginatedProfileResponse(
             total=total,
+            total_mode=total_mode,
             next_url=next_url,
             previous_url=previous_url,
             profiles=profiles,
         )
 
     @staticmethod
-    async def get(db: Session, profile_id: int) -> ProfileModel | None:
+    async def get_page_by_cursor(  # pylint: disable=too-many-arguments, too-many-locals
+        db: AsyncSession,
+        query,
+        total: int | None,
+        total_mode: TotalModeEnum,
+        base_url: str,
+        q: str | None,
+        limit: int,
+        field: ProfileOrderFieldEnum,
+        order: OrderEnum,
+        cursor: ProfileCursor | None,
+        filters: ProfileFilters | None = None
+    ) -> PaginatedProfileResponse:
+        """
+        Get a page of profiles placed after or before a cursor keyed on (sort field, id).
+
+        The previous pages are scanned in the reverse order and flipped, and one extra row
+        tells if there are more profiles in the scan direction.
+        """
+        forward = cursor is None or cursor.forward
+        ascending = (order == OrderEnum.ASC) == forward
+        order_func = asc if ascending else desc
+        column = getattr(ProfileModel, field.value)
+        profiles_db = []
+        for condition in Profile.cursor_segments(field, ascending, cursor):
+            profiles_db.extend(await db.scalars(
+                query.where(condition).order_by(order_func(column), order_func(ProfileModel.id))
+                .limit(limit + 1 - len(profiles_db))))
+            if len(profiles_db) > limit:
+                break
+        has_more = len(profiles_db) > limit
+        profiles_db = profiles_db[:limit]
+        if not forward:
+            profiles_db.reverse()
+        profiles = [ProfileResponse.model_validate(
+            profile) for profile in profiles_db]
+
+        # Get next and previous page urls
+        total_param = f"&total={total_mode.value}" if total_mode != TotalModeEnum.EXACT else ""
+        total_param += filters.url_params() if filters else ""
+        url = f"{base_url}?{f'q={q}&' if q else ''}limit={limit}&field={field.value}&order={order.value}&pagination=cursor{total_param}"  # pylint: disable=line-too-long
+        has_next = (has_more if forward else cursor is not None) and profiles_db
+        has_previous = (has_more if not forward else cursor is not None) and profiles_db
+        next_url = f"{url}&cursor={Profile.encode_cursor(profiles_db[-1], field, order, True)}" if has_next else None
+        previous_url = f"{url}&cursor={Profile.encode_cursor(profiles_db[0], field, order, False)}" if has_previous else None  # pylint: disable=line-too-long
+
+        # Return paginated profiles
+        return PaginatedProfileResponse(
+            total=total,
+            total_mode=total_mode,
+            next_url=next_url,
+            previous_url=previous_url,
+            profiles=profiles,
+        )
+
+    @staticmethod
+    async def get(db: AsyncSession, profile_id: int) -> ProfileModel | None:
         """
         Get a profile by id
         """
-        return db.query(ProfileModel).filter(ProfileModel.id == profile_id).first()
+        return await db.scalar(select(ProfileModel).where(ProfileModel.id == profile_id))
 
     @staticmethod
-    async def update(db: Session, profile_id: int, profile: ProfileBase) -> ProfileModel | None:
+    async def get_response(db: AsyncSession, profile_id: int) -> ProfileResponse | None:
         """
-        Update a profile by id
+        Get the response of a profile by id through the profile cache
         """
-        db_profile = db.query(ProfileModel).filter(
-            ProfileModel.id == profile_id).first()
+        async def load() -> ProfileResponse | None:
+            db_profile = await Profile.get(db, profile_id)
+            return ProfileResponse.model_validate(db_profile) if db_profile else None
+
+        return await profile_cache.get_or_load(profile_id, load)
+
+    @staticmethod
+    async def update(db: AsyncSession, profile_id: int, profile: ProfileBase) -> ProfileModel | None:
+        """
+        Update a profile by id, the row is locked to move its location count only once
+        """
+        db_profile = await db.scalar(
+            select(ProfileModel).where(ProfileModel.id == profile_id).with_for_update())
         if db_profile:
+            previous_location = LocationCounts.location(db_profile)
             db_profile.img = profile.img
             db_profile.first_name = profile.first_name
             db_profile.last_name = profile.last_name
@@ -112,34 +482,78 @@ class Profile:
             db_profile.state = profile.state
             db_profile.zipcode = profile.zipcode
             db_profile.available = profile.available
-            db.commit()
-            db.refresh(db_profile)
+            deltas = Counter([LocationCounts.location(db_profile)])
+            deltas.subtract([previous_location])
+            await LocationCounts.apply(db, deltas)
+            await db.commit()
+            await profile_cache.invalidate(profile_id)
+            await db.refresh(db_profile)
             return db_profile
         return None
 
     @staticmethod
-    async def delete(db: Session, profile_id: int) -> ProfileModel | None:
+    async def delete(db: AsyncSession, profile_id: int) -> ProfileModel | None:
         """
-        Delete a profile by id
+        Delete a profile by id with its friendship relationships, which are removed from the
+        in-memory graph structures after the commit
         """
-        db_profile = db.query(ProfileModel).filter(
-            ProfileModel.id == profile_id).first()
+        db_profile = await db.scalar(
+            select(ProfileModel).where(ProfileModel.id == profile_id).with_for_update())
         if db_profile:
-            db.delete(db_profile)
-            db.commit()
+            edges = (await db.execute(
+                delete(friendship)
+                .where(or_(friendship.c.profile_id == profile_id, friendship.c.friend_id == profile_id))
+                .returning(friendship.c.profile_id, friendship.c.friend_id)
+            )).all()
+            await db.delete(db_profile)
+            await LocationCounts.apply(db, Counter({LocationCounts.location(db_profile): -1}))
+            await db.commit()
+            for (edge_profile_id, edge_friend_id) in edges:
+                Friendship.on_deleted(edge_profile_id, edge_friend_id)
+            await profile_cache.invalidate(profile_id)
             return db_profile
         return None
 
     @staticmethod
-    async def get_friends(  # pylint: disable=too-many-locals
-        db: Session,
+    async def get_location_facets(
+        db: AsyncSession,
+        state: str | None = None,
+        city: str | None = None,
+        q: str | None = None
+    ) -> LocationFacetsResponse:
+        """
+        Get the number of profiles by state, city and zipcode from the location counts. The
+        name search can't be summarized, so the profiles it matches are grouped instead.
+        """
+        if q:
+            PROFILE_SEARCHES.labels("facets", Profile.search_mode.value).inc()
+            profiles = func.count(ProfileModel.id)  # pylint: disable=not-callable
+            query = (select(ProfileModel.state, ProfileModel.city, ProfileModel.zipcode, profiles)
+                     .where(Profile.search_condition(q))
+                     .group_by(ProfileModel.state, ProfileModel.city, ProfileModel.zipcode))
+            columns = ProfileModel
+        else:
+            query = select(profile_location_counts).where(profile_location_counts.c.profiles > 0)
+            columns = profile_location_counts.c
+        if state is not None:
+            query = query.where(columns.state == state)
+        if city is not None:
+            query = query.where(columns.city == city)
+        query = query.order_by(columns.state, columns.city, columns.zipcode)
+        return LocationCounts.build_facets((await db.execute(query)).tuples().all())
+
+    @staticmethod
+    async def get_friends(  # pylint: disable=too-many-arguments, too-many-locals
+        db: AsyncSession,
         profile_id: int,
         base_url: str,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        total_mode: TotalModeEnum = TotalModeEnum.EXACT
     ) -> PaginatedProfileResponse:
         """
-        Get all friends of a profile by id
+        Get all friends of a profile by id. The friends are counted exactly from the graph
+        index when it is loaded, whatever the total mode.
         """
         # Subquery to get friend IDs
         friend_ids_select = select(friendship.c.friend_id).where(
@@ -148,22 +562,93 @@ class Profile:
             friendship.c.friend_id == profile_id)
 
         # Query to get friend profiles
-        query = db.query(ProfileModel).filter(
+        query = select(ProfileModel).where(
             ProfileModel.id.in_(friend_ids_select) |
-            ProfileModel.id.in_(inverse_friend_ids_select))
+            ProfileModel.id.in_(inverse_friend_ids_select)).order_by(ProfileModel.id)
 
         # Get total number of friends for pagination
-        total = query.count()
+        total_param = f"&total={total_mode.value}" if total_mode != TotalModeEnum.EXACT else ""
+        if total_mode != TotalModeEnum.NONE and graph_index.is_ready:
+            total_mode = TotalModeEnum.EXACT
+            total = len(graph_index.get_friends(profile_id))
+        else:
+            total = await Profile.count_total(db, query, total_mode)
+
+        # Ensure skip is not greater than total
+        skip = Profile.clamp_skip(skip, limit, total, total_mode)
+
+        # Get friends data
+        friends_db = (await db.scalars(query.offset(skip).limit(limit + 1))).all()
+        has_next = len(friends_db) > limit
+        friends_list = [ProfileResponse.model_validate(
+            friend) for friend in friends_db[:limit]]
+
+        # Get next and previous page urls
+        next_skip = skip + limit
+        next_url = f"{base_url}?skip={next_skip}&limit={limit}{total_param}" if has_next else None
+        previous_skip = skip - limit
+        previous_url = f"{base_url}?skip={previous_skip}&limit={limit}{total_param}" if previous_skip >= 0 else None
+
+        # Return paginated friends
+        return PaginatedProfileResponse(
+            total=total,
+            total_mode=total_mode,
+            next_url=next_url,
+            previous_url=previous_url,
+            profiles=friends_list,
+        )
+
+    @staticmethod
+    def friend_ids_select(profile_id: int):
+        """
+        Get the statement selecting the friend ids of a profile in both directions
+        """
+        return union(
+            select(friendship.c.friend_id.label("id"))
+            .where(friendship.c.profile_id == profile_id),
+            select(friendship.c.profile_id.label("id"))
+            .where(friendship.c.friend_id == profile_id)
+        )
+
+    @staticmethod
+    async def get_mutual_friends(  # pylint: disable=too-many-arguments, too-many-locals
+        db: AsyncSession,
+        profile_id: int,
+        other_id: int,
+        base_url: str,
+        skip: int = 0,
+        limit: int = 10
+    ) -> PaginatedProfileResponse:
+        """
+        Get the friends shared by two profiles ordered by id.
+
+        With the graph index loaded the sorted friend lists are intersected in memory and only
+        the profiles of the page are loaded, otherwise the intersection runs in the database.
+        """
+        if graph_index.is_ready:
+            mutual_ids = graph_index.get_mutual_friends(profile_id, other_id)
+            total = len(mutual_ids)
+        else:
+            query = select(ProfileModel).where(
+                ProfileModel.id.in_(Profile.friend_ids_select(profile_id)),
+                ProfileModel.id.in_(Profile.friend_ids_select(other_id))
+            ).order_by(ProfileModel.id)
+            total = await Profile.count_total(db, query, TotalModeEnum.EXACT)
 
         # Ensure skip is not greater than total
         if skip >= total:
             base_mult = math.floor(total / limit)
             skip = limit * base_mult
 
-        # Get friends data
-        friends_db = query.offset(skip).limit(limit).all()
-        friends_list = [ProfileResponse.model_validate(
-            friend) for friend in friends_db]
+        # Get mutual friends data
+        if graph_index.is_ready:
+            page_ids = mutual_ids[skip:skip + limit]
+            mutual_db = (await db.scalars(select(ProfileModel).where(
+                ProfileModel.id.in_(page_ids)).order_by(ProfileModel.id))).all() if page_ids else []
+        else:
+            mutual_db = (await db.scalars(query.offset(skip).limit(limit))).all()
+        mutual_list = [ProfileResponse.model_validate(
+            friend) for friend in mutual_db]
 
         # Get next and previous page urls
         next_skip = skip + limit
@@ -171,10 +656,88 @@ class Profile:
         previous_skip = skip - limit
         previous_url = f"{base_url}?skip={previous_skip}&limit={limit}" if previous_skip >= 0 else None
 
-        # Return paginated friends
+        # Return paginated mutual friends
         return PaginatedProfileResponse(
             total=total,
             next_url=next_url,
             previous_url=previous_url,
-            profiles=friends_list,
+            profiles=mutual_list,
+        )
+
+    @staticmethod
+    async def query_mutual_counts(db: AsyncSession, profile_id: int, profile_ids: list[int]) -> dict[int, int]:
+        """
+        Count the friends shared by a profile with each one of many profiles in a single query
+        """
+        viewer_friends = Profile.friend_ids_select(profile_id).subquery()
+        edges = union(
+            select(friendship.c.profile_id.label("profile_id"), friendship.c.friend_id.label("friend_id"))
+            .where(friendship.c.profile_id.in_(profile_ids)),
+            select(friendship.c.friend_id, friendship.c.profile_id)
+            .where(friendship.c.friend_id.in_(profile_ids))
+        ).subquery()
+        counts_stmt = (
+            select(edges.c.profile_id, func.count())  # pylint: disable=not-callable
+            .join(viewer_friends, viewer_friends.c.id == edges.c.friend_id)
+            .group_by(edges.c.profile_id)
+        )
+        return dict((await db.execute(counts_stmt)).tuples().all())
+
+    @staticmethod
+    async def get_mutual_counts(db: AsyncSession, profile_id: int, profile_ids: Iterable[int]) -> MutualCountsResponse:
+        """
+        Get the number of friends shared by a profile with each one of many profiles
+        """
+        profile_ids = list(dict.fromkeys(profile_ids))
+        if graph_index.is_ready:
+            viewer_friends = graph_index.get_friends(profile_id)
+            counts = {other_id: len(graph_index.intersect_sorted(viewer_friends, graph_index.get_friends(other_id)))
+                      for other_id in profile_ids}
+        else:
+            counts = await Profile.query_mutual_counts(db, profile_id, profile_ids)
+        return MutualCountsResponse(
+            profile_id=profile_id,
+            counts=[MutualCount(profile_id=other_id, mutual_friends=counts.get(other_id, 0))
+                    for other_id in profile_ids],
+        )
+
+    @staticmethod
+    def build_recommendations(db: Session, graph: GraphIndex | None = None):
+        """
+        Build the friend-of-friend recommendations from the friendship table, or from the given
+        graph when it is already loaded. It runs with a synchronous session in the background
+        job, or through `AsyncSession.run_sync` on startup.
+        """
+        if graph is None:
+            graph = GraphIndex()
+            graph.load(Friendship.get_all_edges(db))
+        unavailable_stmt = select(ProfileModel.id).where(ProfileModel.available.is_(False))
+        recommendation_index.build(graph, db.scalars(unavailable_stmt), RECOMMENDATIONS_TOP_K)
+
+    @staticmethod
+    async def get_recommendations(db: AsyncSession, profile_id: int, limit: int = 10) -> RecommendationsResponse | None:
+        """
+        Get the precomputed recommendations of a profile, or None when they are not built.
+        Profiles that became friends or not available since the build are skipped.
+        """
+        snapshot = recommendation_index.snapshot
+        if snapshot is None:
+            return None
+        mutual = dict(snapshot.get(profile_id))
+        if graph_index.is_ready:
+            mutual = {other_id: count for (other_id, count) in mutual.items()
+                      if not graph_index.has_edge(profile_id, other_id)}
+        profiles_db = list(await db.scalars(select(ProfileModel).where(
+            ProfileModel.id.in_(list(mutual)),
+            ProfileModel.available.isnot(False)
+        ))) if mutual else []
+        profiles_db.sort(key=lambda profile: (-mutual[profile.id], profile.id))
+        return RecommendationsResponse(
+            profile_id=profile_id,
+            built_at=snapshot.built_at,
+            recommendations=[
+                RecommendationResponse(**ProfileResponse.model_validate(profile).model_dump(),
+                                       mutual_friends=mutual[profile.id])
+                for profile in profiles_db[:limit]
+            ],
         )
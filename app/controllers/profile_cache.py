@@ -0,0 +1,162 @@
+"""
+Read-through cache of the profiles.
+"""
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable
+from app.config import PROFILE_CACHE_MAX_BYTES, PROFILE_CACHE_TTL
+from app.controllers.cache import LRUCache
+from app.db.config import PG_REPLICA_MAX_LAG, replica_engine
+from app.models.profile import ProfileResponse
+
+
+class ProfileCacheBackend(ABC):
+    """
+    Storage of the cached profiles as serialized JSON keyed by profile id. The operations are
+    awaitable, so the in-process backend can be replaced by a shared one over the network.
+    """
+
+    @abstractmethod
+    async def get(self, profile_id: int) -> bytes | None:
+        """
+        Get a cached profile
+        """
+
+    @abstractmethod
+    async def set(self, profile_id: int, data: bytes):
+        """
+        Store a profile
+        """
+
+    @abstractmethod
+    async def delete(self, profile_id: int) -> bool:
+        """
+        Remove a profile
+        """
+
+    @abstractmethod
+    async def clear(self):
+        """
+        Remove all the profiles
+        """
+
+    @abstractmethod
+    def stats(self) -> dict:
+        """
+        Get the backend usage counters
+        """
+
+
+class MemoryProfileCacheBackend(ProfileCacheBackend):
+    """
+    In-process backend bounded by the memory used by the serialized profiles.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self._cache = LRUCache(None, ttl, max_bytes=max_bytes, size_of=sys.getsizeof)
+
+    async def get(self, profile_id: int) -> bytes | None:
+        return self._cache.get(profile_id)
+
+    async def set(self, profile_id: int, data: bytes):
+        self._cache.set(profile_id, data)
+
+    async def delete(self, profile_id: int) -> bool:
+        return self._cache.delete(profile_id)
+
+    async def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class ProfileCache:
+    """
+    Read-through cache of the profile responses.
+
+    Every invalidation bumps a version. A load records the version when it starts, and its
+    result is dropped if the profile was invalidated meanwhile, so a read racing with an
+    update never stores the old profile after the invalidation.
+
+    When the profiles are read from a replica, the loads in the settle seconds after an
+    invalidation are not stored either, as the replica may still return the old profile.
+    """
+
+    def __init__(self, backend: ProfileCacheBackend, settle_seconds: float = 0):
+        self.backend = backend
+        self.settle_seconds = settle_seconds
+        self.version = 0
+        self._loading: dict[int, int] = {}
+        self._invalidated: dict[int, int] = {}
+        self._invalidated_at: dict[int, float] = {}
+
+    def is_settling(self, profile_id: int) -> bool:
+        """
+        Check if a profile was invalidated in the last settle seconds
+        """
+        invalidated_at = self._invalidated_at.get(profile_id)
+        return invalidated_at is not None and time.monotonic() - invalidated_at < self.settle_seconds
+
+    async def get_or_load(
+        self,
+        profile_id: int,
+        load: Callable[[], Awaitable[ProfileResponse | None]]
+    ) -> ProfileResponse | None:
+        """
+        Get a profile from the cache, loading and storing it on a miss. Missing profiles are
+        not cached.
+        """
+        data = await self.backend.get(profile_id)
+        if data is not None:
+            return ProfileResponse.model_validate_json(data)
+
+        version = self.version
+        self._loading[profile_id] = self._loading.get(profile_id, 0) + 1
+        try:
+            profile = await load()
+            if (profile is not None and self._invalidated.get(profile_id, -1) <= version
+                    and not self.is_settling(profile_id)):
+                await self.backend.set(profile_id, profile.model_dump_json().encode("utf-8"))
+            return profile
+        finally:
+            self._loading[profile_id] -= 1
+            if not self._loading[profile_id]:
+                del self._loading[profile_id]
+                self._invalidated.pop(profile_id, None)
+
+    async def invalidate(self, profile_id: int):
+        """
+        Remove a profile after it was updated or deleted
+        """
+        self.version += 1
+        if profile_id in self._loading:
+            self._invalidated[profile_id] = self.version
+        if self.settle_seconds > 0:
+            now = time.monotonic()
+            # Keep the invalidations ordered by time and drop the settled ones
+            self._invalidated_at.pop(profile_id, None)
+            self._invalidated_at[profile_id] = now
+            (settled_id, invalidated_at) = next(iter(self._invalidated_at.items()))
+            while now - invalidated_at >= self.settle_seconds:
+                del self._invalidated_at[settled_id]
+                (settled_id, invalidated_at) = next(iter(self._invalidated_at.items()))
+        await self.backend.delete(profile_id)
+
+    async def clear(self):
+        """
+        Remove all the profiles
+        """
+        await self.backend.clear()
+        self._invalidated_at.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache usage counters and the invalidation version
+        """
+        return {**self.backend.stats(), "version": self.version}
+
+
+profile_cache = ProfileCache(MemoryProfileCacheBackend(PROFILE_CACHE_MAX_BYTES, PROFILE_CACHE_TTL),
+                             PG_REPLICA_MAX_LAG if replica_engine is not None else 0)
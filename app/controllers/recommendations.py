@@ -0,0 +1,121 @@
+"""
+Precomputed friend-of-friend recommendations.
+"""
+import heapq
+import logging
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable
+from app.controllers.graph_index import GraphIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RecommendationSnapshot:
+    """
+    Recommendations of every profile produced by one build.
+
+    `offsets[i]` and `offsets[i + 1]` delimit the slice of profile `i` in the `profile_ids`
+    and `mutual` arrays, ordered by mutual friends descending and profile id ascending.
+    """
+    offsets: array
+    profile_ids: array
+    mutual: array
+    built_at: datetime
+
+    def get(self, profile_id: int) -> list[tuple[int, int]]:
+        """
+        Get the (profile id, mutual friends) recommendations of a profile
+        """
+        if profile_id < 0 or profile_id >= len(self.offsets) - 1:
+            return []
+        start, end = self.offsets[profile_id], self.offsets[profile_id + 1]
+        return list(zip(self.profile_ids[start:end], self.mutual[start:end]))
+
+
+class RecommendationIndex:
+    """
+    Top-K friend-of-friend recommendations of every profile ranked by number of mutual friends.
+
+    The recommendations of all the profiles are stored in three flat arrays of an immutable
+    snapshot of the friendship table, rebuilt periodically by a background job. A build is
+    published with a single assignment, so the readers always see the arrays of one build.
+    """
+
+    def __init__(self):
+        self._snapshot: RecommendationSnapshot | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Indicate if the recommendations are built
+        """
+        return self._snapshot is not None
+
+    @property
+    def snapshot(self) -> RecommendationSnapshot | None:
+        """
+        Recommendations of the last build, None when they are not built
+        """
+        return self._snapshot
+
+    @property
+    def built_at(self) -> datetime | None:
+        """
+        Date/Time of the last build
+        """
+        snapshot = self._snapshot
+        return snapshot.built_at if snapshot is not None else None
+
+    def reset(self):
+        """
+        Drop the recommendations
+        """
+        self._snapshot = None
+
+    @staticmethod
+    def rank(graph: GraphIndex, profile_id: int, excluded: set[int], top_k: int) -> list[tuple[int, int]]:
+        """
+        Get the (profile id, mutual friends) of the top second-degree profiles of a profile,
+        skipping the profile itself, its friends and the excluded profiles
+        """
+        friends = graph.get_friends(profile_id)
+        mutual: Counter[int] = Counter()
+        for friend_id in friends:
+            mutual.update(graph.get_friends(friend_id))
+        for skipped in (profile_id, *friends):
+            mutual.pop(skipped, None)
+        candidates = ((count, candidate) for (candidate, count) in mutual.items() if candidate not in excluded)
+        top = heapq.nsmallest(top_k, candidates, key=lambda item: (-item[0], item[1]))
+        return [(candidate, count) for (count, candidate) in top]
+
+    def build(self, graph: GraphIndex, excluded: Iterable[int], top_k: int):
+        """
+        Build the recommendations of every profile of the graph. The excluded profiles, like
+        the ones not available to be friend, are never recommended.
+        """
+        excluded = set(excluded)
+        offsets = array("q", [0])
+        profile_ids = array("i")
+        mutual = array("I")
+        for profile_id in range(graph.max_profile_id + 1):
+            for (candidate, count) in self.rank(graph, profile_id, excluded, top_k):
+                profile_ids.append(candidate)
+                mutual.append(count)
+            offsets.append(len(profile_ids))
+
+        self._snapshot = RecommendationSnapshot(offsets, profile_ids, mutual, datetime.now(timezone.utc))
+        logger.info("Recommendations built for %d profiles", len(offsets) - 1)
+
+    def get(self, profile_id: int) -> list[tuple[int, int]]:
+        """
+        Get the (profile id, mutual friends) recommendations of a profile
+        """
+        snapshot = self._snapshot
+        return snapshot.get(profile_id) if snapshot is not None else []
+
+
+recommendation_index = RecommendationIndex()
@@ -1,27 +1,119 @@
-""" 
+"""
 PostgreSQL connection configuration
 """
 import os
+from typing import AsyncIterator
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from fastapi import Header
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from app.constants import MIN_LSN_HEADER
+from app.db.pool import MeteredAsyncQueuePool, MeteredQueuePool
+from app.db.query_stats import instrument_engine
 
 # Load environment variables
 load_dotenv()
 
 DATABASE_URL = f"postgresql://{os.getenv('PG_USER')}:{os.getenv('PG_PASSWORD')}@{os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}/{os.getenv('PG_DB')}"  # pylint: disable=line-too-long
+ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+
+# Optional read replica serving the read-only routes, the unset variables take the primary values
+PG_REPLICA_HOST = os.getenv("PG_REPLICA_HOST")
+REPLICA_DATABASE_URL = f"postgresql+asyncpg://{os.getenv('PG_REPLICA_USER', os.getenv('PG_USER'))}:{os.getenv('PG_REPLICA_PASSWORD', os.getenv('PG_PASSWORD'))}@{PG_REPLICA_HOST}:{os.getenv('PG_REPLICA_PORT', os.getenv('PG_PORT'))}/{os.getenv('PG_REPLICA_DB', os.getenv('PG_DB'))}" if PG_REPLICA_HOST else None  # pylint: disable=line-too-long
+# Seconds the replica may lag behind the primary, the profiles changed meanwhile are not cached from it
+PG_REPLICA_MAX_LAG = float(os.getenv("PG_REPLICA_MAX_LAG", "5"))
+
+# Connection pool of each engine: kept connections, extra connections under load, seconds waiting for a
+# connection, seconds before a connection is replaced and check of the connections before using them
+PG_POOL_SIZE = int(os.getenv("PG_POOL_SIZE", "5"))
+PG_MAX_OVERFLOW = int(os.getenv("PG_MAX_OVERFLOW", "10"))
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+PG_POOL_RECYCLE = int(os.getenv("PG_POOL_RECYCLE", "1800"))
+PG_POOL_PRE_PING = os.getenv("PG_POOL_PRE_PING", "true").lower() == "true"
+# Server side limit in milliseconds of every statement (0 disables it)
+PG_STATEMENT_TIMEOUT_MS = int(os.getenv("PG_STATEMENT_TIMEOUT_MS", "0"))
 
-engine = create_engine(DATABASE_URL)
+POOL_OPTIONS = {
+    "pool_size": PG_POOL_SIZE,
+    "max_overflow": PG_MAX_OVERFLOW,
+    "pool_timeout": PG_POOL_TIMEOUT,
+    "pool_recycle": PG_POOL_RECYCLE,
+    "pool_pre_ping": PG_POOL_PRE_PING,
+}
+
+# Synchronous engine of the scripts and the background jobs running outside the event loop
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    connect_args={"options": f"-c statement_timeout={PG_STATEMENT_TIMEOUT_MS}"},
+    **POOL_OPTIONS
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Asynchronous engine of the request handlers, the queries don't block the event loop
+ASYNC_ENGINE_OPTIONS = {
+    "poolclass": MeteredAsyncQueuePool,
+    "connect_args": {"server_settings": {"statement_timeout": str(PG_STATEMENT_TIMEOUT_MS)}},
+    **POOL_OPTIONS,
+}
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **ASYNC_ENGINE_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Asynchronous engine of the read-only routes, the primary one when there is no replica
+replica_engine = create_async_engine(REPLICA_DATABASE_URL, **ASYNC_ENGINE_OPTIONS) if REPLICA_DATABASE_URL else None
+ReplicaSessionLocal = async_sessionmaker(
+    bind=replica_engine, autoflush=False, expire_on_commit=False) if replica_engine else None
 Base = declarative_base()
 
+# Count the statements of each request and log the slow ones
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+if replica_engine is not None:
+    instrument_engine(replica_engine.sync_engine)
+
+# Position of the primary WAL after a write, and check that a server has replayed the WAL up to a position
+WRITE_LSN_QUERY = text("SELECT pg_current_wal_lsn()::text")
+REPLAYED_LSN_QUERY = text("""
+SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() ELSE pg_current_wal_lsn() END
+    >= CAST(CAST(:lsn AS text) AS pg_lsn)
+""")
+# Format of a WAL position, two hexadecimal numbers separated by a slash
+LSN_PATTERN = r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$"
 
-def get_db():
+
+async def get_db() -> AsyncIterator[AsyncSession]:
     """
     Get a database session
     """
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_read_db(
+    min_lsn: str | None = Header(
+        None, alias=MIN_LSN_HEADER, pattern=LSN_PATTERN,
+        description="WAL position of a previous write that the read must see, taken from its response")
+) -> AsyncIterator[AsyncSession]:
+    """
+    Get a database session of the read replica. When the request carries the position of a
+    previous write not replayed by the replica yet, the primary serves it instead.
+    """
+    if ReplicaSessionLocal is not None:
+        async with ReplicaSessionLocal() as db:
+            if min_lsn is None or await db.scalar(REPLAYED_LSN_QUERY, {"lsn": min_lsn}):
+                yield db
+                return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_write_lsn() -> str | None:
+    """
+    Get the current WAL position of the primary, reached by every committed write, or None
+    when there is no read replica
+    """
+    if ReplicaSessionLocal is None:
+        return None
+    async with async_engine.connect() as connection:
+        return await connection.scalar(WRITE_LSN_QUERY)
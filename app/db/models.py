@@ -1,7 +1,7 @@
 """
 Database models
 """
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.config import Base
@@ -18,12 +18,38 @@ friendship = Table(
            index=True)
 )
 
+# Define the number of profiles of each location, maintained with the profile writes
+profile_location_counts = Table(
+    "profile_location_counts",
+    Base.metadata,
+    Column("state", String, nullable=True),
+    Column("city", String, nullable=True),
+    Column("zipcode", String, nullable=True),
+    Column("profiles", Integer, nullable=False, server_default="0"),
+    Index("ix_profile_location_counts_location", "state", "city", "zipcode", unique=True,
+          postgresql_nulls_not_distinct=True)
+)
+
 
 class Profile(Base):  # pylint: disable=too-few-public-methods
     """
     Profile model
     """
     __tablename__ = "profiles"
+    __table_args__ = (
+        # Location filters with the default sort, and the partial index of the available profiles
+        Index("ix_profiles_state_created_at", "state", "created_at", "id"),
+        Index("ix_profiles_city_created_at", "city", "created_at", "id"),
+        Index("ix_profiles_zipcode_created_at", "zipcode", "created_at", "id"),
+        Index("ix_profiles_available_created_at", "created_at", "id", postgresql_where=text("available")),
+        # Byte-wise ordered lowercase names for the autocomplete prefix matches
+        Index("ix_profiles_first_name_prefix", text('lower(first_name) COLLATE "C"'), "id"),
+        Index("ix_profiles_last_name_prefix", text('lower(last_name) COLLATE "C"'), "id"),
+        # Full-text document of the names, it must match the search expression of the profile controller
+        Index("ix_profiles_name_search",
+              text("to_tsvector('simple', (coalesce(first_name, '') || ' ') || coalesce(last_name, ''))"),
+              postgresql_using="gin"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     img = Column(String)
     first_name = Column(String, index=True)
@@ -0,0 +1,95 @@
+"""
+Connection pools recording the time spent waiting for a connection
+"""
+import time
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """
+    Counters of the connection checkouts of a pool.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connections_opened = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        """
+        Record the time spent by a checkout, including the time opening a new connection
+        """
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self, pool: QueuePool) -> dict:
+        """
+        Get the live usage of the pool and the checkout counters
+        """
+        waits = self.checkouts + self.timeouts
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,  # pylint: disable=protected-access
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "connections_opened": self.connections_opened,
+            "wait_ms_avg": self.wait_seconds * 1000 / waits if waits else 0.0,
+            "wait_ms_max": self.max_wait_seconds * 1000,
+        }
+
+
+class MeteredPoolMixin:  # pylint: disable=too-few-public-methods
+    """
+    Measure the checkouts of a queue pool. The counters survive the pool being recreated by
+    the engine dispose.
+    """
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    def _create_connection(self):
+        connection = super()._create_connection()
+        self.metrics.connections_opened += 1
+        return connection
+
+    def recreate(self):
+        """
+        Create a new pool keeping the counters
+        """
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeteredQueuePool(MeteredPoolMixin, QueuePool):
+    """
+    Queue pool of the synchronous engine with checkout metrics.
+    """
+
+
+class MeteredAsyncQueuePool(MeteredPoolMixin, AsyncAdaptedQueuePool):
+    """
+    Queue pool of the asynchronous engine with checkout metrics.
+    """
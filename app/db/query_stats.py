@@ -0,0 +1,103 @@
+"""
+Statistics of the SQL statements run by each request
+"""
+import re
+import time
+import logging
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import SQL_REPEATED_STATEMENT_MAX, SQL_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+# Bound parameters of the asyncpg and psycopg2 statements, and the lists of them expanded from IN clauses
+PARAMETER = r"(?:\$\d+|%\(\w+\)s)"
+PARAMETER_LIST = re.compile(rf"{PARAMETER}(?:\s*,\s*{PARAMETER})*")
+# Characters of a statement kept in the logs
+LOGGED_STATEMENT_LENGTH = 500
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Get the statement with every parameter list replaced by a placeholder, so the statements
+    differing only by the number of values have the same shape
+    """
+    return PARAMETER_LIST.sub("?", statement)
+
+
+class QueryStats:
+    """
+    Statements run while serving a request, grouped by shape.
+    """
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.shapes: Counter[str] = Counter()
+
+    @property
+    def route(self) -> str:
+        """
+        Get the method and the route template of the request, or its path before the routing
+        """
+        route = self.scope.get("route")
+        return f"{self.scope.get('method')} {getattr(route, 'path', None) or self.scope.get('path')}"
+
+    def record(self, statement: str, seconds: float):
+        """
+        Record a statement run by the request
+        """
+        self.queries += 1
+        self.db_seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """
+        Get the statement shapes run more times than allowed, the usual sign of a query per item
+        """
+        return [(shape, count) for (shape, count) in self.shapes.most_common() if count > SQL_REPEATED_STATEMENT_MAX]
+
+    def log_repeated(self):
+        """
+        Log the statement shapes run more times than allowed
+        """
+        for (shape, count) in self.repeated():
+            logger.warning("Possible N+1 queries on %s, statement run %d times: %s",
+                           self.route, count, shape[:LOGGED_STATEMENT_LENGTH])
+
+
+# Statistics of the request being served, None outside of the requests
+request_query_stats: ContextVar[QueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def before_cursor_execute(_conn, _cursor, _statement, _parameters, context, _executemany):
+    """
+    Keep the start time of the statement in its execution context
+    """
+    context.query_start = time.perf_counter()
+
+
+def after_cursor_execute(_conn, _cursor, statement, _parameters, context, _executemany):
+    """
+    Add the statement to the statistics of the request and log it when it is slow
+    """
+    seconds = time.perf_counter() - context.query_start
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.record(statement, seconds)
+    if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+        logger.warning("Slow query of %.1fms on %s: %s", seconds * 1000,
+                       stats.route if stats is not None else "background job",
+                       statement_shape(statement)[:LOGGED_STATEMENT_LENGTH])
+
+
+def instrument_engine(engine: Engine):
+    """
+    Measure the statements run by an engine, the synchronous engine of the asynchronous ones
+    runs the events
+    """
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
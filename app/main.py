@@ -1,22 +1,106 @@
 """ Main entry point for the API """
 import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import SQLAlchemyError
+from app.config import (GRAPH_INDEX_ENABLED, COMPONENT_INDEX_ENABLED, LANDMARKS_PATH,
+                        RECOMMENDATIONS_REFRESH_SECONDS)
+from app.controllers.connection_cache import connection_cache
+from app.controllers.friendship import Friendship
+from app.controllers.metrics import REQUEST_LATENCY, REQUESTS_IN_PROGRESS, UNMATCHED_ROUTE
+from app.controllers.graph_components import component_index
+from app.controllers.graph_index import graph_index
+from app.controllers.graph_landmarks import landmark_index
+from app.controllers.profile import Profile
+from app.controllers.profile_cache import profile_cache
+from app.controllers.recommendations import recommendation_index
+from app.constants import DB_QUERIES_HEADER, DB_REPEATED_HEADER, DB_TIME_HEADER, WRITE_LSN_HEADER
+from app.db.config import AsyncSessionLocal, SessionLocal, async_engine, get_write_lsn, replica_engine
+from app.db.query_stats import QueryStats, request_query_stats
 
 # Import routes
 from app.routes.health import health_router
+from app.routes.metrics import metrics_router
 from app.routes.v1.profile import profile_router
 from app.routes.v1.friendship import friendship_router
 
 # Load environment variables
 load_dotenv(dotenv_path=f"{Path(__file__).parent}/.env")
 
-# Disable Swagger docs in production
-docs_url = "/docs" if os.getenv("ENVIRONMENT") == "development" else None
-redoc_url = "/redoc" if os.getenv("ENVIRONMENT") == "development" else None
+# Disable Swagger docs and the SQL statistics headers in production
+DEVELOPMENT = os.getenv("ENVIRONMENT") == "development"
+docs_url = "/docs" if DEVELOPMENT else None
+redoc_url = "/redoc" if DEVELOPMENT else None
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_recommendations():
+    """
+    Rebuild the friend recommendations from the friendship table, with a synchronous session
+    as it runs in a worker thread
+    """
+    db = SessionLocal()
+    try:
+        Profile.build_recommendations(db)
+    except SQLAlchemyError as e:
+        logger.warning("Recommendations not refreshed: %s", e)
+    finally:
+        db.close()
+
+
+async def refresh_recommendations_periodically():
+    """
+    Background job rebuilding the friend recommendations outside the event loop
+    """
+    while True:
+        await asyncio.sleep(RECOMMENDATIONS_REFRESH_SECONDS)
+        await asyncio.to_thread(refresh_recommendations)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """
+    Load the in-memory graph indexes and the recommendations on startup
+    """
+    async with AsyncSessionLocal() as db:
+        try:
+            if GRAPH_INDEX_ENABLED:
+                await Friendship.load_graph_index(db)
+            if COMPONENT_INDEX_ENABLED:
+                await Friendship.load_component_index(db)
+            await Profile.load_search_mode(db)
+            await db.run_sync(Profile.build_recommendations, graph_index if graph_index.is_ready else None)
+        except (SQLAlchemyError, OSError) as e:
+            logger.warning("Graph indexes not loaded, using SQL traversal: %s", e)
+    if os.path.exists(LANDMARKS_PATH):
+        try:
+            landmark_index.load(LANDMARKS_PATH, graph_index if graph_index.is_ready else None)
+        except (OSError, ValueError) as e:
+            logger.warning("Landmark table not loaded: %s", e)
+    refresh_job = None
+    if RECOMMENDATIONS_REFRESH_SECONDS > 0:
+        refresh_job = asyncio.create_task(refresh_recommendations_periodically())
+    yield
+    if refresh_job is not None:
+        refresh_job.cancel()
+    graph_index.reset()
+    component_index.reset()
+    landmark_index.reset()
+    connection_cache.clear()
+    await profile_cache.clear()
+    recommendation_index.reset()
+    await async_engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
 
 app = FastAPI(
     title="DSpot API Test",
@@ -24,6 +108,7 @@ app = FastAPI(
     version="0.1.0",
     docs_url=docs_url,
     redoc_url=redoc_url,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -34,13 +119,73 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[WRITE_LSN_HEADER, DB_QUERIES_HEADER, DB_TIME_HEADER, DB_REPEATED_HEADER],
 )
 
+# Methods of the routes writing to the primary database
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+@app.middleware("http")
+async def add_write_lsn(request: Request, call_next):
+    """
+    Report the primary WAL position reached by the successful writes, so the next reads can
+    ask the read replica to have replayed it
+    """
+    response = await call_next(request)
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        lsn = await get_write_lsn()
+        if lsn is not None:
+            response.headers[WRITE_LSN_HEADER] = lsn
+    return response
+
+
+@app.middleware("http")
+async def track_queries(request: Request, call_next):
+    """
+    Count the SQL statements and the database time of each request, logging the statements
+    repeated too many times. In development the numbers are returned as response headers.
+    """
+    stats = QueryStats(request.scope)
+    token = request_query_stats.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        request_query_stats.reset(token)
+    stats.log_repeated()
+    if DEVELOPMENT:
+        response.headers[DB_QUERIES_HEADER] = str(stats.queries)
+        response.headers[DB_TIME_HEADER] = f"{stats.db_seconds * 1000:.2f}"
+        response.headers[DB_REPEATED_HEADER] = str(len(stats.repeated()))
+    return response
+
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    """
+    Measure the latency of the requests by route template and status, and the requests being
+    served
+    """
+    start = time.perf_counter()
+    status = 500
+    in_progress = REQUESTS_IN_PROGRESS.labels(request.method)
+    in_progress.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        in_progress.dec()
+        route = getattr(request.scope.get("route"), "path", UNMATCHED_ROUTE)
+        REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - start)
+
+
 # Configure routes
 app.include_router(health_router, prefix="/health")
 app.include_router(profile_router, prefix="/v1")
 app.include_router(friendship_router, prefix="/v1")
 app.include_router(health_router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,8 +1,11 @@
 """
 Pydantic models for the friendship
 """
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, Field
+from app.config import CONNECTION_BATCH_MAX_PAIRS, FRIENDSHIP_BULK_MAX_PAIRS
+from app.controllers.db_types import BulkStatusEnum, ConnectionLimitEnum
 
 
 class FriendshipBase(BaseModel):
@@ -13,8 +16,104 @@ class FriendshipBase(BaseModel):
     friend_id: int
 
 
+class FriendshipBulkRequest(BaseModel):
+    """
+    Request model for the bulk friendship create and delete
+    """
+    pairs: List[FriendshipBase] = Field(..., description="The friendship relationships",
+                                        min_length=1, max_length=FRIENDSHIP_BULK_MAX_PAIRS)
+
+
+class FriendshipBulkResult(FriendshipBase):
+    """
+    Outcome of one friendship relationship of a bulk operation
+    """
+    status: BulkStatusEnum = Field(..., description="The outcome of the relationship")
+    detail: Optional[str] = Field(None, description="The error code when the relationship failed")
+
+
+class FriendshipBulkResponse(BaseModel):
+    """
+    Response model for the bulk friendship create and delete
+    """
+    succeeded: int = Field(..., description="Number of relationships processed")
+    failed: int = Field(..., description="Number of relationships that failed")
+    results: List[FriendshipBulkResult] = Field(..., description="The outcome of each relationship in order")
+
+
 class FriendshipConnectionResponse(BaseModel):
     """
     Response model for the friendship shorter path
     """
     path: List[int]
+    complete: bool = Field(
+        True, description="Indicate if the search finished, otherwise it gave up because of a limit")
+    limit: Optional[ConnectionLimitEnum] = Field(
+        None, description="The limit that stopped the search")
+
+
+class ConnectionBatchRequest(BaseModel):
+    """
+    Request model for the batch connection search
+    """
+    pairs: List[FriendshipBase] = Field(..., description="The pairs of profiles to connect",
+                                        min_length=1, max_length=CONNECTION_BATCH_MAX_PAIRS)
+
+
+class ConnectionBatchResult(FriendshipConnectionResponse):
+    """
+    Result of one pair of the batch connection search, streamed as a JSON line
+    """
+    profile_id: int
+    friend_id: int
+
+
+class ComponentResponse(BaseModel):
+    """
+    Response model for the connected component of a profile
+    """
+    profile_id: int = Field(..., description="The profile id")
+    component_id: int = Field(..., description="The component id, it is the lowest profile id in the component")
+    size: int = Field(..., description="Number of profiles in the component")
+
+
+class DistanceEstimateResponse(BaseModel):
+    """
+    Response model for the landmark estimation of the distance between two profiles
+    """
+    lower_bound: Optional[int] = Field(None, description="Minimum number of hops between the profiles")
+    upper_bound: Optional[int] = Field(None, description="Maximum number of hops between the profiles")
+    disconnected: bool = Field(..., description="Indicate if the profiles are known to be disconnected")
+    landmarks: int = Field(..., description="Number of landmarks used by the estimation")
+    built_at: Optional[datetime] = Field(None, description="Date/Time when the landmark table was built")
+    stale: bool = Field(..., description="Indicate if friendships changed after the landmark table build")
+    created_since_build: int = Field(..., description="Friendships created after the build")
+    deleted_since_build: int = Field(..., description="Friendships deleted after the build")
+
+
+class GraphIndexStatsResponse(BaseModel):
+    """
+    Response model for the in-memory graph index statistics
+    """
+    ready: bool = Field(..., description="Indicate if the index is loaded and serving queries")
+    profiles: int = Field(..., description="Number of profile rows in the index")
+    friendships: int = Field(..., description="Number of friendship relationships in the index")
+    pending_changes: int = Field(..., description="Changes waiting to be merged into the arrays")
+    compacting: bool = Field(..., description="Indicate if the changes are being merged in the background")
+    memory_bytes: int = Field(..., description="Approximated memory used by the index")
+    bytes_per_friendship: float = Field(..., description="Approximated memory used per relationship")
+
+
+class ConnectionCacheStatsResponse(BaseModel):
+    """
+    Response model for the connection cache statistics
+    """
+    size: int = Field(..., description="Number of cached connections")
+    max_size: int = Field(..., description="Maximum number of cached connections")
+    hits: int = Field(..., description="Connections served from the cache")
+    misses: int = Field(..., description="Connections not found in the cache")
+    hit_rate: float = Field(..., description="Ratio of connections served from the cache")
+    evictions: int = Field(..., description="Connections evicted to make room for new ones")
+    expirations: int = Field(..., description="Connections expired by the time to live")
+    invalidations: int = Field(..., description="Connections invalidated by friendship changes")
+    version: int = Field(..., description="Graph version, increased by every new friendship")
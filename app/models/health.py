@@ -1,7 +1,7 @@
 """
 Pydantic models for the health validation
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Health(BaseModel):
@@ -10,3 +10,31 @@ class Health(BaseModel):
     """
     status: str = "ok"
     version: str
+
+
+class PoolStats(BaseModel):
+    """
+    Usage of a database connection pool
+    """
+    size: int = Field(..., description="Connections kept open by the pool")
+    checked_out: int = Field(..., description="Connections in use")
+    idle: int = Field(..., description="Open connections waiting to be used")
+    overflow: int = Field(..., description="Connections opened over the pool size")
+    max_overflow: int = Field(..., description="Maximum number of connections over the pool size")
+    checkouts: int = Field(..., description="Connections handed out by the pool")
+    timeouts: int = Field(..., description="Checkouts that gave up waiting for a connection")
+    connections_opened: int = Field(..., description="New connections opened to the database")
+    wait_ms_avg: float = Field(..., description="Average milliseconds spent getting a connection")
+    wait_ms_max: float = Field(..., description="Maximum milliseconds spent getting a connection")
+
+
+class DatabaseHealth(BaseModel):
+    """
+    Database connection pools health model
+    """
+    status: str = Field(..., description="'ok', or 'saturated' when a pool has every connection in use")
+    statement_timeout_ms: int = Field(..., description="Server side statement timeout, 0 when disabled")
+    pool_timeout: float = Field(..., description="Seconds a request waits for a connection")
+    requests: PoolStats = Field(..., description="Pool of the request handlers")
+    background: PoolStats = Field(..., description="Pool of the scripts and the background jobs")
+    replica: PoolStats | None = Field(None, description="Pool of the read replica, when configured")
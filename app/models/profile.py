@@ -4,6 +4,7 @@ Pydantic models for the profile
 from typing import Optional, List
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict
+from app.controllers.db_types import BulkStatusEnum, TotalModeEnum
 
 
 class ProfileBase(BaseModel):
@@ -41,8 +42,126 @@ class PaginatedProfileResponse(BaseModel):
     """
     Response model for profiles list using pagination
     """
-    total: int = Field(..., description="Total number of profiles")
+    total: Optional[int] = Field(..., description="Total number of profiles, not counted with the none total mode")
+    total_mode: TotalModeEnum = Field(
+        TotalModeEnum.EXACT, description="How the total was obtained: exact count, planner estimate or none")
     next_url: Optional[str] = Field(None, description="Next page url")
     previous_url: Optional[str] = Field(None, description="Previous page url")
     profiles: List[ProfileResponse] = Field(...,
                                             description="The list of profiles")
+
+
+class MutualCount(BaseModel):
+    """
+    Number of mutual friends with one profile
+    """
+    profile_id: int = Field(..., description="The ID of the profile")
+    mutual_friends: int = Field(..., description="Number of friends shared with the viewer profile")
+
+
+class MutualCountsResponse(BaseModel):
+    """
+    Response model for the mutual friends count of a profile against many profiles
+    """
+    profile_id: int = Field(..., description="The ID of the viewer profile")
+    counts: List[MutualCount] = Field(..., description="The mutual friends count of each profile")
+
+
+class RecommendationResponse(ProfileResponse):
+    """
+    Response model for a recommended profile
+    """
+    mutual_friends: int = Field(..., description="Number of friends shared with the profile")
+
+
+class RecommendationsResponse(BaseModel):
+    """
+    Response model for the friend recommendations of a profile
+    """
+    profile_id: int = Field(..., description="The ID of the profile")
+    built_at: datetime = Field(..., description="Date/Time when the recommendations were computed")
+    recommendations: List[RecommendationResponse] = Field(
+        ..., description="The recommended profiles ranked by mutual friends")
+
+
+class ProfileBulkResult(BaseModel):
+    """
+    Outcome of one record of the bulk profile ingest
+    """
+    index: int = Field(..., description="Position of the record in the request")
+    status: BulkStatusEnum = Field(..., description="The outcome of the record")
+    id: Optional[int] = Field(None, description="The ID of the created profile")
+    created_at: Optional[datetime] = Field(None, description="Date/Time when profile was created")
+    updated_at: Optional[datetime] = Field(None, description="Date/Time for the last profile update")
+    errors: Optional[List[str]] = Field(None, description="The validation errors of the record")
+
+
+class ProfileBulkResponse(BaseModel):
+    """
+    Response model for the bulk profile ingest
+    """
+    succeeded: int = Field(..., description="Number of profiles created")
+    failed: int = Field(..., description="Number of records that failed the validation")
+    results: List[ProfileBulkResult] = Field(..., description="The outcome of each record in order")
+
+
+class ProfileSuggestion(BaseModel):
+    """
+    Response model for a profile name suggestion
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int = Field(..., description="The ID of the profile")
+    first_name: str = Field(..., description="The first name of the profile")
+    last_name: str = Field(..., description="The last name of the profile")
+    img: str = Field(..., description="The image of the profile")
+
+
+class ZipcodeFacet(BaseModel):
+    """
+    Number of profiles of a zipcode
+    """
+    zipcode: Optional[str] = Field(None, description="The zipcode, null for the profiles without zipcode")
+    profiles: int = Field(..., description="Number of profiles of the zipcode")
+
+
+class CityFacet(BaseModel):
+    """
+    Number of profiles of a city
+    """
+    city: Optional[str] = Field(None, description="The city, null for the profiles without city")
+    profiles: int = Field(..., description="Number of profiles of the city")
+    zipcodes: List[ZipcodeFacet] = Field(..., description="The profiles of the city by zipcode")
+
+
+class StateFacet(BaseModel):
+    """
+    Number of profiles of a state
+    """
+    state: Optional[str] = Field(None, description="The state, null for the profiles without state")
+    profiles: int = Field(..., description="Number of profiles of the state")
+    cities: List[CityFacet] = Field(..., description="The profiles of the state by city")
+
+
+class LocationFacetsResponse(BaseModel):
+    """
+    Response model for the number of profiles by location
+    """
+    total: int = Field(..., description="Number of profiles of all the locations")
+    states: List[StateFacet] = Field(..., description="The profiles by state, then city, then zipcode")
+
+
+class ProfileCacheStatsResponse(BaseModel):
+    """
+    Response model for the profile cache statistics
+    """
+    size: int = Field(..., description="Number of cached profiles")
+    bytes: int = Field(..., description="Memory used by the cached profiles in bytes")
+    max_bytes: Optional[int] = Field(None, description="Maximum memory used by the cached profiles in bytes")
+    hits: int = Field(..., description="Profiles served from the cache")
+    misses: int = Field(..., description="Profiles not found in the cache")
+    hit_rate: float = Field(..., description="Ratio of profiles served from the cache")
+    evictions: int = Field(..., description="Profiles evicted to make room for new ones")
+    expirations: int = Field(..., description="Profiles expired by the time to live")
+    invalidations: int = Field(..., description="Cached profiles invalidated by updates and deletions")
+    version: int = Field(..., description="Invalidation version, increased by every profile update or deletion")
@@ -3,7 +3,8 @@ Routes for the health check
 """
 from fastapi import APIRouter
 from app.constants import API_VERSION
-from app.models.health import Health
+from app.db.config import PG_POOL_TIMEOUT, PG_STATEMENT_TIMEOUT_MS, async_engine, engine, replica_engine
+from app.models.health import DatabaseHealth, Health, PoolStats
 
 health_router = APIRouter()
 
@@ -14,3 +15,32 @@ def health() -> Health:
     Health check endpoint
     """
     return Health(status="ok", version=API_VERSION)
+
+
+@health_router.get(
+    "/db",
+    response_model=DatabaseHealth,
+    status_code=200,
+    summary="Get the database connection pools usage",
+    description="Get the connections in use and over the pool size, and the time spent waiting for a connection "
+    "of the request handlers pool, the background jobs pool and the read replica pool. The pools are not "
+    "queried, so the report is served even when every connection is in use.",
+    response_description="Database connection pools usage",
+)
+def database_health() -> DatabaseHealth:
+    """
+    Database connection pools health endpoint
+    """
+    requests = PoolStats(**async_engine.pool.metrics.stats(async_engine.pool))
+    background = PoolStats(**engine.pool.metrics.stats(engine.pool))
+    replica = PoolStats(**replica_engine.pool.metrics.stats(replica_engine.pool)) if replica_engine else None
+    saturated = any(pool.checked_out >= pool.size + pool.max_overflow
+                    for pool in (requests, background, replica) if pool is not None)
+    return DatabaseHealth(
+        status="saturated" if saturated else "ok",
+        statement_timeout_ms=PG_STATEMENT_TIMEOUT_MS,
+        pool_timeout=PG_POOL_TIMEOUT,
+        requests=requests,
+        background=background,
+        replica=replica,
+    )
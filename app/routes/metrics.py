@@ -0,0 +1,23 @@
+"""
+Routes for the Prometheus metrics
+"""
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get(
+    "/metrics",
+    response_class=Response,
+    status_code=200,
+    summary="Get the service metrics",
+    description="Get the request latencies by route and status, the requests in progress, the database pools "
+    "usage and the connection search, friendship and profile search counters in the Prometheus text format",
+    response_description="Service metrics in the Prometheus text format",
+)
+def metrics() -> Response:
+    """
+    Prometheus metrics endpoint
+    """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,12 +1,22 @@
 """
 Routes for the friendship
 """
-from fastapi import APIRouter, Depends, HTTPException, Path, Body
-from sqlalchemy.orm import Session
-from app.constants import PROFILE_NOT_FOUND, FRIEND_NOT_FOUND, FRIENDSHIP_NOT_FOUND, FRIENDSHIP_SAME_PROFILE
+from fastapi import APIRouter, Depends, HTTPException, Path, Body, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.constants import (PROFILE_NOT_FOUND, FRIEND_NOT_FOUND, FRIENDSHIP_NOT_FOUND, FRIENDSHIP_SAME_PROFILE,
+                           LANDMARKS_NOT_LOADED)
+from app.controllers.connection_cache import connection_cache
+from app.controllers.db_types import ConnectionSearchModeEnum
 from app.controllers.friendship import Friendship
-from app.db.config import get_db
-from app.models.friendship import FriendshipBase, FriendshipConnectionResponse
+from app.controllers.profile import Profile
+from app.controllers.graph_index import graph_index
+from app.controllers.graph_landmarks import landmark_index
+from app.db.config import get_db, get_read_db, AsyncSessionLocal
+from app.models.friendship import (FriendshipBase, FriendshipBulkRequest, FriendshipBulkResponse,
+                                   FriendshipConnectionResponse, ConnectionBatchRequest, ConnectionBatchResult,
+                                   ComponentResponse, DistanceEstimateResponse, GraphIndexStatsResponse,
+                                   ConnectionCacheStatsResponse)
 
 
 friendship_router = APIRouter(prefix="/friendship", tags=["friendship"])
@@ -23,7 +33,7 @@ friendship_router = APIRouter(prefix="/friendship", tags=["friendship"])
 async def create_friendship(
     relationship: FriendshipBase = Body(
         description="The new friendship relationship data"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new friendship relationship
@@ -40,6 +50,45 @@ async def create_friendship(
     return relationship
 
 
+@friendship_router.post(
+    "/bulk",
+    response_model=FriendshipBulkResponse,
+    status_code=200,
+    summary="Create many friendship relationships",
+    description="Create many friendship relationships in a single transaction. Invalid pairs don't stop the "
+    "other ones and the outcome of each pair is reported",
+    response_description="Return the outcome of each friendship relationship"
+)
+async def bulk_create_friendships(
+    bulk: FriendshipBulkRequest = Body(description="The new friendship relationships"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create many friendship relationships
+    """
+    pairs = [(pair.profile_id, pair.friend_id) for pair in bulk.pairs]
+    return await Friendship.bulk_create(db, pairs)
+
+
+@friendship_router.post(
+    "/bulk/delete",
+    response_model=FriendshipBulkResponse,
+    status_code=200,
+    summary="Delete many friendship relationships",
+    description="Delete many friendship relationships in a single transaction",
+    response_description="Return the outcome of each friendship relationship"
+)
+async def bulk_delete_friendships(
+    bulk: FriendshipBulkRequest = Body(description="The friendship relationships to delete"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Delete many friendship relationships
+    """
+    pairs = [(pair.profile_id, pair.friend_id) for pair in bulk.pairs]
+    return await Friendship.bulk_delete(db, pairs)
+
+
 @friendship_router.delete(
     "/{profile_id}/{friend_id}/delete",
     response_model=FriendshipBase,
@@ -51,7 +100,7 @@ async def create_friendship(
 async def delete_friend(
     profile_id: int = Path(description="The profile id"),
     friend_id: int = Path(description="The friend id"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a friendship relationship
@@ -67,16 +116,149 @@ async def delete_friend(
     response_model=FriendshipConnectionResponse,
     status_code=200,
     summary="Get the shorter connection between two profiles",
-    description="Get the shorter connection between two profiles applying Breadth First Search algorithm",
+    description="Get the shorter connection between two profiles applying Breadth First Search algorithm. "
+    "The search gives up when it reaches a limit, the limits can't exceed the configured ones",
     response_description="Return the shorter connection between the two profiles"
 )
-async def get_connection_level(
+async def get_connection_level(  # pylint: disable=too-many-arguments
     profile_id: int = Path(description="The profile id"),
     friend_id: int = Path(description="The friend id"),
-    db: Session = Depends(get_db)
+    mode: ConnectionSearchModeEnum = Query(
+        None, description="Search strategy, by default the configured one is used"),
+    max_depth: int = Query(
+        None, description="Maximum number of hops of the connection", ge=1),
+    max_visited: int = Query(
+        None, description="Maximum number of profiles visited by the search", ge=1),
+    timeout_ms: int = Query(
+        None, description="Maximum time in milliseconds spent by the search", ge=1),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get the shorter connection between two profiles
     """
-    connection = await Friendship.get_connection(db, profile_id, friend_id)
-    return {"path": connection}
+    result = await Friendship.search_connection(
+        db, profile_id, friend_id, mode, max_depth, max_visited, timeout_ms)
+    return {"path": result.path, "complete": result.complete, "limit": result.limit}
+
+
+@friendship_router.post(
+    "/connections",
+    response_class=StreamingResponse,
+    status_code=200,
+    summary="Get the shorter connections of many pairs of profiles",
+    description="Get the shorter connections of many pairs of profiles. The pairs are grouped by profile and a "
+    "single search tree serves all the friends of a profile. The limits apply to each search tree",
+    response_description="Return one JSON line with the connection of each pair as soon as it is resolved",
+    responses={200: {"content": {"application/x-ndjson": {
+        "schema": ConnectionBatchResult.model_json_schema()}}}}
+)
+async def get_connections(  # pylint: disable=too-many-arguments
+    batch: ConnectionBatchRequest = Body(description="The pairs of profiles to connect"),
+    mode: ConnectionSearchModeEnum = Query(
+        None, description="Search strategy, by default the configured one is used"),
+    max_depth: int = Query(
+        None, description="Maximum number of hops of the connections", ge=1),
+    max_visited: int = Query(
+        None, description="Maximum number of profiles visited by each search tree", ge=1),
+    timeout_ms: int = Query(
+        None, description="Maximum time in milliseconds spent by each search tree", ge=1)
+):
+    """
+    Get the shorter connections of many pairs of profiles
+    """
+    friends_by_profile: dict[int, list[int]] = {}
+    for pair in batch.pairs:
+        friends_by_profile.setdefault(pair.profile_id, []).append(pair.friend_id)
+
+    async def stream_connections():
+        # The session must outlive the request handler while the response is streamed
+        async with AsyncSessionLocal() as db:
+            for (profile_id, friend_ids) in friends_by_profile.items():
+                results = await Friendship.search_connections(
+                    db, profile_id, friend_ids, mode, max_depth, max_visited, timeout_ms)
+                for friend_id in friend_ids:
+                    result = results[friend_id]
+                    line = ConnectionBatchResult(
+                        profile_id=profile_id, friend_id=friend_id, path=result.path,
+                        complete=result.complete, limit=result.limit)
+                    yield line.model_dump_json() + "\n"
+
+    return StreamingResponse(stream_connections(), media_type="application/x-ndjson")
+
+
+@friendship_router.get(
+    "/{profile_id}/{friend_id}/distance",
+    response_model=DistanceEstimateResponse,
+    status_code=200,
+    summary="Estimate the distance between two profiles",
+    description="Get a lower and upper bound of the number of hops between two profiles from the landmark "
+    "distance table, without searching the connection",
+    response_description="Return the distance bounds and the landmark table staleness"
+)
+async def get_distance_estimate(
+    profile_id: int = Path(description="The profile id"),
+    friend_id: int = Path(description="The friend id")
+):
+    """
+    Estimate the distance between two profiles
+    """
+    if not landmark_index.is_ready:
+        raise HTTPException(status_code=503, detail=LANDMARKS_NOT_LOADED)
+    (lower_bound, upper_bound, disconnected) = landmark_index.bounds(profile_id, friend_id)
+    return {
+        "lower_bound": lower_bound,
+        "upper_bound": upper_bound,
+        "disconnected": disconnected,
+        **landmark_index.stats(),
+    }
+
+
+@friendship_router.get(
+    "/{profile_id}/component",
+    response_model=ComponentResponse,
+    status_code=200,
+    summary="Get the connected component of a profile",
+    description="Get the connected component of a profile, profiles in different components are not connected",
+    response_description="Return the component id and size"
+)
+async def get_component(
+    profile_id: int = Path(description="The profile id"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the connected component of a profile
+    """
+    if await Profile.get(db, profile_id) is None:
+        raise HTTPException(status_code=404, detail=PROFILE_NOT_FOUND)
+    (component_id, size) = await Friendship.get_component(db, profile_id)
+    return {"profile_id": profile_id, "component_id": component_id, "size": size}
+
+
+@friendship_router.get(
+    "/index/stats",
+    response_model=GraphIndexStatsResponse,
+    status_code=200,
+    summary="Get the graph index statistics",
+    description="Get the size and memory usage of the in-memory friendship graph index",
+    response_description="Return the graph index statistics"
+)
+async def get_graph_index_stats():
+    """
+    Get the graph index statistics
+    """
+    return graph_index.stats()
+
+
+@friendship_router.get(
+    "/cache/stats",
+    response_model=ConnectionCacheStatsResponse,
+    status_code=200,
+    summary="Get the connection cache statistics",
+    description="Get the hit, miss and eviction counters of the connection cache",
+    response_description="Return the connection cache statistics"
+)
+async def get_connection_cache_stats():
+    """
+    Get the connection cache statistics
+    """
+    return connection_cache.stats()
@@ -1,17 +1,26 @@
 """
 Routes for the profile
 """
+import json
+from typing import Any, AsyncIterator, List
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, Request
-from sqlalchemy.orm import Session
-from app.controllers.db_types import OrderEnum, ProfileOrderFieldEnum
-from app.controllers.profile import Profile
-from app.constants import PROFILE_NOT_FOUND
-from app.db.config import get_db
-from app.models.profile import ProfileBase, ProfileResponse, PaginatedProfileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import MUTUAL_BATCH_MAX_PROFILES, RECOMMENDATIONS_TOP_K
+from app.controllers.db_types import OrderEnum, PaginationEnum, ProfileOrderFieldEnum, TotalModeEnum
+from app.controllers.profile import Profile, ProfileFilters
+from app.controllers.profile_cache import profile_cache
+from app.constants import PROFILE_NOT_FOUND, RECOMMENDATIONS_NOT_READY, INVALID_BULK_BODY, INVALID_CURSOR
+from app.db.config import get_db, get_read_db
+from app.models.profile import (ProfileBase, ProfileResponse, PaginatedProfileResponse,
+                                MutualCountsResponse, RecommendationsResponse, ProfileBulkResponse,
+                                ProfileSuggestion, LocationFacetsResponse, ProfileCacheStatsResponse)
 
 
 profile_router = APIRouter(prefix="/profile", tags=["profile"])
 
+# Content types of the bulk profile ingest streamed one JSON record per line
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
 
 @profile_router.post(
     "/create",
@@ -23,7 +32,7 @@ profile_router = APIRouter(prefix="/profile", tags=["profile"])
 )
 async def create_profile(
     profile: ProfileBase = Body(description="The new profile data"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new profile
@@ -31,6 +40,63 @@ async def create_profile(
     return await Profile.create(db, profile)
 
 
+async def read_ndjson_lines(request: Request) -> AsyncIterator[bytes]:
+    """
+    Read the non-empty lines of a streamed request body
+    """
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if pending.strip():
+        yield pending
+
+
+async def iterate_records(records: list[Any]) -> AsyncIterator[Any]:
+    """
+    Iterate the records of a JSON array
+    """
+    for record in records:
+        yield record
+
+
+@profile_router.post(
+    "/bulk",
+    response_model=ProfileBulkResponse,
+    status_code=200,
+    summary="Create many profiles",
+    description="Create many profiles from a JSON array or from a NDJSON stream with one profile per line. "
+    "Invalid records are reported without stopping the ingest",
+    response_description="Return the outcome of each record",
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": ProfileBase.model_json_schema()}},
+        "application/x-ndjson": {"schema": ProfileBase.model_json_schema()},
+    }}}
+)
+async def bulk_create_profiles(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Create many profiles
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        records = read_ndjson_lines(request)
+    else:
+        try:
+            body = json.loads(await request.body())
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=INVALID_BULK_BODY) from e
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail=INVALID_BULK_BODY)
+        records = iterate_records(body)
+    return await Profile.bulk_create(db, records)
+
+
 @profile_router.get(
     "/{profile_id}/get",
     response_model=ProfileResponse,
@@ -41,12 +107,12 @@ async def create_profile(
 )
 async def get_profile(
     profile_id: int = Path(description="The ID of the profile to get"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get a profile by id
     """
-    obj = await Profile.get(db, profile_id)
+    obj = await Profile.get_response(db, profile_id)
     if obj is None:
         raise HTTPException(status_code=404, detail=PROFILE_NOT_FOUND)
     return obj
@@ -57,10 +123,11 @@ async def get_profile(
     response_model=PaginatedProfileResponse,
     status_code=200,
     summary="Get all profiles",
-    description="Get all profiles or the profiles filtered by name or last name",
+    description="Get all profiles or the profiles filtered by name or last name, location and availability. "
+    "With cursor pagination the pages are keyed on the sort field and the profile id instead of skipping rows",
     response_description="Return the profiles results paginated",
 )
-async def get_profiles(  # pylint: disable=too-many-arguments
+async def get_profiles(  # pylint: disable=too-many-arguments, too-many-locals
     request: Request,
     q: str = Query(
         None, description="Search query to filter profiles by name or last name", min_length=3),
@@ -72,14 +139,96 @@ async def get_profiles(  # pylint: disable=too-many-arguments
         ProfileOrderFieldEnum.CREATED_AT, description="Sort field used to order the results"),
     order: OrderEnum = Query(
         OrderEnum.ASC, description="Sort order used to order the results"),
-    db: Session = Depends(get_db)
+    pagination: PaginationEnum = Query(
+        PaginationEnum.OFFSET, description="Paginate with skip or with the cursors of the next and previous urls"),
+    cursor: str = Query(
+        None, description="Opaque cursor of the page, taken from the next and previous urls"),
+    total: TotalModeEnum = Query(
+        TotalModeEnum.EXACT, description="Count the total exactly, estimate it from the planner statistics or skip it"),
+    rank: bool = Query(
+        False, description="Order the search results by relevance before the sort field, only with offset pagination"),
+    city: List[str] = Query(
+        None, description="Filter the profiles by city, repeat it to match any of the cities"),
+    state: List[str] = Query(
+        None, description="Filter the profiles by state, repeat it to match any of the states"),
+    zipcode: List[str] = Query(
+        None, description="Filter the profiles by zipcode, repeat it to match any of the zipcodes"),
+    available: bool = Query(
+        None, description="Filter the profiles by availability to be friend"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all profiles
     """
     base_url = request.url._url.split(  # pylint: disable=protected-access
         "?")[0]
-    return await Profile.get_all(db, base_url, q, skip, limit, field, order)
+    profile_cursor = None
+    if cursor:
+        try:
+            profile_cursor = Profile.decode_cursor(cursor, field, order)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=INVALID_CURSOR) from e
+        pagination = PaginationEnum.CURSOR
+    filters = ProfileFilters(city=city, state=state, zipcode=zipcode, available=available)
+    return await Profile.get_all(db, base_url, q, skip, limit, field, order, pagination, profile_cursor, total,
+                                 rank, filters)
+
+
+@profile_router.get(
+    "/autocomplete",
+    response_model=List[ProfileSuggestion],
+    status_code=200,
+    summary="Autocomplete profile names",
+    description="Get the profiles whose first or last name starts with a prefix, without total count",
+    response_description="Return the profile suggestions ordered by the matched name"
+)
+async def autocomplete_profiles(
+    q: str = Query(..., description="Prefix of the first or last name", min_length=1, max_length=100),
+    limit: int = Query(
+        10, description="Maximum number of suggestions", ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Autocomplete profile names
+    """
+    return await Profile.autocomplete(db, q, limit)
+
+
+@profile_router.get(
+    "/cache/stats",
+    response_model=ProfileCacheStatsResponse,
+    status_code=200,
+    summary="Get the profile cache statistics",
+    description="Get the hit, miss and eviction counters and the memory used by the profile cache",
+    response_description="Return the profile cache statistics"
+)
+async def get_profile_cache_stats():
+    """
+    Get the profile cache statistics
+    """
+    return profile_cache.stats()
+
+
+@profile_router.get(
+    "/facets/location",
+    response_model=LocationFacetsResponse,
+    status_code=200,
+    summary="Get the profiles by location",
+    description="Get the number of profiles by state, then city, then zipcode, optionally restricted to a state, "
+    "a city or the profiles found by name or last name",
+    response_description="Return the number of profiles of each location"
+)
+async def get_location_facets(
+    state: str = Query(None, description="Restrict the counts to a state"),
+    city: str = Query(None, description="Restrict the counts to a city"),
+    q: str = Query(
+        None, description="Search query to count only the profiles found by name or last name", min_length=3),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the profiles by location
+    """
+    return await Profile.get_location_facets(db, state, city, q)
 
 
 @profile_router.put(
@@ -93,7 +242,7 @@ async def get_profiles(  # pylint: disable=too-many-arguments
 async def update_profile(
     profile_id: int = Path(description="The ID of the profile to update"),
     profile: ProfileBase = Body(description="The profile data to update"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update a profile by id
@@ -114,7 +263,7 @@ async def update_profile(
 )
 async def delete_profile(
     profile_id: int = Path(description="The ID of the profile to delete"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Delete a profile by id
@@ -133,18 +282,92 @@ async def delete_profile(
     description="Get all friends of a profile by id",
     response_description="Return the friends of the profile"
 )
-async def get_friends(
+async def get_friends(  # pylint: disable=too-many-arguments
     request: Request,
     profile_id: int = Path(description="The ID of the profile to get friends"),
     skip: int = Query(
         0, description="Skip records to get paginated results", ge=0),
     limit: int = Query(
         10, description="Limit records to get paginated results", ge=1, le=200),
-    db: Session = Depends(get_db)
+    total: TotalModeEnum = Query(
+        TotalModeEnum.EXACT, description="Count the total exactly, estimate it from the planner statistics or skip it"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all friends of a profile by id
     """
     base_url = request.url._url.split(  # pylint: disable=protected-access
         "?")[0]
-    return await Profile.get_friends(db, profile_id, base_url, skip, limit)
+    return await Profile.get_friends(db, profile_id, base_url, skip, limit, total)
+
+
+@profile_router.get(
+    "/{profile_id}/recommendations",
+    response_model=RecommendationsResponse,
+    status_code=200,
+    summary="Get the friend recommendations of a profile",
+    description="Get the friends of friends of a profile ranked by number of mutual friends",
+    response_description="Return the recommended profiles"
+)
+async def get_recommendations(
+    profile_id: int = Path(description="The ID of the profile to get recommendations"),
+    limit: int = Query(
+        10, description="Maximum number of recommendations", ge=1, le=RECOMMENDATIONS_TOP_K),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the friend recommendations of a profile
+    """
+    if await Profile.get(db, profile_id) is None:
+        raise HTTPException(status_code=404, detail=PROFILE_NOT_FOUND)
+    recommendations = await Profile.get_recommendations(db, profile_id, limit)
+    if recommendations is None:
+        raise HTTPException(status_code=503, detail=RECOMMENDATIONS_NOT_READY)
+    return recommendations
+
+
+@profile_router.get(
+    "/{profile_id}/mutual/{other_id}",
+    response_model=PaginatedProfileResponse,
+    status_code=200,
+    summary="Get the mutual friends of two profiles",
+    description="Get the friends shared by two profiles ordered by id",
+    response_description="Return the mutual friends of the profiles"
+)
+async def get_mutual_friends(  # pylint: disable=too-many-arguments
+    request: Request,
+    profile_id: int = Path(description="The ID of the first profile"),
+    other_id: int = Path(description="The ID of the second profile"),
+    skip: int = Query(
+        0, description="Skip records to get paginated results", ge=0),
+    limit: int = Query(
+        10, description="Limit records to get paginated results", ge=1, le=200),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Get the mutual friends of two profiles
+    """
+    base_url = request.url._url.split(  # pylint: disable=protected-access
+        "?")[0]
+    return await Profile.get_mutual_friends(db, profile_id, other_id, base_url, skip, limit)
+
+
+@profile_router.get(
+    "/{profile_id}/mutual",
+    response_model=MutualCountsResponse,
+    status_code=200,
+    summary="Count the mutual friends with many profiles",
+    description="Count the friends shared by a profile with each one of the given profiles",
+    response_description="Return the mutual friends count of each profile"
+)
+async def get_mutual_counts(
+    profile_id: int = Path(description="The ID of the viewer profile"),
+    profile_ids: List[int] = Query(
+        ..., description="The IDs of the profiles to compare with the viewer",
+        min_length=1, max_length=MUTUAL_BATCH_MAX_PROFILES),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Count the mutual friends of a profile with many profiles
+    """
+    return await Profile.get_mutual_counts(db, profile_id, profile_ids)
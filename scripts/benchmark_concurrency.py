@@ -0,0 +1,111 @@
+"""
+This script compares the throughput of concurrent requests with blocking and asynchronous database sessions.
+"""
+import time
+import asyncio
+import argparse
+import logging
+import statistics
+from typing import Awaitable, Callable
+from sqlalchemy import func, select, text
+from app.db.config import AsyncSessionLocal, SessionLocal, async_engine, engine
+from app.db.models import Profile as ProfileModel
+from scripts.benchmark_search import load_profiles, percentile
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+# Server side delay emulating the round trip to a remote database
+LATENCY_QUERY = text("SELECT pg_sleep(:seconds)")
+
+# Total of profiles and first page of the profile listing
+COUNT_QUERY = select(func.count()).select_from(ProfileModel)  # pylint: disable=not-callable
+
+
+def page_query(limit: int):
+    """
+    Get the query of the first page of the profile listing
+    """
+    return select(ProfileModel).order_by(ProfileModel.created_at, ProfileModel.id).limit(limit)
+
+
+async def blocking_request(latency_ms: float, limit: int):
+    """
+    Handle a profile listing request with a synchronous session, as the handlers did before,
+    blocking the event loop while the queries run
+    """
+    with SessionLocal() as db:
+        if latency_ms > 0:
+            db.execute(LATENCY_QUERY, {"seconds": latency_ms / 1000})
+        db.scalar(COUNT_QUERY)
+        db.scalars(page_query(limit)).all()
+
+
+async def async_request(latency_ms: float, limit: int):
+    """
+    Handle a profile listing request with an asynchronous session, other requests run while
+    the queries wait for the database
+    """
+    async with AsyncSessionLocal() as db:
+        if latency_ms > 0:
+            await db.execute(LATENCY_QUERY, {"seconds": latency_ms / 1000})
+        await db.scalar(COUNT_QUERY)
+        (await db.scalars(page_query(limit))).all()
+
+
+async def run_requests(
+    handler: Callable[[float, int], Awaitable[None]],
+    total_requests: int,
+    concurrency: int,
+    latency_ms: float,
+    limit: int
+) -> tuple[float, list[float]]:
+    """
+    Run the requests with the given concurrency in a single event loop, as one worker does,
+    and get the elapsed seconds and the latency of each request in milliseconds
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(latency_ms, limit)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(total_requests)))
+    return (time.perf_counter() - start, samples)
+
+
+async def benchmark_concurrency(total_requests: int, concurrency: int, latency_ms: float, limit: int):
+    """
+    Run the same requests with both kinds of sessions and log the throughput of each one
+    """
+    for (name, handler) in (("blocking", blocking_request), ("async", async_request)):
+        # Warm up the connection pool before measuring
+        await run_requests(handler, concurrency, concurrency, 0, limit)
+        (elapsed, samples) = await run_requests(handler, total_requests, concurrency, latency_ms, limit)
+        logger.info("%-8s concurrency=%d requests=%d throughput=%8.1f req/s p50=%7.2fms p95=%7.2fms",
+                    name, concurrency, total_requests, total_requests / elapsed,
+                    statistics.median(samples), percentile(samples, 0.95))
+    await async_engine.dispose()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description="Compare blocking and asynchronous database sessions")
+    parser.add_argument("--total_profiles", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--latency_ms", type=float, default=5)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    # Call to load the profiles and measure the requests
+    load_profiles(args.total_profiles)
+    asyncio.run(benchmark_concurrency(args.requests, args.concurrency, args.latency_ms, args.limit))
@@ -0,0 +1,126 @@
+"""
+This script measures the latency of the profile name search and of the name autocomplete.
+"""
+import time
+import random
+import asyncio
+import argparse
+import logging
+import statistics
+from collections import Counter
+from sqlalchemy import insert, text
+from app.controllers.db_types import ProfileSearchModeEnum, TotalModeEnum
+from app.controllers.location_counts import LocationCounts
+from app.controllers.profile import Profile
+from app.db.config import AsyncSessionLocal, SessionLocal, async_engine
+from app.db.models import Profile as ProfileModel
+from scripts.gen_profiles import load_items_from_text_file
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 10000
+
+
+def load_profiles(total_profiles: int):
+    """
+    Insert random profiles with the sample names until the table has the requested size
+    """
+    names = load_items_from_text_file("data/names.txt")
+    lastnames = load_items_from_text_file("data/lastnames.txt")
+    with SessionLocal() as db:
+        existing = db.query(ProfileModel).count()
+        logger.info("Inserting %d profiles", max(total_profiles - existing, 0))
+        for start in range(existing, total_profiles, BATCH_SIZE):
+            rows = [{
+                "img": "",
+                "first_name": random.choice(names),
+                "last_name": random.choice(lastnames),
+                "phone": "",
+                "available": True,
+            } for _ in range(min(BATCH_SIZE, total_profiles - start))]
+            db.execute(insert(ProfileModel), rows)
+            db.execute(LocationCounts.upsert_statement(Counter({(None, None, None): len(rows)})))
+            db.commit()
+        db.execute(text("ANALYZE profiles"))
+        db.commit()
+
+
+def percentile(samples: list[float], ratio: float) -> float:
+    """
+    Get a percentile of the latency samples
+    """
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+async def benchmark_search(  # pylint: disable=too-many-arguments
+    terms: list[str],
+    repeat: int,
+    total_mode: TotalModeEnum,
+    rank: bool,
+    search_mode: ProfileSearchModeEnum | None = None
+):
+    """
+    Run the searches of the profile listing and log the latency percentiles of each term
+    """
+    async with AsyncSessionLocal() as db:
+        await Profile.load_search_mode(db)
+        if search_mode not in (None, ProfileSearchModeEnum.AUTO):
+            Profile.search_mode = search_mode
+        logger.info("Search mode: %s, total mode: %s, rank: %s", Profile.search_mode.value, total_mode.value, rank)
+        for term in terms:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                page = await Profile.get_all(db, "", q=term, total_mode=total_mode, rank=rank)
+                samples.append((time.perf_counter() - start) * 1000)
+            logger.info("q=%-10s total=%-8s p50=%7.2fms p95=%7.2fms p99=%7.2fms", term, page.total,
+                        statistics.median(samples), percentile(samples, 0.95), percentile(samples, 0.99))
+
+
+async def benchmark_autocomplete(prefixes: list[str], repeat: int, limit: int):
+    """
+    Run the name autocomplete and log the latency percentiles of each prefix
+    """
+    async with AsyncSessionLocal() as db:
+        logger.info("Autocomplete limit: %d", limit)
+        for prefix in prefixes:
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                suggestions = await Profile.autocomplete(db, prefix, limit)
+                samples.append((time.perf_counter() - start) * 1000)
+            logger.info("q=%-10s found=%-8d p50=%7.2fms p95=%7.2fms p99=%7.2fms", prefix, len(suggestions),
+                        statistics.median(samples), percentile(samples, 0.95), percentile(samples, 0.99))
+
+
+async def run_benchmarks(args: argparse.Namespace):
+    """
+    Measure the searches and then the autocomplete, sharing the engine
+    """
+    await benchmark_search(args.terms, args.repeat, args.total_mode, args.rank, args.search_mode)
+    if args.autocomplete_limit > 0:
+        await benchmark_autocomplete(args.prefixes, args.repeat, args.autocomplete_limit)
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description="Measure the profile name search and autocomplete latency")
+    parser.add_argument("--total_profiles", type=int, default=1000000)
+    parser.add_argument("--terms", type=str, nargs="+", default=["ann", "john", "smith", "mar", "zzz"])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--total_mode", type=TotalModeEnum, default=TotalModeEnum.EXACT)
+    parser.add_argument("--search_mode", type=ProfileSearchModeEnum, default=None)
+    parser.add_argument("--rank", action="store_true")
+    parser.add_argument("--prefixes", type=str, nargs="+", default=["a", "jo", "bab", "mar", "zzz"])
+    parser.add_argument("--autocomplete_limit", type=int, default=10, help="Suggestions per prefix, 0 to skip")
+    args = parser.parse_args()
+
+    # Call to load the profiles and measure the searches and the autocomplete
+    load_profiles(args.total_profiles)
+    asyncio.run(run_benchmarks(args))
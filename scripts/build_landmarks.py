@@ -0,0 +1,47 @@
+"""
+This script builds the landmark distance table of the friendship graph.
+"""
+import argparse
+import logging
+from app.config import LANDMARKS_PATH
+from app.controllers.friendship import Friendship
+from app.controllers.graph_index import GraphIndex
+from app.controllers.graph_landmarks import LandmarkIndex
+from app.db.config import SessionLocal
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def build_landmarks(total_landmarks: int, output: str) -> LandmarkIndex:
+    """
+    Build the landmark distance table from the friendship table and save it
+    """
+    db = SessionLocal()
+    try:
+        logger.info("Loading friendship graph")
+        graph = GraphIndex()
+        graph.load(Friendship.get_all_edges(db))
+    finally:
+        db.close()
+
+    logger.info("Building landmark distances")
+    landmarks = LandmarkIndex()
+    landmarks.build(graph, total_landmarks)
+    landmarks.save(output)
+    logger.info("Landmark table with %d landmarks saved to %s", len(landmarks.landmarks), output)
+    return landmarks
+
+
+if __name__ == "__main__":
+    # Parse the command line arguments
+    parser = argparse.ArgumentParser(description="Build the landmark distance table")
+    parser.add_argument("--total_landmarks", type=int, default=16)
+    parser.add_argument("--output", type=str, default=LANDMARKS_PATH)
+    args = parser.parse_args()
+
+    # Call to build the landmark table
+    build_landmarks(args.total_landmarks, args.output)
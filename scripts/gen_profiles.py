@@ -5,6 +5,8 @@ import json
 import argparse
 import random
 import logging
+from collections import Counter
+from app.controllers.location_counts import LocationCounts
 from app.db.config import SessionLocal
 from app.db.models import Profile
 
@@ -116,8 +118,11 @@ def gen_profiles(total_profiles: int, total_friends: int) -> list[dict]:  # pyli
         # Attach the friend relationship
         profiles[profile_idx].friends.append(profiles[friend_idx])
 
-    # Persists the new profiles in the database
+    # Persists the new profiles in the database with the number of profiles of each location
     db.add_all(profiles)
+    counts_stmt = LocationCounts.upsert_statement(Counter(LocationCounts.location(profile) for profile in profiles))
+    if counts_stmt is not None:
+        db.execute(counts_stmt)
     db.commit()
     logger.info(
         "%d profiles and %d friend relationships generated successfully",
@@ -1,13 +1,16 @@
 """
 Pytest configuration
 """
-from typing import Generator
+from typing import AsyncGenerator, Generator
 import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 from alembic.command import downgrade, upgrade
 from alembic.config import Config as AlembicConfig
-from app.db.config import engine, SessionLocal
+from app.db.config import ASYNC_DATABASE_URL, engine, SessionLocal
 from app.main import app
 
 
@@ -33,6 +36,18 @@ def db_session() -> Generator[Session, None, None]:
     connection.close()
 
 
+@pytest_asyncio.fixture
+async def async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Create a new asynchronous database session for the tests calling the controllers
+    """
+    # Every test runs in its own event loop, so the connections are not pooled across tests
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=NullPool)
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+    await async_engine.dispose()
+
+
 @pytest.fixture(scope="class")
 def test_client():
     """
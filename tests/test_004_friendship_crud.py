@@ -66,6 +66,14 @@ class TestFriendshipCRUD:
             "/v1/friendship/create", json={"profile_id": 1, "friend_id": NON_VALID_PROFILE_ID})
         assert_data_not_found(response, FRIEND_NOT_FOUND)
 
+    def test_create_friendship_with_invalid_profiles(self):
+        """
+        Test the create friendship endpoint with both profiles invalid
+        """
+        response = self.client.post(
+            "/v1/friendship/create", json={"profile_id": NON_VALID_PROFILE_ID, "friend_id": NON_VALID_PROFILE_ID + 1})
+        assert_data_not_found(response, PROFILE_NOT_FOUND)
+
     def test_check_friendship_count(self):
         """
         Check the number of friendships
@@ -1,11 +1,18 @@
 """
 Tests for the shorter connection endpoint
 """
+import json
+import time
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.controllers.connection_cache import connection_cache
+from app.controllers.db_types import ConnectionSearchModeEnum, ConnectionLimitEnum
 from app.controllers.friendship import Friendship
-from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE
+from app.controllers.graph_search import GraphSearch, SearchLimits
+from tests.constants import PROFILE_DATA, PROFILES_FRIENDSHIPS_TO_CREATE, NON_VALID_PROFILE_ID
 from tests.utils import create_profiles, create_friendship
 
 
@@ -37,46 +44,248 @@ class TestShorterConnection:
         create_friendship(self.client, 2, 4)
         create_friendship(self.client, 6, 4)
 
-    def test_get_all_friends(self):
+    @pytest.mark.asyncio
+    async def test_get_all_friends(self, async_db: AsyncSession):
         """
         Test the function to get all friends ids
         """
-        friends = Friendship.get_all_friends(self.db, 3)
+        friends = await Friendship.get_all_friends(async_db, 3)
         assert friends == [1, 6]
 
     @pytest.mark.asyncio
-    async def test_get_shorter_connection(self):
+    async def test_get_frontier_friends(self, async_db: AsyncSession):
+        """
+        Test the function to get the friends of a whole frontier level
+        """
+        friends = await Friendship.get_frontier_friends(async_db, [3, 4])
+        assert friends == {3: [1, 6], 4: [2, 6]}
+        assert await Friendship.get_frontier_friends(async_db, [5]) == {5: []}
+        assert Friendship.query_frontier_friends(self.db, [3, 4]) == friends
+
+    def test_bidirectional_bfs(self):
+        """
+        Test the bidirectional search over an in-memory chain graph
+        """
+        graph = {i: [i - 1, i + 1] for i in range(1, 20)}
+        graph[0] = [1]
+        graph[20] = [19]
+
+        def neighbors(nodes):
+            return {node: graph.get(node, []) for node in nodes}
+
+        assert GraphSearch.bidirectional_bfs(neighbors, 0, 20).path == list(range(21))
+        assert GraphSearch.bidirectional_bfs(neighbors, 15, 3).path == list(range(15, 2, -1))
+        assert GraphSearch.bidirectional_bfs(neighbors, 7, 7).path == [7]
+        result = GraphSearch.bidirectional_bfs(neighbors, 0, 21)
+        assert not result.path and result.complete
+
+        # Give up the search when a limit is reached
+        result = GraphSearch.bidirectional_bfs(neighbors, 0, 20, SearchLimits(max_depth=19))
+        assert not result.path and not result.complete
+        assert result.limit == ConnectionLimitEnum.MAX_DEPTH
+        assert GraphSearch.bidirectional_bfs(neighbors, 0, 20, SearchLimits(max_depth=20)).complete
+        result = GraphSearch.bidirectional_bfs(neighbors, 0, 20, SearchLimits(max_visited=10))
+        assert result.limit == ConnectionLimitEnum.MAX_VISITED
+        result = GraphSearch.bidirectional_bfs(neighbors, 0, 20, SearchLimits(deadline=time.monotonic()))
+        assert result.limit == ConnectionLimitEnum.DEADLINE
+
+    def test_single_source_bfs(self):
+        """
+        Test the single source search serving many targets
+        """
+        graph = {1: [2, 3], 2: [1, 4], 3: [1, 4], 4: [2, 3, 5], 5: [4], 6: [7], 7: [6]}
+
+        def neighbors(nodes):
+            return {node: graph.get(node, []) for node in nodes}
+
+        results = GraphSearch.single_source_bfs(neighbors, 1, [1, 4, 5, 6])
+        assert results[1].path == [1]
+        assert results[4].path == [1, 2, 4]
+        assert results[5].path == [1, 2, 4, 5]
+        assert not results[6].path and results[6].complete
+
+        results = GraphSearch.single_source_bfs(neighbors, 1, [3, 5], SearchLimits(max_depth=2))
+        assert results[3].path == [1, 3]
+        assert not results[5].path and results[5].limit == ConnectionLimitEnum.MAX_DEPTH
+
+    @pytest.mark.asyncio
+    async def test_get_shorter_connection(self, async_db: AsyncSession):
         """
         Test the get shorter connection function
         """
-        path = await Friendship.get_connection(self.db, 3, 4)
+        path = await Friendship.get_connection(async_db, 3, 4)
         assert path == [3, 6, 4]
 
-        path = await Friendship.get_connection(self.db, 6, 1)
+        path = await Friendship.get_connection(async_db, 6, 1)
         assert path == [6, 3, 1]
 
-        path = await Friendship.get_connection(self.db, 1, 5)
+        path = await Friendship.get_connection(async_db, 1, 5)
         assert path == []
 
-        path = await Friendship.get_connection(self.db, 4, 2)
+        path = await Friendship.get_connection(async_db, 4, 2)
         assert path == [4, 2]
 
+        path = await Friendship.get_connection(async_db, 1, 6)
+        assert path == [1, 3, 6]
+
+    @pytest.mark.asyncio
+    async def test_get_shorter_connection_modes(self, async_db: AsyncSession):
+        """
+        Test that every search mode returns the same connections
+        """
+        pairs = [(3, 4), (6, 1), (1, 5), (4, 2), (1, 6), (2, 2), (3, NON_VALID_PROFILE_ID)]
+        for (profile_id, friend_id) in pairs:
+            expected = await Friendship.run_search(
+                async_db, profile_id, friend_id, ConnectionSearchModeEnum.INDEX, SearchLimits())
+            for mode in [ConnectionSearchModeEnum.BFS, ConnectionSearchModeEnum.SQL]:
+                result = await Friendship.run_search(async_db, profile_id, friend_id, mode, SearchLimits())
+                assert result.path == expected.path and result.complete
+
+        # Layered graph with many shorter paths between its ends, where the lowest meeting
+        # profile of the bidirectional search is not on the lexicographically smallest path
+        for _ in range(8):
+            assert self.client.post("/v1/profile/create", json=PROFILE_DATA).status_code == 201
+        ties = [(11, 12), (11, 13), (11, 14), (12, 17), (13, 16), (13, 17), (14, 15), (14, 16),
+                (15, 18), (16, 18), (17, 18)]
+        for (profile_id, friend_id) in ties:
+            create_friendship(self.client, profile_id, friend_id)
+        expected_paths = {(11, 18): [11, 12, 17, 18], (18, 11): [18, 15, 14, 11], (12, 15): [12, 11, 14, 15],
+                          (15, 12): [15, 14, 11, 12], (16, 12): [16, 13, 11, 12], (17, 14): [17, 12, 11, 14]}
+        for ((profile_id, friend_id), path) in expected_paths.items():
+            for mode in [ConnectionSearchModeEnum.INDEX, ConnectionSearchModeEnum.BFS, ConnectionSearchModeEnum.SQL]:
+                result = await Friendship.run_search(async_db, profile_id, friend_id, mode, SearchLimits())
+                assert result.path == path, mode
+
+        # The cached connection of a direction is not served for the other one
+        connection_cache.clear()
+        assert (await Friendship.search_connection(async_db, 11, 18)).path == [11, 12, 17, 18]
+        assert (await Friendship.search_connection(async_db, 18, 11)).path == [18, 15, 14, 11]
+        assert (await Friendship.search_connection(async_db, 11, 18)).path == [11, 12, 17, 18]
+
+        result = await Friendship.query_connection(async_db, 3, 4, SearchLimits(max_depth=1))
+        assert not result.path and result.limit == ConnectionLimitEnum.MAX_DEPTH
+        result = await Friendship.query_connection(async_db, 3, 4, SearchLimits(max_depth=2))
+        assert result.path == [3, 6, 4] and result.complete
+        result = await Friendship.query_connection(async_db, 3, 2, SearchLimits(max_visited=2))
+        assert not result.path and result.limit == ConnectionLimitEnum.MAX_VISITED
+        result = await Friendship.query_connection(async_db, 1, 5, SearchLimits(deadline=time.monotonic() + 1))
+        assert not result.path and result.complete
+
+    def test_high_degree_limits(self):
+        """
+        Test that the limits stop a search while it expands the level of a high degree profile
+        """
+        graph = {0: list(range(1, 10001)), 10000: [0, 10001], 10001: [10000, 10002], 10002: [10001]}
+        graph.update({i: [0] for i in range(1, 10000)})
+
+        def neighbors(nodes):
+            return {node: graph.get(node, []) for node in nodes}
+
+        def slow_neighbors(nodes):
+            if 0 in nodes:
+                time.sleep(0.05)
+            return neighbors(nodes)
+
+        assert GraphSearch.bidirectional_bfs(neighbors, 1, 10002).path == [1, 0, 10000, 10001, 10002]
+        result = GraphSearch.bidirectional_bfs(neighbors, 1, 10002, SearchLimits(max_visited=10))
+        assert not result.path and result.limit == ConnectionLimitEnum.MAX_VISITED and result.visited == 11
+        result = GraphSearch.single_source_bfs(neighbors, 1, [10002], SearchLimits(max_visited=10))[10002]
+        assert not result.path and result.limit == ConnectionLimitEnum.MAX_VISITED and result.visited == 11
+
+        result = GraphSearch.bidirectional_bfs(
+            slow_neighbors, 1, 10002, SearchLimits(deadline=time.monotonic() + 0.02))
+        assert result.limit == ConnectionLimitEnum.DEADLINE and result.visited == 3
+        result = GraphSearch.single_source_bfs(
+            slow_neighbors, 1, [10002], SearchLimits(deadline=time.monotonic() + 0.02))[10002]
+        assert result.limit == ConnectionLimitEnum.DEADLINE and result.visited == 2
+
+    @pytest.mark.asyncio
+    async def test_level_query_timeout(self, async_db: AsyncSession, monkeypatch: pytest.MonkeyPatch):
+        """
+        Test that the level queries of the bfs mode are canceled at the deadline
+        """
+        result = await Friendship.run_search(
+            async_db, 3, 4, ConnectionSearchModeEnum.BFS, SearchLimits(deadline=time.monotonic() + 5))
+        assert result.path == [3, 6, 4]
+        assert (await async_db.execute(text("SHOW statement_timeout"))).scalar() == "0"
+
+        query_frontier_friends = Friendship.query_frontier_friends
+
+        def slow_frontier_friends(db: Session, profile_ids):
+            db.execute(text("SELECT pg_sleep(2)"))
+            return query_frontier_friends(db, profile_ids)
+
+        monkeypatch.setattr(Friendship, "query_frontier_friends", staticmethod(slow_frontier_friends))
+        connection_cache.clear()
+        start = time.monotonic()
+        result = await Friendship.run_search(
+            async_db, 3, 4, ConnectionSearchModeEnum.BFS, SearchLimits(deadline=time.monotonic() + 0.2))
+        assert not result.path and result.limit == ConnectionLimitEnum.DEADLINE
+        results = await Friendship.search_connections(async_db, 3, [4, 2], ConnectionSearchModeEnum.BFS, timeout_ms=200)
+        assert all(result.limit == ConnectionLimitEnum.DEADLINE for result in results.values())
+        assert time.monotonic() - start < 2
+
     def test_get_shorter_connection_api(self):
         """
         Test the get shorter connection endpoint
         """
         response = self.client.get("/v1/friendship/3/4/connection")
         assert response.status_code == 200
-        assert response.json() == {"path": [3, 6, 4]}
+        assert response.json() == {"path": [3, 6, 4], "complete": True, "limit": None}
 
         response = self.client.get("/v1/friendship/6/1/connection")
         assert response.status_code == 200
-        assert response.json() == {"path": [6, 3, 1]}
+        assert response.json() == {"path": [6, 3, 1], "complete": True, "limit": None}
 
         response = self.client.get("/v1/friendship/1/5/connection")
         assert response.status_code == 200
-        assert response.json() == {"path": []}
+        assert response.json() == {"path": [], "complete": True, "limit": None}
 
         response = self.client.get("/v1/friendship/4/2/connection")
         assert response.status_code == 200
-        assert response.json() == {"path": [4, 2]}
+        assert response.json() == {"path": [4, 2], "complete": True, "limit": None}
+
+        response = self.client.get("/v1/friendship/3/4/connection?mode=sql")
+        assert response.status_code == 200
+        assert response.json() == {"path": [3, 6, 4], "complete": True, "limit": None}
+
+    def test_get_shorter_connection_limits_api(self):
+        """
+        Test the get shorter connection endpoint when the search reaches a limit
+        """
+        for mode in ["index", "bfs", "sql"]:
+            response = self.client.get(f"/v1/friendship/3/2/connection?mode={mode}&max_depth=1")
+            assert response.status_code == 200
+            assert response.json() == {"path": [], "complete": False, "limit": "max-depth"}
+
+        response = self.client.get("/v1/friendship/3/2/connection?max_depth=2")
+        assert response.status_code == 200
+        assert response.json() == {"path": [3, 1, 2], "complete": True, "limit": None}
+
+        response = self.client.get("/v1/friendship/3/2/connection?max_depth=0")
+        assert response.status_code == 422
+
+    def test_get_connections_batch_api(self):
+        """
+        Test the batch connection endpoint
+        """
+        pairs = [(3, 4), (6, 1), (3, 2), (1, 5), (3, 5), (4, 2)]
+        for mode in ["index", "bfs", "sql"]:
+            connection_cache.clear()
+            response = self.client.post(
+                f"/v1/friendship/connections?mode={mode}",
+                json={"pairs": [{"profile_id": a, "friend_id": b} for (a, b) in pairs]})
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "application/x-ndjson"
+            results = {(line["profile_id"], line["friend_id"]): line
+                       for line in map(json.loads, response.text.splitlines())}
+            assert len(results) == len(pairs)
+            assert results[(3, 4)]["path"] == [3, 6, 4]
+            assert results[(6, 1)]["path"] == [6, 3, 1]
+            assert results[(3, 2)]["path"] == [3, 1, 2]
+            assert results[(1, 5)] == {"profile_id": 1, "friend_id": 5, "path": [], "complete": True, "limit": None}
+            assert results[(3, 5)]["path"] == []
+            assert results[(4, 2)]["path"] == [4, 2]
+
+        response = self.client.post("/v1/friendship/connections", json={"pairs": []})
+        assert response.status_code == 422
@@ -0,0 +1,145 @@
+"""
+Tests for the in-memory graph index
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.controllers import graph_index as graph_index_module
+from app.controllers.friendship import Friendship
+from app.controllers.graph_index import GraphIndex, graph_index
+from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE
+from tests.utils import create_profiles, create_friendship
+
+
+class TestGraphIndex:
+    """
+    Tests for the in-memory graph index
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_build_index(self):
+        """
+        Test the index build removing relationships stored in both directions
+        """
+        index = GraphIndex()
+        assert not index.is_ready
+        index.load([(1, 2), (2, 1), (1, 3), (4, 2)])
+        assert index.is_ready
+        assert index.total_edges == 3
+        assert index.get_friends(1) == [2, 3]
+        assert index.get_friends(2) == [1, 4]
+        assert index.get_friends(5) == []
+        assert index.has_edge(4, 2) and not index.has_edge(3, 4)
+        assert list(index.edges()) == [(1, 2), (1, 3), (2, 4)]
+
+    def test_incremental_changes(self):
+        """
+        Test the index changes and the merge of the pending changes
+        """
+        index = GraphIndex()
+        index.load([(1, 2)])
+        index.add_edge(2, 3)
+        index.add_edge(3, 2)
+        index.add_edge(7, 1)
+        index.remove_edge(2, 1)
+        assert index.total_edges == 2
+        assert index.get_friends(1) == [7]
+        assert index.get_friends(2) == [3]
+        assert index.stats()["pending_changes"] == 3
+
+        index.compact()
+        assert index.stats()["pending_changes"] == 0
+        assert index.get_friends(1) == [7]
+        assert index.get_friends(2) == [3]
+        assert index.get_friends(7) == [1]
+
+    @pytest.mark.asyncio
+    async def test_background_compaction(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        Test the merge of the pending changes off the request path with the changes made meanwhile
+        """
+        monkeypatch.setattr(graph_index_module, "GRAPH_INDEX_COMPACT_MIN", 2)
+        monkeypatch.setattr(graph_index_module, "GRAPH_INDEX_COMPACT_RATIO", 0)
+        index = GraphIndex()
+        index.load([(1, 2), (2, 3)])
+        index.add_edge(3, 4)
+        assert not index.stats()["compacting"]
+        index.remove_edge(1, 2)
+        assert index.stats()["compacting"]
+
+        # The changes made during the merge are kept over the new arrays
+        index.add_edge(1, 2)
+        index.remove_edge(3, 4)
+        index.add_edge(5, 1)
+        assert index.get_friends(1) == [2, 5]
+        await index.wait_compaction()
+        stats = index.stats()
+        assert not stats["compacting"] and stats["pending_changes"] == 3 and stats["friendships"] == 3
+        assert index.get_friends(1) == [2, 5] and index.get_friends(3) == [2] and index.get_friends(4) == []
+        assert list(index.edges()) == [(1, 2), (1, 5), (2, 3)]
+
+        index.add_edge(4, 6)
+        await index.wait_compaction()
+        assert index.stats()["pending_changes"] == 0
+        assert list(index.edges()) == [(1, 2), (1, 5), (2, 3), (4, 6)]
+
+        # A reload discards the merge of the previous arrays
+        index.remove_edge(4, 6)
+        index.remove_edge(2, 3)
+        assert index.stats()["compacting"]
+        index.load([(7, 8)])
+        assert not index.stats()["compacting"]
+        await asyncio.sleep(0.1)
+        assert list(index.edges()) == [(7, 8)] and index.stats()["pending_changes"] == 0
+
+    @pytest.mark.asyncio
+    async def test_index_follows_writes(self, async_db: AsyncSession):
+        """
+        Test that the friendship writes update the shared index
+        """
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        assert graph_index.is_ready
+        create_friendship(self.client, 1, 2)
+        create_friendship(self.client, 3, 2)
+        assert await Friendship.get_all_friends(async_db, 2) == [1, 3]
+
+        response = self.client.delete("/v1/friendship/1/2/delete")
+        assert response.status_code == 200
+        assert await Friendship.get_all_friends(async_db, 2) == [3]
+        assert await Friendship.get_all_friends(async_db, 1) == []
+
+    def test_index_stats_api(self):
+        """
+        Test the graph index statistics endpoint
+        """
+        response = self.client.get("/v1/friendship/index/stats")
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["ready"] is True
+        assert stats["friendships"] == 1
+        assert stats["bytes_per_friendship"] > 0
+
+    def test_profile_delete_updates_index(self):
+        """
+        Test that deleting a profile removes its relationships from the connection searches
+        """
+        create_friendship(self.client, 3, 4)
+        response = self.client.get("/v1/friendship/2/4/connection")
+        assert response.json()["path"] == [2, 3, 4]
+
+        assert self.client.delete("/v1/profile/3/delete").status_code == 200
+        assert graph_index.get_friends(2) == [] and graph_index.get_friends(4) == []
+        for mode in ["index", "bfs"]:
+            response = self.client.get("/v1/friendship/2/4/connection", params={"mode": mode})
+            assert response.json() == {"path": [], "complete": True, "limit": None}
+        response = self.client.get("/v1/profile/2/friends")
+        assert response.json()["total"] == 0
@@ -0,0 +1,146 @@
+"""
+Tests for the connected components of the friendship graph
+"""
+import time
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.constants import PROFILE_NOT_FOUND
+from app.controllers.graph_components import ComponentIndex, component_index
+from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE, NON_VALID_PROFILE_ID
+from tests.utils import assert_data_not_found, create_profiles, create_friendship
+
+
+class TestGraphComponents:
+    """
+    Tests for the connected components of the friendship graph
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_build_components(self):
+        """
+        Test the union-find labels and sizes
+        """
+        index = ComponentIndex()
+        assert not index.are_disconnected(1, 2)
+        index.load([(4, 2), (2, 7), (5, 6)])
+        assert index.get_component(7) == (2, 3)
+        assert index.get_component(6) == (5, 2)
+        assert index.get_component(1) == (1, 1)
+        assert index.get_component(30) == (30, 1)
+        assert index.are_disconnected(4, 5)
+        assert not index.are_disconnected(4, 7)
+
+        # New relationships merge components
+        index.add_edge(7, 6)
+        assert index.get_component(5) == (2, 5)
+        assert not index.are_disconnected(4, 5)
+
+        # Deleted relationships require a rebuild
+        index.remove_edge(7, 6)
+        assert index.is_dirty
+        index.load([(4, 2), (2, 7), (5, 6)])
+        assert not index.is_dirty
+        assert index.are_disconnected(4, 5)
+
+    @pytest.mark.asyncio
+    async def test_rebuild_in_background(self):
+        """
+        Test the rebuild off the request path with the relationships changed meanwhile
+        """
+        index = ComponentIndex()
+        index.load([(1, 2), (2, 3), (5, 6)])
+        index.remove_edge(2, 3)
+        rebuild = index.rebuild_in_background(lambda: [(1, 2), (5, 6)])
+        assert index.rebuild_in_background(lambda: []) is rebuild
+        assert index.get_component(3) == (1, 3)
+
+        index.add_edge(3, 4)
+        await rebuild
+        assert not index.is_dirty
+        assert index.get_component(1) == (1, 2)
+        assert index.get_component(4) == (3, 2)
+        assert index.are_disconnected(1, 3)
+
+        # A deletion during the rebuild keeps the components dirty
+        index.remove_edge(1, 2)
+        rebuild = index.rebuild_in_background(lambda: [(1, 2), (3, 4), (5, 6)])
+        index.remove_edge(5, 6)
+        await rebuild
+        assert index.is_dirty
+        assert index.get_component(1) == (1, 2) and index.get_component(6) == (5, 2)
+
+        # A load discards the rebuild that is still running
+        rebuild = index.rebuild_in_background(lambda: [(1, 2)])
+        index.load([(7, 8)])
+        await rebuild
+        assert index.get_component(8) == (7, 2) and index.get_component(1) == (1, 1)
+
+    def test_unknown_ids(self):
+        """
+        Test that the ids outside the index are singletons and don't grow it
+        """
+        index = ComponentIndex()
+        index.load([])
+        assert index.get_component(3) == (3, 1)
+        assert index.are_disconnected(1, 2) and not index.are_disconnected(2, 2)
+
+        index.load([(1, 2), (2, 3)])
+        assert index.get_component(-1) == (-1, 1)
+        assert index.get_component(2 ** 31) == (2 ** 31, 1)
+        assert index.are_disconnected(1, -1)
+        assert index.are_disconnected(2 ** 31, 1)
+        assert index.are_disconnected(2 ** 40, 2 ** 41)
+        assert len(index._parents) == 4  # pylint: disable=protected-access
+
+    def test_components_api(self):
+        """
+        Test the component endpoint and the unreachable connections
+        """
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        create_friendship(self.client, 1, 2)
+        create_friendship(self.client, 2, 3)
+        create_friendship(self.client, 5, 6)
+        assert component_index.is_ready
+
+        response = self.client.get("/v1/friendship/3/component")
+        assert response.status_code == 200
+        assert response.json() == {"profile_id": 3, "component_id": 1, "size": 3}
+        response = self.client.get("/v1/friendship/4/component")
+        assert response.json() == {"profile_id": 4, "component_id": 4, "size": 1}
+
+        response = self.client.get("/v1/friendship/1/6/connection")
+        assert response.json() == {"path": [], "complete": True, "limit": None}
+        response = self.client.get(f"/v1/friendship/1/{2 ** 31}/connection")
+        assert response.status_code == 200
+        assert response.json() == {"path": [], "complete": True, "limit": None}
+
+        response = self.client.get(f"/v1/friendship/{NON_VALID_PROFILE_ID}/component")
+        assert_data_not_found(response, PROFILE_NOT_FOUND)
+
+    def test_components_after_delete(self):
+        """
+        Test that the components are rebuilt after deleting a relationship
+        """
+        response = self.client.delete("/v1/friendship/2/3/delete")
+        assert response.status_code == 200
+        assert component_index.is_dirty
+
+        # The first request starts the rebuild and gets the previous components
+        response = self.client.get("/v1/friendship/3/component")
+        assert response.json()["size"] in (1, 3)
+        deadline = time.monotonic() + 5
+        while component_index.is_dirty and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = self.client.get("/v1/friendship/3/component")
+        assert response.json() == {"profile_id": 3, "component_id": 3, "size": 1}
+        response = self.client.get("/v1/friendship/2/component")
+        assert response.json() == {"profile_id": 2, "component_id": 1, "size": 2}
+        assert not component_index.is_dirty
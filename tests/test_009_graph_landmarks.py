@@ -0,0 +1,173 @@
+"""
+Tests for the landmark distance oracle
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.constants import LANDMARKS_NOT_LOADED
+from app.controllers.db_types import ConnectionLimitEnum
+from app.controllers.graph_index import GraphIndex, graph_index
+from app.controllers.graph_landmarks import LandmarkIndex, landmark_index
+from app.controllers.graph_search import GraphSearch, SearchLimits
+from scripts.build_landmarks import build_landmarks
+from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE
+from tests.utils import create_profiles, create_friendship
+
+# Grid of 5x5 profiles numbered from 1, plus the isolated pair 26-27
+GRID_EDGES = ([(i, i + 1) for i in range(1, 26) if i % 5 != 0] +
+              [(i, i + 5) for i in range(1, 21)] + [(26, 27)])
+
+
+class TestGraphLandmarks:
+    """
+    Tests for the landmark distance oracle
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_bounds(self):
+        """
+        Test that the landmark bounds contain the real distances
+        """
+        graph = GraphIndex()
+        graph.load(GRID_EDGES)
+        landmarks = LandmarkIndex()
+        landmarks.build(graph, 4)
+        assert len(landmarks.landmarks) == 4
+
+        for source in range(1, 26):
+            for target in range(1, 26):
+                distance = len(GraphSearch.bidirectional_bfs(
+                    graph.get_frontier_friends, source, target).path) - 1
+                (lower, upper, disconnected) = landmarks.bounds(source, target)
+                assert not disconnected
+                assert lower <= distance <= upper
+        assert landmarks.bounds(1, 26) == (None, None, True)
+
+        # Profiles outside of the table have unknown bounds
+        for (source, target) in [(1, 28), (28, 1), (-1, 1), (1, 2 ** 31)]:
+            assert landmarks.bounds(source, target) == (1, None, False)
+
+        # Deleted friendships stretch the distances and created ones can connect any profiles
+        (lower, _, _) = landmarks.bounds(1, 25)
+        landmarks.on_deleted()
+        assert landmarks.bounds(1, 25) == (lower, None, False)
+        assert landmarks.bounds(1, 26) == (None, None, True)
+        landmarks.on_created()
+        assert landmarks.bounds(1, 25) == (1, None, False)
+        assert landmarks.bounds(1, 26) == (1, None, False)
+
+    def test_astar(self):
+        """
+        Test that the A* search finds paths as short as the BFS ones
+        """
+        graph = GraphIndex()
+        graph.load(GRID_EDGES)
+        landmarks = LandmarkIndex()
+        landmarks.build(graph, 4)
+
+        for (source, target) in [(1, 25), (7, 19), (5, 21), (13, 13)]:
+            expected = GraphSearch.bidirectional_bfs(graph.get_frontier_friends, source, target).path
+            path = landmarks.astar(graph, source, target).path
+            assert len(path) == len(expected)
+            assert path[0] == source and path[-1] == target
+            assert all(graph.has_edge(a, b) for (a, b) in zip(path, path[1:]))
+        assert not landmarks.astar(graph, 1, 26).path
+
+        result = landmarks.astar(graph, 1, 25, SearchLimits(max_depth=7))
+        assert not result.path and result.limit == ConnectionLimitEnum.MAX_DEPTH
+
+    def test_save_and_load(self, tmp_path):
+        """
+        Test the landmark table file and the staleness after the load
+        """
+        graph = GraphIndex()
+        graph.load(GRID_EDGES)
+        landmarks = LandmarkIndex()
+        landmarks.build(graph, 3)
+        landmarks.save(tmp_path / "landmarks.bin")
+
+        loaded = LandmarkIndex()
+        loaded.load(tmp_path / "landmarks.bin", graph)
+        assert loaded.landmarks == landmarks.landmarks
+        assert loaded.bounds(1, 25) == landmarks.bounds(1, 25)
+        assert not loaded.is_stale and loaded.can_guide_search()
+
+        changed = GraphIndex()
+        changed.load(GRID_EDGES + [(1, 25), (5, 21)])
+        loaded.load(tmp_path / "landmarks.bin", changed)
+        assert loaded.stats()["created_since_build"] == 2
+        assert loaded.is_stale and not loaded.can_guide_search()
+
+        # Without the graph or the fingerprint the table can't be checked
+        loaded.load(tmp_path / "landmarks.bin")
+        assert loaded.is_stale and not loaded.can_guide_search()
+        (header, distances) = (tmp_path / "landmarks.bin").read_bytes().split(b"\n", 1)
+        header = json.loads(header)
+        del header["fingerprint"]
+        (tmp_path / "landmarks.bin").write_bytes(json.dumps(header).encode("utf-8") + b"\n" + distances)
+        loaded.load(tmp_path / "landmarks.bin", graph)
+        assert loaded.is_stale and not loaded.can_guide_search()
+
+    def test_load_changed_friendships(self, tmp_path):
+        """
+        Test that a table built for other friendships is stale even with the same number of them
+        """
+        graph = GraphIndex()
+        graph.load([(1, 2), (2, 3), (4, 5)])
+        landmarks = LandmarkIndex()
+        landmarks.build(graph, 2)
+        landmarks.save(tmp_path / "landmarks.bin")
+        assert landmarks.bounds(3, 5) == (None, None, True)
+
+        changed = GraphIndex()
+        changed.load([(2, 1), (4, 3), (4, 5)])
+        assert LandmarkIndex.fingerprint(changed.edges()) != LandmarkIndex.fingerprint(graph.edges())
+        assert LandmarkIndex.fingerprint([(2, 1), (3, 2), (5, 4)]) == LandmarkIndex.fingerprint(graph.edges())
+        loaded = LandmarkIndex()
+        loaded.load(tmp_path / "landmarks.bin", changed)
+        assert loaded.is_stale and not loaded.can_guide_search()
+        assert loaded.stats()["created_since_build"] == 0 and loaded.stats()["deleted_since_build"] == 0
+        assert loaded.bounds(3, 5) == (1, None, False)
+
+    def test_distance_api(self, tmp_path):
+        """
+        Test the distance estimation endpoint
+        """
+        response = self.client.get("/v1/friendship/1/2/distance")
+        assert response.status_code == 503
+        assert response.json() == {"detail": LANDMARKS_NOT_LOADED}
+
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        for i in range(1, 6):
+            create_friendship(self.client, i, i + 1)
+        build_landmarks(2, tmp_path / "landmarks.bin")
+        landmark_index.load(tmp_path / "landmarks.bin", graph_index)
+
+        response = self.client.get("/v1/friendship/1/6/distance")
+        assert response.status_code == 200
+        estimate = response.json()
+        assert estimate["lower_bound"] == 5 and estimate["upper_bound"] == 5
+        assert estimate["disconnected"] is False and estimate["stale"] is False
+
+        response = self.client.get("/v1/friendship/2/5/connection?mode=landmark")
+        assert response.json() == {"path": [2, 3, 4, 5], "complete": True, "limit": None}
+
+        # Friendship changes make the table stale
+        create_friendship(self.client, 1, 6)
+        response = self.client.get("/v1/friendship/1/6/distance")
+        estimate = response.json()
+        assert estimate["stale"] is True and estimate["created_since_build"] == 1
+        assert estimate["lower_bound"] == 1 and estimate["upper_bound"] is None
+        assert estimate["disconnected"] is False
+
+        response = self.client.get("/v1/friendship/1/6/connection?mode=landmark")
+        assert response.json() == {"path": [1, 6], "complete": True, "limit": None}
+        landmark_index.reset()
@@ -0,0 +1,129 @@
+"""
+Tests for the connection cache
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.controllers.cache import LRUCache
+from app.controllers.connection_cache import ConnectionCache, connection_cache
+from app.controllers.db_types import ConnectionLimitEnum
+from app.controllers.friendship import Friendship
+from app.controllers.graph_components import component_index
+from app.controllers.graph_search import SearchResult
+from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE
+from tests.utils import create_profiles, create_friendship
+
+
+class TestConnectionCache:
+    """
+    Tests for the connection cache
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_lru_cache(self):
+        """
+        Test the LRU eviction and the time to live
+        """
+        cache = LRUCache(2, 60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        stats = cache.stats()
+        assert stats["evictions"] == 1 and stats["hits"] == 3 and stats["misses"] == 1
+
+        cache = LRUCache(2, 0)
+        cache.set("a", 1)
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_connection_cache_invalidation(self):
+        """
+        Test the cache keys and the invalidation by friendship changes
+        """
+        cache = ConnectionCache(10, 60)
+        cache.put(1, 4, SearchResult(path=[1, 2, 3, 4]))
+        cache.put(5, 1, SearchResult(path=[5, 1]))
+        cache.put(1, 9, SearchResult())
+        cache.put(1, 8, SearchResult(complete=False, limit=ConnectionLimitEnum.MAX_DEPTH))
+        assert cache.get(1, 4).path == [1, 2, 3, 4] and cache.get(4, 1) is None
+        assert cache.get(1, 4, max_depth=2) is None
+        assert cache.get(5, 1).path == [5, 1] and cache.get(1, 5) is None
+        assert not cache.get(1, 9).path and cache.get(1, 8) is None
+
+        # Deleted friendships only drop the connections passing through them
+        cache.on_deleted(3, 2)
+        assert cache.get(1, 4) is None
+        assert cache.get(5, 1) is not None and cache.get(1, 9) is not None
+
+        # New friendships invalidate everything
+        cache.on_created()
+        assert cache.get(5, 1) is None and cache.get(1, 9) is None
+        assert cache.stats()["invalidations"] == 3
+
+    @pytest.mark.asyncio
+    async def test_changes_during_search(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        Test that the results of the searches racing with friendship changes are not cached
+        """
+        cache = ConnectionCache(10, 60)
+        snapshot = cache.snapshot()
+        cache.on_deleted(2, 3)
+        cache.put(1, 4, SearchResult(path=[1, 2, 3, 4]), snapshot)
+        assert cache.get(1, 4) is None
+        snapshot = cache.snapshot()
+        cache.on_created()
+        cache.put(1, 4, SearchResult(), snapshot)
+        assert cache.get(1, 4) is None
+        cache.put(1, 4, SearchResult(), cache.snapshot())
+        assert cache.get(1, 4) is not None
+
+        async def racing_search(_db, profile_id, friend_id, _mode, _limits) -> SearchResult:
+            connection_cache.on_deleted(102, 103)
+            return SearchResult(path=[profile_id, 102, 103, friend_id])
+
+        monkeypatch.setattr(Friendship, "run_search", staticmethod(racing_search))
+        monkeypatch.setattr(component_index, "are_disconnected", lambda *_: False)
+        result = await Friendship.search_connection(None, 101, 104)
+        assert result.path == [101, 102, 103, 104]
+        assert connection_cache.get(101, 104) is None
+
+    def test_connection_cache_api(self):
+        """
+        Test the connection cache through the connection endpoint
+        """
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        create_friendship(self.client, 1, 2)
+        create_friendship(self.client, 2, 3)
+        initial = self.client.get("/v1/friendship/cache/stats").json()
+
+        for _ in range(3):
+            response = self.client.get("/v1/friendship/1/3/connection")
+            assert response.json()["path"] == [1, 2, 3]
+        # Each direction is searched and cached on its own
+        for _ in range(2):
+            response = self.client.get("/v1/friendship/3/1/connection")
+            assert response.json()["path"] == [3, 2, 1]
+        stats = self.client.get("/v1/friendship/cache/stats").json()
+        assert stats["misses"] - initial["misses"] == 2
+        assert stats["hits"] - initial["hits"] == 3
+
+        # The connection changes after a new friendship
+        create_friendship(self.client, 1, 3)
+        response = self.client.get("/v1/friendship/3/1/connection")
+        assert response.json()["path"] == [3, 1]
+
+        # And after deleting it
+        response = self.client.delete("/v1/friendship/1/3/delete")
+        assert response.status_code == 200
+        response = self.client.get("/v1/friendship/3/1/connection")
+        assert response.json()["path"] == [3, 2, 1]
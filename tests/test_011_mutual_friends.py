@@ -0,0 +1,99 @@
+"""
+Tests for the mutual friends endpoints
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.controllers.friendship import Friendship
+from app.controllers.graph_index import GraphIndex, graph_index
+from app.controllers.profile import Profile
+from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE
+from tests.utils import create_profiles, create_friendship
+
+# Profile 1 is friend of 2 to 7, profile 8 is friend of 4 to 9, profile 9 is friend of 2
+FRIENDSHIPS = [(1, i) for i in range(2, 8)] + [(i, 8) for i in range(4, 8)] + [(8, 9), (2, 9)]
+
+
+class TestMutualFriends:
+    """
+    Tests for the mutual friends endpoints
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_intersect_sorted(self):
+        """
+        Test the intersection of sorted friend lists
+        """
+        assert GraphIndex.intersect_sorted([1, 3, 5, 7], [2, 3, 4, 7, 9]) == [3, 7]
+        assert not GraphIndex.intersect_sorted([], [1, 2])
+        index = GraphIndex()
+        index.load([(1, 2), (1, 3), (4, 2), (4, 3), (4, 5)])
+        assert index.get_mutual_friends(1, 4) == [2, 3]
+
+    def test_mutual_friends(self):
+        """
+        Test the mutual friends of two profiles with pagination
+        """
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        for (profile_id, friend_id) in FRIENDSHIPS:
+            create_friendship(self.client, profile_id, friend_id)
+
+        response = self.client.get("/v1/profile/1/mutual/8?limit=3")
+        assert response.status_code == 200
+        mutual = response.json()
+        assert mutual["total"] == 4
+        assert [profile["id"] for profile in mutual["profiles"]] == [4, 5, 6]
+        assert mutual["previous_url"] is None
+        response = self.client.get(mutual["next_url"])
+        mutual = response.json()
+        assert [profile["id"] for profile in mutual["profiles"]] == [7]
+        assert mutual["next_url"] is None
+
+        response = self.client.get("/v1/profile/8/mutual/1?limit=10")
+        assert [profile["id"] for profile in response.json()["profiles"]] == [4, 5, 6, 7]
+        response = self.client.get("/v1/profile/3/mutual/8")
+        assert response.json()["total"] == 0
+
+    def test_mutual_friends_without_index(self):
+        """
+        Test the mutual friends resolved by the database
+        """
+        graph_index.reset()
+        try:
+            response = self.client.get("/v1/profile/1/mutual/8?skip=2&limit=3")
+            mutual = response.json()
+            assert mutual["total"] == 4
+            assert [profile["id"] for profile in mutual["profiles"]] == [6, 7]
+
+            response = self.client.get("/v1/profile/1/mutual?profile_ids=8&profile_ids=9&profile_ids=3")
+            assert response.json()["counts"][:2] == [
+                {"profile_id": 8, "mutual_friends": 4}, {"profile_id": 9, "mutual_friends": 1}]
+        finally:
+            graph_index.load(Friendship.get_all_edges(self.db))
+
+    @pytest.mark.asyncio
+    async def test_mutual_counts(self, async_db: AsyncSession):
+        """
+        Test the mutual friends count against many profiles
+        """
+        response = self.client.get(
+            "/v1/profile/1/mutual?profile_ids=8&profile_ids=9&profile_ids=3&profile_ids=8&profile_ids=100")
+        assert response.status_code == 200
+        assert response.json() == {"profile_id": 1, "counts": [
+            {"profile_id": 8, "mutual_friends": 4},
+            {"profile_id": 9, "mutual_friends": 1},
+            {"profile_id": 3, "mutual_friends": 0},
+            {"profile_id": 100, "mutual_friends": 0},
+        ]}
+        assert await Profile.query_mutual_counts(async_db, 1, [8, 9, 3, 100]) == {8: 4, 9: 1}
+
+        response = self.client.get("/v1/profile/1/mutual")
+        assert response.status_code == 422
@@ -0,0 +1,87 @@
+"""
+Tests for the friend recommendations
+"""
+from dataclasses import FrozenInstanceError
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.constants import PROFILE_NOT_FOUND, RECOMMENDATIONS_NOT_READY
+from app.controllers.graph_index import GraphIndex
+from app.controllers.profile import Profile
+from app.controllers.recommendations import RecommendationIndex, recommendation_index
+from tests.constants import PROFILE_DATA, PROFILES_FRIENDSHIPS_TO_CREATE
+from tests.utils import assert_data_not_found, create_profiles, create_friendship
+
+# Profile 1 is friend of 2, 3 and 4; profile 5 is friend of 2, 3 and 4; profile 6 of 2 and 3;
+# profile 7 of 4
+FRIENDSHIPS = [(1, 2), (1, 3), (1, 4), (5, 2), (5, 3), (5, 4), (6, 2), (6, 3), (7, 4)]
+
+
+class TestRecommendations:
+    """
+    Tests for the friend recommendations
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_build_recommendations(self):
+        """
+        Test the ranking of the second-degree profiles
+        """
+        graph = GraphIndex()
+        graph.load(FRIENDSHIPS)
+        recommendations = RecommendationIndex()
+        assert not recommendations.is_ready
+        recommendations.build(graph, [], 2)
+        assert recommendations.is_ready
+        assert recommendations.get(1) == [(5, 3), (6, 2)]
+        assert recommendations.get(7) == [(1, 1), (5, 1)]
+        assert recommendations.get(2) == [(3, 3), (4, 2)]
+        assert not recommendations.get(100)
+
+        # A rebuild publishes a new snapshot and leaves the one being read untouched
+        snapshot = recommendations.snapshot
+        recommendations.build(graph, [5], 3)
+        assert recommendations.get(1) == [(6, 2), (7, 1)]
+        assert recommendations.snapshot is not snapshot
+        assert snapshot.get(1) == [(5, 3), (6, 2)]
+        with pytest.raises(FrozenInstanceError):
+            snapshot.offsets = recommendations.snapshot.offsets
+
+    def test_recommendations_api(self):
+        """
+        Test the recommendations endpoint
+        """
+        response = self.client.get("/v1/profile/1/recommendations")
+        assert_data_not_found(response, PROFILE_NOT_FOUND)
+
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        for (profile_id, friend_id) in FRIENDSHIPS:
+            create_friendship(self.client, profile_id, friend_id)
+        response = self.client.put(
+            "/v1/profile/6/update", json={**PROFILE_DATA, "available": False})
+        assert response.status_code == 200
+
+        recommendation_index.reset()
+        response = self.client.get("/v1/profile/1/recommendations")
+        assert response.status_code == 503
+        assert response.json() == {"detail": RECOMMENDATIONS_NOT_READY}
+
+        Profile.build_recommendations(self.db)
+        response = self.client.get("/v1/profile/1/recommendations")
+        assert response.status_code == 200
+        recommendations = response.json()
+        assert recommendations["profile_id"] == 1
+        assert [(profile["id"], profile["mutual_friends"])
+                for profile in recommendations["recommendations"]] == [(5, 3), (7, 1)]
+
+        # New friends are skipped until the next build
+        create_friendship(self.client, 1, 5)
+        response = self.client.get("/v1/profile/1/recommendations?limit=1")
+        assert [profile["id"] for profile in response.json()["recommendations"]] == [7]
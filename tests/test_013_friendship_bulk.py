@@ -0,0 +1,103 @@
+"""
+Tests for the bulk friendship create and delete
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.sql import func
+from sqlalchemy.orm import Session
+from app.constants import PROFILE_NOT_FOUND, FRIEND_NOT_FOUND, FRIENDSHIP_NOT_FOUND, FRIENDSHIP_SAME_PROFILE
+from app.controllers.graph_index import graph_index
+from app.db.models import friendship as FriendshipTable
+from tests.constants import PROFILES_FRIENDSHIPS_TO_CREATE, NON_VALID_PROFILE_ID
+from tests.utils import create_profiles, create_friendship
+
+
+def outcomes(response) -> list[tuple[int, int, str, str | None]]:
+    """
+    Get the (profile_id, friend_id, status, detail) outcomes of a bulk response
+    """
+    return [(result["profile_id"], result["friend_id"], result["status"], result["detail"])
+            for result in response.json()["results"]]
+
+
+class TestFriendshipBulk:
+    """
+    Tests for the bulk friendship create and delete
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def count_friendships(self) -> int:
+        """
+        Count the friendship rows
+        """
+        return self.db.query(func.count()).select_from(FriendshipTable).scalar()  # pylint: disable=not-callable
+
+    def test_bulk_create(self):
+        """
+        Test the bulk create with valid and invalid pairs
+        """
+        create_profiles(self.client, self.db, PROFILES_FRIENDSHIPS_TO_CREATE)
+        create_friendship(self.client, 1, 2)
+
+        pairs = [(1, 2), (1, 3), (3, 4), (4, 4), (NON_VALID_PROFILE_ID, 1), (1, NON_VALID_PROFILE_ID), (1, 3)]
+        response = self.client.post(
+            "/v1/friendship/bulk",
+            json={"pairs": [{"profile_id": a, "friend_id": b} for (a, b) in pairs]})
+        assert response.status_code == 200
+        assert response.json()["succeeded"] == 4 and response.json()["failed"] == 3
+        assert outcomes(response) == [
+            (1, 2, "existing", None),
+            (1, 3, "created", None),
+            (3, 4, "created", None),
+            (4, 4, "failed", FRIENDSHIP_SAME_PROFILE),
+            (NON_VALID_PROFILE_ID, 1, "failed", PROFILE_NOT_FOUND),
+            (1, NON_VALID_PROFILE_ID, "failed", FRIEND_NOT_FOUND),
+            (1, 3, "created", None),
+        ]
+        assert self.count_friendships() == 3
+        assert graph_index.get_friends(3) == [1, 4]
+
+        response = self.client.get("/v1/friendship/2/4/connection")
+        assert response.json()["path"] == [2, 1, 3, 4]
+
+    def test_bulk_create_many(self):
+        """
+        Test the bulk create with many pairs
+        """
+        pairs = [{"profile_id": i, "friend_id": j}
+                 for i in range(5, PROFILES_FRIENDSHIPS_TO_CREATE)
+                 for j in range(i + 1, PROFILES_FRIENDSHIPS_TO_CREATE + 1)]
+        response = self.client.post("/v1/friendship/bulk", json={"pairs": pairs})
+        assert response.json()["succeeded"] == len(pairs)
+        assert self.count_friendships() == 3 + len(pairs)
+
+        response = self.client.post("/v1/friendship/bulk", json={"pairs": []})
+        assert response.status_code == 422
+
+    def test_bulk_delete(self):
+        """
+        Test the bulk delete keeping the relationships stored in the opposite direction
+        """
+        create_friendship(self.client, 3, 1)
+        pairs = [(1, 2), (1, 3), (2, 1), (5, 6)]
+        response = self.client.post(
+            "/v1/friendship/bulk/delete",
+            json={"pairs": [{"profile_id": a, "friend_id": b} for (a, b) in pairs]})
+        assert response.status_code == 200
+        assert outcomes(response) == [
+            (1, 2, "deleted", None),
+            (1, 3, "deleted", None),
+            (2, 1, "failed", FRIENDSHIP_NOT_FOUND),
+            (5, 6, "deleted", None),
+        ]
+        assert not graph_index.has_edge(1, 2) and not graph_index.has_edge(5, 6)
+        assert graph_index.has_edge(1, 3)
+        response = self.client.get("/v1/friendship/2/4/connection")
+        assert response.json()["path"] == []
@@ -0,0 +1,69 @@
+"""
+Tests for the bulk profile ingest
+"""
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.constants import INVALID_BULK_BODY
+from app.db.models import Profile
+from tests.constants import PROFILE_DATA
+from tests.utils import assert_profile_match
+
+
+class TestProfileBulk:
+    """
+    Tests for the bulk profile ingest
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_bulk_create_json(self):
+        """
+        Test the bulk ingest of a JSON array with invalid records
+        """
+        records = [PROFILE_DATA, {**PROFILE_DATA, "first_name": None}, {**PROFILE_DATA, "city": "Austin"}, 5]
+        response = self.client.post("/v1/profile/bulk", json=records)
+        assert response.status_code == 200
+        bulk = response.json()
+        assert bulk["succeeded"] == 2 and bulk["failed"] == 2
+        assert [result["status"] for result in bulk["results"]] == ["created", "failed", "created", "failed"]
+        assert [result["id"] for result in bulk["results"]] == [1, None, 2, None]
+        assert bulk["results"][1]["errors"] == ["first_name: Input should be a valid string"]
+        assert bulk["results"][0]["created_at"] is not None
+
+        response = self.client.get("/v1/profile/2/get")
+        assert_profile_match(response.json(), {**PROFILE_DATA, "city": "Austin"})
+
+    def test_bulk_create_ndjson(self):
+        """
+        Test the bulk ingest of a NDJSON stream in several batches
+        """
+        lines = [json.dumps({**PROFILE_DATA, "zipcode": str(i)}) for i in range(2500)]
+        lines.insert(3, "{not json")
+        response = self.client.post(
+            "/v1/profile/bulk", content="\n".join(lines) + "\n\n",
+            headers={"Content-Type": "application/x-ndjson"})
+        assert response.status_code == 200
+        bulk = response.json()
+        assert bulk["succeeded"] == 2500 and bulk["failed"] == 1
+        assert bulk["results"][3]["status"] == "failed"
+        assert [result["index"] for result in bulk["results"]] == list(range(2501))
+        assert self.db.query(Profile).count() == 2502
+
+        profile = self.db.query(Profile).filter(Profile.id == bulk["results"][2000]["id"]).first()
+        assert profile.zipcode == "1999"
+
+    def test_bulk_create_invalid_body(self):
+        """
+        Test the bulk ingest with a body that is not a JSON array
+        """
+        response = self.client.post("/v1/profile/bulk", json=PROFILE_DATA)
+        assert response.status_code == 400
+        assert response.json() == {"detail": INVALID_BULK_BODY}
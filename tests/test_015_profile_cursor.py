@@ -0,0 +1,93 @@
+"""
+Tests for the cursor pagination of the profiles
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.constants import INVALID_CURSOR
+from app.controllers.db_types import OrderEnum, ProfileOrderFieldEnum
+from tests.constants import PROFILE_DATA
+
+FIRST_NAMES = ["Ann", "Bob", "Ann", "Carl", "Bob"]
+CITIES = ["Austin", None, "Boston", "Austin", None, "Chicago"]
+TOTAL_PROFILES = 23
+
+
+class TestProfileCursor:
+    """
+    Tests for the cursor pagination of the profiles
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def walk(self, url: str, key: str, total: int = TOTAL_PROFILES) -> list[int]:
+        """
+        Follow the next or previous urls from a page collecting the profile ids
+        """
+        ids = []
+        while url is not None:
+            response = self.client.get(url)
+            assert response.status_code == 200
+            page = response.json()
+            assert page["total"] == total
+            page_ids = [profile["id"] for profile in page["profiles"]]
+            ids.extend(page_ids if key == "next_url" else page_ids[::-1])
+            url = page[key]
+        return ids
+
+    def test_cursor_pagination(self):
+        """
+        Test that the cursor pages match the offset order in both directions
+        """
+        records = [{**PROFILE_DATA, "first_name": FIRST_NAMES[i % len(FIRST_NAMES)],
+                    "city": CITIES[i % len(CITIES)]} for i in range(TOTAL_PROFILES)]
+        response = self.client.post("/v1/profile/bulk", json=records)
+        assert response.json()["succeeded"] == TOTAL_PROFILES
+
+        for field in ProfileOrderFieldEnum:
+            for order in OrderEnum:
+                params = f"field={field.value}&order={order.value}"
+                response = self.client.get(f"/v1/profile/all?limit=200&{params}")
+                expected = [profile["id"] for profile in response.json()["profiles"]]
+
+                forward = self.walk(f"/v1/profile/all?limit=4&pagination=cursor&{params}", "next_url")
+                assert forward == expected
+
+                # Walk back from the last page
+                response = self.client.get(f"/v1/profile/all?limit=4&pagination=cursor&{params}")
+                page = response.json()
+                while page["next_url"] is not None:
+                    page = self.client.get(page["next_url"]).json()
+                assert page["previous_url"] is not None
+                backward = self.walk(page["previous_url"], "previous_url")
+                assert backward[::-1] + [profile["id"] for profile in page["profiles"]] == expected
+
+    def test_cursor_with_filter(self):
+        """
+        Test the cursor pagination keeping the search filter
+        """
+        response = self.client.get("/v1/profile/all?q=Ann&limit=3&pagination=cursor&field=first_name")
+        page = response.json()
+        assert page["total"] == 10
+        assert "q=Ann" in page["next_url"]
+        assert len(self.walk(page["next_url"], "next_url", 10)) == 7
+
+    def test_invalid_cursor(self):
+        """
+        Test the cursor validation
+        """
+        response = self.client.get("/v1/profile/all?cursor=not-a-cursor")
+        assert response.status_code == 400
+        assert response.json() == {"detail": INVALID_CURSOR}
+
+        # Cursors are bound to the sort
+        response = self.client.get("/v1/profile/all?limit=4&pagination=cursor&field=city")
+        next_url = response.json()["next_url"]
+        response = self.client.get(next_url.replace("field=city", "field=state"))
+        assert response.status_code == 400
@@ -0,0 +1,100 @@
+"""
+Tests for the total modes of the paginated profiles
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.controllers.friendship import Friendship
+from app.controllers.graph_index import graph_index
+from tests.constants import PROFILE_DATA
+from tests.utils import create_friendship
+
+TOTAL_PROFILES = 30
+
+
+class TestTotalModes:
+    """
+    Tests for the total modes of the paginated profiles
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_total_none(self):
+        """
+        Test the pagination without counting the total
+        """
+        response = self.client.post("/v1/profile/bulk", json=[PROFILE_DATA] * TOTAL_PROFILES)
+        assert response.json()["succeeded"] == TOTAL_PROFILES
+
+        url = "/v1/profile/all?limit=10&total=none"
+        pages = 0
+        while url is not None:
+            page = self.client.get(url).json()
+            assert page["total"] is None and page["total_mode"] == "none"
+            assert len(page["profiles"]) == 10
+            url = page["next_url"]
+            pages += 1
+        assert pages == 3
+
+        response = self.client.get("/v1/profile/all?limit=10&total=none&pagination=cursor")
+        page = response.json()
+        assert page["total"] is None and "total=none" in page["next_url"]
+
+        response = self.client.get("/v1/profile/all?limit=10&skip=100&total=none")
+        page = response.json()
+        assert not page["profiles"] and page["next_url"] is None
+
+    def test_total_estimate(self):
+        """
+        Test the total estimated from the planner statistics
+        """
+        self.db.execute(text("ANALYZE profiles"))
+        self.db.commit()
+        response = self.client.get("/v1/profile/all?limit=10&total=estimate")
+        page = response.json()
+        assert page["total_mode"] == "estimate"
+        assert page["total"] == TOTAL_PROFILES
+        assert "total=estimate" in page["next_url"]
+
+        # Repeated filters are expanded into IN lists before explaining the statement
+        response = self.client.get("/v1/profile/all?limit=10&total=estimate&city=A&city=B&state=TX")
+        assert response.status_code == 200
+        page = response.json()
+        assert page["total_mode"] == "estimate" and page["total"] >= 0
+
+        response = self.client.get("/v1/profile/all?limit=10&total=exact&q=Steph")
+        page = response.json()
+        assert page["total_mode"] == "exact" and page["total"] == TOTAL_PROFILES
+
+    def test_friends_total_modes(self):
+        """
+        Test the total modes of the friends of a profile
+        """
+        for i in range(2, 6):
+            create_friendship(self.client, 1, i)
+
+        response = self.client.get("/v1/profile/1/friends?limit=3&total=estimate")
+        page = response.json()
+        assert page["total"] == 4 and page["total_mode"] == "exact"
+
+        response = self.client.get("/v1/profile/1/friends?limit=3&total=none")
+        page = response.json()
+        assert page["total"] is None and page["total_mode"] == "none"
+        page = self.client.get(page["next_url"]).json()
+        assert [profile["id"] for profile in page["profiles"]] == [5]
+        assert page["next_url"] is None
+
+        graph_index.reset()
+        try:
+            response = self.client.get("/v1/profile/1/friends?limit=3&total=estimate")
+            page = response.json()
+            assert page["total_mode"] == "estimate" and page["total"] >= 0
+        finally:
+            graph_index.load(Friendship.get_all_edges(self.db))
@@ -0,0 +1,79 @@
+"""
+Tests for the profile name search
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.controllers.db_types import ProfileSearchModeEnum
+from app.controllers.profile import Profile
+from app.db.models import Profile as ProfileModel
+from tests.utils import create_named_profiles
+
+NAMES = [("Anna", "Smith"), ("Joanna", "Annable"), ("Ann", "Lee"), ("Bob", "Anders"), ("Carl", "Jones")]
+
+
+class TestProfileSearch:
+    """
+    Tests for the profile name search
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def search(self, query: str) -> list[int]:
+        """
+        Get the ids of the profiles found by a search
+        """
+        response = self.client.get(f"/v1/profile/all?{query}&limit=50")
+        assert response.status_code == 200
+        return [profile["id"] for profile in response.json()["profiles"]]
+
+    def test_prefix_tsquery(self):
+        """
+        Test the full-text query built from the search
+        """
+        assert Profile.prefix_tsquery("Ann") == "ann:*"
+        assert Profile.prefix_tsquery("ann  o'neil") == "ann:* & o:* & neil:*"
+        assert Profile.prefix_tsquery("&|!") is None
+
+    def test_search_modes(self):
+        """
+        Test the substring and the word prefix searches
+        """
+        create_named_profiles(self.client, NAMES)
+
+        mode = Profile.search_mode
+        try:
+            Profile.search_mode = ProfileSearchModeEnum.TRIGRAM
+            assert self.search("q=ann") == [1, 2, 3]
+            assert self.search("q=ann&rank=true") == [3, 1, 2]
+
+            Profile.search_mode = ProfileSearchModeEnum.FULLTEXT
+            assert self.search("q=ann") == [1, 2, 3]
+            assert self.search("q=anna") == [1, 2]
+            assert self.search("q=and") == [4]
+            assert self.search("q=ann lee") == [3]
+        finally:
+            Profile.search_mode = mode
+
+    def test_fulltext_index(self):
+        """
+        Test that the full-text search uses the names index
+        """
+        mode = Profile.search_mode
+        try:
+            Profile.search_mode = ProfileSearchModeEnum.FULLTEXT
+            query = self.db.query(ProfileModel.id).filter(Profile.search_condition("anna"))
+            compiled = query.statement.compile(dialect=self.db.get_bind().dialect)
+            self.db.execute(text("SET enable_seqscan = off"))
+            plan = "\n".join(self.db.connection().exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars())
+            self.db.execute(text("RESET enable_seqscan"))
+            assert "ix_profiles_name_search" in plan
+        finally:
+            Profile.search_mode = mode
@@ -0,0 +1,66 @@
+"""
+Tests for the profile name autocomplete
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.controllers.profile import Profile
+from app.db.models import Profile as ProfileModel
+from tests.constants import PROFILE_DATA
+from tests.utils import create_named_profiles
+
+NAMES = [("Anna", "Smith"), ("Bob", "Annable"), ("ann", "Lee"), ("Anders", "Anna"), ("Carl", "Jones"), ("An_d", "Li")]
+
+
+class TestProfileAutocomplete:
+    """
+    Tests for the profile name autocomplete
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def suggest(self, query: str) -> list[int]:
+        """
+        Get the ids of the suggested profiles
+        """
+        response = self.client.get(f"/v1/profile/autocomplete?{query}")
+        assert response.status_code == 200
+        return [suggestion["id"] for suggestion in response.json()]
+
+    def test_autocomplete(self):
+        """
+        Test the suggestions ordered by the matched name
+        """
+        create_named_profiles(self.client, NAMES)
+
+        response = self.client.get("/v1/profile/autocomplete?q=an&limit=2")
+        assert response.json() == [
+            {"id": 6, "first_name": "An_d", "last_name": "Li", "img": PROFILE_DATA["img"]},
+            {"id": 4, "first_name": "Anders", "last_name": "Anna", "img": PROFILE_DATA["img"]},
+        ]
+        assert self.suggest("q=ANN") == [3, 1, 4, 2]
+        assert self.suggest("q=an_") == [6]
+        assert self.suggest("q=a%") == []
+        assert self.suggest("q=jo") == [5]
+
+        response = self.client.get("/v1/profile/autocomplete")
+        assert response.status_code == 422
+
+    def test_autocomplete_index(self):
+        """
+        Test that the prefix search is a range scan of the name index
+        """
+        stmt = Profile.name_prefix_select(ProfileModel.first_name, "an", 10)
+        compiled = stmt.compile(dialect=self.db.get_bind().dialect)
+        self.db.execute(text("SET enable_seqscan = off"))
+        plan = "\n".join(self.db.connection().exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars())
+        self.db.execute(text("RESET enable_seqscan"))
+        assert "ix_profiles_first_name_prefix" in plan
+        assert "Index Cond" in plan and "Sort" not in plan
@@ -0,0 +1,105 @@
+"""
+Tests for the structured filters of the profile listing
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import asc, insert, text
+from sqlalchemy.orm import Session
+from app.controllers.profile import ProfileFilters
+from app.db.models import Profile as ProfileModel
+from tests.utils import PROFILE_DATA
+
+LOCATIONS = [
+    ("Austin", "TX", "73301", True),
+    ("Dallas", "TX", "75001", True),
+    ("Austin", "TX", "73301", False),
+    ("Miami", "FL", "33101", True),
+    ("Tampa", "FL", "33601", True),
+    ("Denver", "CO", "80201", True),
+]
+
+
+class TestProfileFilters:
+    """
+    Tests for the structured filters of the profile listing
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def create_profiles(self):
+        """
+        Create the profiles of the sample locations
+        """
+        response = self.client.post(
+            "/v1/profile/bulk",
+            json=[{**PROFILE_DATA, "city": city, "state": state, "zipcode": zipcode, "available": available}
+                  for (city, state, zipcode, available) in LOCATIONS])
+        assert response.json()["succeeded"] == len(LOCATIONS)
+
+    def filter_ids(self, query: str) -> list[int]:
+        """
+        Get the ids of the profiles of a filtered listing
+        """
+        response = self.client.get(f"/v1/profile/all?{query}&limit=50")
+        assert response.status_code == 200
+        return [profile["id"] for profile in response.json()["profiles"]]
+
+    def test_filters(self):
+        """
+        Test the single value, multiple values and availability filters
+        """
+        self.create_profiles()
+
+        assert self.filter_ids("state=TX") == [1, 2, 3]
+        assert self.filter_ids("city=Austin") == [1, 3]
+        assert self.filter_ids("city=Austin&available=true") == [1]
+        assert self.filter_ids("available=false") == [3]
+        assert self.filter_ids("state=FL&state=CO") == [4, 5, 6]
+        assert self.filter_ids("zipcode=73301&zipcode=33101&available=true") == [1, 4]
+        assert self.filter_ids("state=TX&city=Miami") == []
+
+        response = self.client.get("/v1/profile/all?state=TX&state=FL&limit=2")
+        page = response.json()
+        assert page["total"] == 5
+        assert "state=TX&state=FL" in page["next_url"]
+
+    def test_filters_pagination(self):
+        """
+        Test that the filters are kept in the next and previous urls
+        """
+        for query in ("state=TX&available=true&limit=1", "state=TX&available=true&limit=1&pagination=cursor"):
+            page = self.client.get(f"/v1/profile/all?{query}").json()
+            assert "state=TX&available=true" in page["next_url"]
+            ids = [profile["id"] for profile in page["profiles"]]
+            page = self.client.get(page["next_url"]).json()
+            ids.extend(profile["id"] for profile in page["profiles"])
+            assert ids == [1, 2]
+            assert page["next_url"] is None
+            assert "state=TX&available=true" in page["previous_url"]
+
+    def test_filter_indexes(self):
+        """
+        Test that the filtered listings are read from the composite indexes without sorting
+        """
+        rows = [{**PROFILE_DATA, "city": f"City {i % 200}", "state": f"S{i % 50}", "zipcode": f"{i % 500:05d}",
+                 "available": i % 10 != 0} for i in range(20000)]
+        self.db.execute(insert(ProfileModel), rows)
+        self.db.execute(text("ANALYZE profiles"))
+        self.db.commit()
+
+        for (filters, index) in ((ProfileFilters(state=["S1"]), "ix_profiles_state_created_at"),
+                                 (ProfileFilters(city=["City 7"]), "ix_profiles_city_created_at"),
+                                 (ProfileFilters(zipcode=["00042"]), "ix_profiles_zipcode_created_at"),
+                                 (ProfileFilters(available=True), "ix_profiles_available_created_at")):
+            query = (self.db.query(ProfileModel).filter(*filters.conditions())
+                     .order_by(asc(ProfileModel.created_at), asc(ProfileModel.id)).limit(11))
+            compiled = query.statement.compile(dialect=self.db.get_bind().dialect)
+            plan = "\n".join(self.db.connection().exec_driver_sql(f"EXPLAIN {compiled}", compiled.params).scalars())
+            assert index in plan
+            assert "Sort" not in plan
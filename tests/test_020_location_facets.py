@@ -0,0 +1,106 @@
+"""
+Tests for the profile location facets
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.db.models import Profile as ProfileModel, profile_location_counts
+from tests.constants import PROFILE_DATA
+
+
+class TestLocationFacets:
+    """
+    Tests for the profile location facets
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def get_facets(self, query: str = "") -> dict:
+        """
+        Get the location facets
+        """
+        response = self.client.get(f"/v1/profile/facets/location?{query}")
+        assert response.status_code == 200
+        return response.json()
+
+    def assert_counts_match(self):
+        """
+        Assert that the location counts match the grouped profiles
+        """
+        grouped = self.db.execute(
+            select(ProfileModel.state, ProfileModel.city, ProfileModel.zipcode,
+                   func.count())  # pylint: disable=not-callable
+            .group_by(ProfileModel.state, ProfileModel.city, ProfileModel.zipcode)).all()
+        counts = self.db.execute(
+            select(profile_location_counts).where(profile_location_counts.c.profiles > 0)).all()
+        assert sorted(map(tuple, grouped), key=str) == sorted(map(tuple, counts), key=str)
+
+    def test_facets_maintenance(self):
+        """
+        Test that the profile writes keep the location counts up to date
+        """
+        assert self.get_facets() == {"total": 0, "states": []}
+
+        for (city, state, zipcode) in (("Austin", "TX", "73301"), ("Austin", "TX", "73344"),
+                                       ("Dallas", "TX", "75001")):
+            response = self.client.post("/v1/profile/create",
+                                        json={**PROFILE_DATA, "city": city, "state": state, "zipcode": zipcode})
+            assert response.status_code == 201
+        response = self.client.post(
+            "/v1/profile/bulk",
+            json=[{**PROFILE_DATA, "first_name": "Anna", "city": "Austin", "state": "TX", "zipcode": "73301"},
+                  {**PROFILE_DATA, "city": "Miami", "state": "FL", "zipcode": "33101"},
+                  {**PROFILE_DATA, "city": None, "state": None, "zipcode": None}])
+        assert response.json()["succeeded"] == 3
+        self.assert_counts_match()
+
+        facets = self.get_facets()
+        assert facets["total"] == 6
+        assert [(state["state"], state["profiles"]) for state in facets["states"]] == [
+            ("FL", 1), ("TX", 4), (None, 1)]
+        texas = facets["states"][1]
+        assert [(city["city"], city["profiles"]) for city in texas["cities"]] == [("Austin", 3), ("Dallas", 1)]
+        assert texas["cities"][0]["zipcodes"] == [{"zipcode": "73301", "profiles": 2},
+                                                  {"zipcode": "73344", "profiles": 1}]
+
+        # Move a profile to another city, update it without moving it and delete another one
+        response = self.client.put("/v1/profile/2/update",
+                                   json={**PROFILE_DATA, "city": "Dallas", "state": "TX", "zipcode": "75001"})
+        assert response.status_code == 200
+        response = self.client.put("/v1/profile/2/update",
+                                   json={**PROFILE_DATA, "first_name": "Bob", "city": "Dallas", "state": "TX",
+                                         "zipcode": "75001"})
+        assert response.status_code == 200
+        response = self.client.delete("/v1/profile/5/delete")
+        assert response.status_code == 200
+        self.assert_counts_match()
+
+        facets = self.get_facets()
+        assert facets["total"] == 5
+        assert [(state["state"], state["profiles"]) for state in facets["states"]] == [("TX", 4), (None, 1)]
+
+    def test_facets_filters(self):
+        """
+        Test the facets of a state, of a city and of a name search
+        """
+        facets = self.get_facets("state=TX")
+        assert facets["total"] == 4
+        assert [state["state"] for state in facets["states"]] == ["TX"]
+
+        facets = self.get_facets("state=TX&city=Austin")
+        assert facets["total"] == 2
+        assert facets["states"][0]["cities"][0]["zipcodes"] == [{"zipcode": "73301", "profiles": 2}]
+
+        facets = self.get_facets("q=Anna")
+        assert facets["total"] == 1
+        assert facets["states"][0]["cities"][0]["zipcodes"] == [{"zipcode": "73301", "profiles": 1}]
+
+        response = self.client.get("/v1/profile/facets/location?q=an")
+        assert response.status_code == 422
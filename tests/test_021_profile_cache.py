@@ -0,0 +1,93 @@
+"""
+Tests for the profile cache
+"""
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.controllers.cache import LRUCache
+from app.controllers.profile_cache import MemoryProfileCacheBackend, ProfileCache, profile_cache
+from app.models.profile import ProfileResponse
+from tests.constants import PROFILE_DATA
+from tests.utils import create_profiles
+
+
+class TestProfileCache:
+    """
+    Tests for the profile cache
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_memory_bound(self):
+        """
+        Test the eviction by memory of the LRU cache
+        """
+        cache = LRUCache(None, 60, max_bytes=10, size_of=len)
+        cache.set("a", "1234")
+        cache.set("b", "1234")
+        assert cache.get("a") == "1234"
+        cache.set("c", "1234")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1234" and cache.get("c") == "1234"
+        cache.set("d", "12345678901")
+        assert cache.get("d") is None
+        stats = cache.stats()
+        assert stats["bytes"] == 8 and stats["max_bytes"] == 10 and stats["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidation_during_load(self):
+        """
+        Test that a load racing with an invalidation is not stored
+        """
+        cache = ProfileCache(MemoryProfileCacheBackend(1024 * 1024, 60))
+        now = datetime.now()
+        profile = ProfileResponse(id=1, created_at=now, updated_at=now, **PROFILE_DATA)
+
+        async def racing_load() -> ProfileResponse:
+            await cache.invalidate(1)
+            return profile
+
+        async def load() -> ProfileResponse:
+            return profile
+
+        async def load_missing() -> None:
+            return None
+
+        assert await cache.get_or_load(1, racing_load) == profile
+        assert await cache.backend.get(1) is None
+        assert await cache.get_or_load(1, load) == profile
+        assert await cache.get_or_load(1, load_missing) == profile
+        assert await cache.get_or_load(2, load_missing) is None
+        assert await cache.backend.get(2) is None
+
+    def test_read_through(self):
+        """
+        Test the cached reads and their invalidation by updates and deletions
+        """
+        create_profiles(self.client, self.db, 2)
+        stats = profile_cache.stats()
+
+        for _ in range(3):
+            response = self.client.get("/v1/profile/1/get")
+            assert response.status_code == 200
+        response = self.client.get("/v1/profile/cache/stats")
+        assert response.status_code == 200
+        cache_stats = response.json()
+        assert cache_stats["hits"] - stats["hits"] == 2 and cache_stats["misses"] - stats["misses"] == 1
+        assert cache_stats["size"] == 1 and cache_stats["bytes"] > 0
+
+        response = self.client.put("/v1/profile/1/update", json={**PROFILE_DATA, "first_name": "Anna"})
+        assert response.status_code == 200
+        assert self.client.get("/v1/profile/1/get").json()["first_name"] == "Anna"
+
+        assert self.client.get("/v1/profile/2/get").status_code == 200
+        assert self.client.delete("/v1/profile/2/delete").status_code == 200
+        assert self.client.get("/v1/profile/2/get").status_code == 404
+        assert self.client.get("/v1/profile/cache/stats").json()["version"] - stats["version"] == 2
@@ -0,0 +1,60 @@
+"""
+Tests for the database connection pool metrics
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.orm import Session
+from app.db.config import DATABASE_URL
+from app.db.pool import MeteredQueuePool
+
+
+class TestDatabasePool:
+    """
+    Tests for the database connection pool metrics
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_pool_metrics(self):
+        """
+        Test the checkouts, overflow and timeouts of an exhausted pool
+        """
+        pool_engine = create_engine(DATABASE_URL, poolclass=MeteredQueuePool, pool_size=1, max_overflow=1,
+                                    pool_timeout=0.1, connect_args={"options": "-c statement_timeout=50"})
+        try:
+            with pool_engine.connect() as first, pool_engine.connect() as second:
+                stats = pool_engine.pool.metrics.stats(pool_engine.pool)
+                assert stats["checked_out"] == 2 and stats["overflow"] == 1
+                with pytest.raises(exc.TimeoutError):
+                    pool_engine.connect()
+                assert first.scalar(text("SHOW statement_timeout")) == "50ms"
+                with pytest.raises(exc.OperationalError):
+                    second.execute(text("SELECT pg_sleep(1)"))
+
+            metrics = pool_engine.pool.metrics
+            pool_engine.dispose()
+            assert pool_engine.pool.metrics is metrics
+            stats = metrics.stats(pool_engine.pool)
+            assert stats["checkouts"] == 2 and stats["timeouts"] == 1 and stats["connections_opened"] == 2
+            assert stats["checked_out"] == 0 and stats["wait_ms_max"] >= 100
+        finally:
+            pool_engine.dispose()
+
+    def test_database_health(self):
+        """
+        Test the database pools health endpoint
+        """
+        assert self.client.get("/health").status_code == 200
+        response = self.client.get("/health/db")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ok"
+        assert data["requests"]["checkouts"] > 0 and data["requests"]["checked_out"] == 0
+        assert data["background"]["size"] >= 1
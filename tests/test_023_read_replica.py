@@ -0,0 +1,94 @@
+"""
+Tests for the read replica routing
+"""
+from datetime import datetime
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from app.constants import MIN_LSN_HEADER, WRITE_LSN_HEADER
+from app.controllers.profile_cache import MemoryProfileCacheBackend, ProfileCache
+from app.db import config as db_config
+from app.models.profile import ProfileResponse
+from tests.constants import PROFILE_DATA
+
+
+class TestReadReplica:
+    """
+    Tests for the read replica routing
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_without_replica(self):
+        """
+        Test that the reads are served by the primary when there is no replica
+        """
+        response = self.client.post("/v1/profile/create", json=PROFILE_DATA)
+        assert response.status_code == 201
+        assert WRITE_LSN_HEADER not in response.headers
+
+        response = self.client.get("/v1/profile/all", headers={MIN_LSN_HEADER: "0/0"})
+        assert response.status_code == 200 and response.json()["total"] == 1
+        assert self.client.get("/v1/profile/all", headers={MIN_LSN_HEADER: "invalid"}).status_code == 422
+
+    def test_read_your_writes(self, monkeypatch: pytest.MonkeyPatch):
+        """
+        Test the reads routed to the replica unless it did not replay the requested write
+        """
+        # The primary database plays the replica, recording the statements sent to it
+        replica_engine = create_async_engine(db_config.ASYNC_DATABASE_URL, poolclass=NullPool)
+        statements = []
+        event.listen(replica_engine.sync_engine, "before_cursor_execute",
+                     lambda *args: statements.append(args[2]))
+        monkeypatch.setattr(db_config, "ReplicaSessionLocal",
+                            async_sessionmaker(bind=replica_engine, expire_on_commit=False))
+
+        response = self.client.post("/v1/profile/create", json=PROFILE_DATA)
+        assert response.status_code == 201
+        lsn = response.headers[WRITE_LSN_HEADER]
+
+        response = self.client.get("/v1/profile/all", headers={MIN_LSN_HEADER: lsn})
+        assert response.status_code == 200 and response.json()["total"] == 2
+        assert len(statements) > 1
+
+        statements.clear()
+        response = self.client.get("/v1/profile/all", headers={MIN_LSN_HEADER: "FFFFFFFF/FFFFFFFF"})
+        assert response.status_code == 200 and response.json()["total"] == 2
+        assert len(statements) == 1
+
+        statements.clear()
+        assert self.client.get("/v1/profile/1/friends").status_code == 200
+        assert statements
+        assert WRITE_LSN_HEADER not in self.client.get("/v1/profile/1/friends").headers
+
+    @pytest.mark.asyncio
+    async def test_cache_settle(self):
+        """
+        Test that the profiles invalidated in the settle seconds are not cached
+        """
+        cache = ProfileCache(MemoryProfileCacheBackend(1024 * 1024, 60), settle_seconds=60)
+        now = datetime.now()
+        profiles = {profile_id: ProfileResponse(id=profile_id, created_at=now, updated_at=now, **PROFILE_DATA)
+                    for profile_id in (1, 2)}
+
+        async def load_first() -> ProfileResponse:
+            return profiles[1]
+
+        async def load_second() -> ProfileResponse:
+            return profiles[2]
+
+        await cache.invalidate(1)
+        assert cache.is_settling(1) and not cache.is_settling(2)
+        assert await cache.get_or_load(1, load_first) == profiles[1]
+        assert await cache.backend.get(1) is None
+        assert await cache.get_or_load(2, load_second) == profiles[2]
+        assert await cache.backend.get(2) is not None
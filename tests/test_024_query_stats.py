@@ -0,0 +1,76 @@
+"""
+Tests for the SQL statements statistics of the requests
+"""
+import logging
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app import main
+from app.constants import DB_QUERIES_HEADER, DB_REPEATED_HEADER, DB_TIME_HEADER
+from app.db import query_stats
+from app.db.query_stats import QueryStats, statement_shape
+from tests.utils import create_friendship, create_profiles
+
+
+class TestQueryStats:
+    """
+    Tests for the SQL statements statistics of the requests
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient, monkeypatch: pytest.MonkeyPatch):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+        monkeypatch.setattr(main, "DEVELOPMENT", True)
+        # The logging configuration of the migrations disables the loggers created before it
+        monkeypatch.setattr(query_stats.logger, "disabled", False)
+
+    def test_statement_shape(self):
+        """
+        Test that the statements differing by the number of values have the same shape
+        """
+        assert statement_shape("SELECT * FROM profiles WHERE id IN ($1, $2, $3) LIMIT $4") == \
+            "SELECT * FROM profiles WHERE id IN (?) LIMIT ?"
+        assert statement_shape("SELECT * FROM profiles WHERE id IN (%(id_1_1)s, %(id_1_2)s)") == \
+            statement_shape("SELECT * FROM profiles WHERE id IN (%(id_1_1)s)")
+
+        stats = QueryStats({"method": "GET", "path": "/v1/profile/1/get"})
+        for _ in range(3):
+            stats.record("SELECT * FROM profiles WHERE id IN ($1, $2)", 0.001)
+        stats.record("SELECT 1", 0.001)
+        assert stats.queries == 4 and stats.route == "GET /v1/profile/1/get"
+        assert not stats.repeated()
+
+    def test_request_headers(self, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture):
+        """
+        Test the statements count, the database time and the slow statements log of a request
+        """
+        create_profiles(self.client, self.db, 5)
+        monkeypatch.setattr(query_stats, "SQL_SLOW_QUERY_MS", 0)
+        with caplog.at_level(logging.WARNING, logger=query_stats.__name__):
+            response = self.client.get("/v1/profile/all")
+        assert response.status_code == 200
+        assert int(response.headers[DB_QUERIES_HEADER]) >= 1
+        assert float(response.headers[DB_TIME_HEADER]) > 0
+        assert response.headers[DB_REPEATED_HEADER] == "0"
+        assert any("Slow query" in message and "GET /v1/profile/all" in message for message in caplog.messages)
+
+        response = self.client.get("/health")
+        assert response.headers[DB_QUERIES_HEADER] == "0"
+
+    def test_repeated_statements(self, monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture):
+        """
+        Test that a search running a query per level is flagged
+        """
+        for profile_id in range(1, 5):
+            create_friendship(self.client, profile_id, profile_id + 1)
+        monkeypatch.setattr(query_stats, "SQL_REPEATED_STATEMENT_MAX", 1)
+        with caplog.at_level(logging.WARNING, logger=query_stats.__name__):
+            response = self.client.get("/v1/friendship/1/5/connection", params={"mode": "bfs"})
+        assert response.status_code == 200 and response.json()["path"] == [1, 2, 3, 4, 5]
+        assert int(response.headers[DB_REPEATED_HEADER]) >= 1
+        assert any("Possible N+1 queries on GET /v1/friendship/{profile_id}/{friend_id}/connection" in message
+                   for message in caplog.messages)
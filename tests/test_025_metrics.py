@@ -0,0 +1,89 @@
+"""
+Tests for the Prometheus metrics
+"""
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+from sqlalchemy.orm import Session
+from app.controllers.profile import Profile
+from tests.utils import create_friendship, create_profiles
+
+
+def sample(name: str, **labels) -> float:
+    """
+    Get the value of a metric sample, zero when it was not recorded yet
+    """
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class TestMetrics:
+    """
+    Tests for the Prometheus metrics
+    """
+
+    @pytest.fixture(autouse=True)
+    def setup(self, db_session: Session, test_client: TestClient):
+        """
+        Setup the test
+        """
+        self.db = db_session  # pylint: disable=attribute-defined-outside-init
+        self.client = test_client  # pylint: disable=attribute-defined-outside-init
+
+    def test_request_metrics(self):
+        """
+        Test the latency histograms by route template and status
+        """
+        create_profiles(self.client, self.db, 3)
+        route = "/v1/profile/{profile_id}/get"
+        found = sample("http_request_duration_seconds_count", method="GET", route=route, status="200")
+        missing = sample("http_request_duration_seconds_count", method="GET", route=route, status="404")
+        unmatched = sample("http_request_duration_seconds_count", method="GET", route="unmatched", status="404")
+
+        assert self.client.get("/v1/profile/1/get").status_code == 200
+        assert self.client.get("/v1/profile/2/get").status_code == 200
+        assert self.client.get("/v1/profile/10/get").status_code == 404
+        assert self.client.get("/v1/unknown").status_code == 404
+
+        assert sample("http_request_duration_seconds_count", method="GET", route=route, status="200") - found == 2
+        assert sample("http_request_duration_seconds_count", method="GET", route=route, status="404") - missing == 1
+        assert sample("http_request_duration_seconds_count", method="GET", route="unmatched",
+                      status="404") - unmatched == 1
+        assert sample("http_requests_in_progress", method="GET") == 0
+
+    def test_domain_metrics(self):
+        """
+        Test the friendship, connection search and profile search counters
+        """
+        created = sample("friendships_created_total")
+        deleted = sample("friendships_deleted_total")
+        paths = sample("connection_path_length_count", mode="bfs")
+        two_hops = sample("connection_path_length_bucket", mode="bfs", le="2.0")
+        searches = sample("profile_searches_total", endpoint="listing", mode=Profile.search_mode.value)
+        suggestions = sample("profile_searches_total", endpoint="autocomplete", mode="prefix")
+
+        create_friendship(self.client, 1, 2)
+        create_friendship(self.client, 2, 3)
+        assert self.client.post("/v1/friendship/create", json={"profile_id": 1, "friend_id": 2}).status_code == 201
+        response = self.client.get("/v1/friendship/1/3/connection", params={"mode": "bfs"})
+        assert response.json()["path"] == [1, 2, 3]
+        assert self.client.delete("/v1/friendship/2/3/delete").status_code == 200
+        assert self.client.get("/v1/profile/all", params={"q": "john"}).status_code == 200
+        assert self.client.get("/v1/profile/autocomplete", params={"q": "jo"}).status_code == 200
+
+        assert sample("friendships_created_total") - created == 2
+        assert sample("friendships_deleted_total") - deleted == 1
+        assert sample("connection_path_length_count", mode="bfs") - paths == 1
+        assert sample("connection_path_length_bucket", mode="bfs", le="2.0") - two_hops == 1
+        assert sample("profile_searches_total", endpoint="listing", mode=Profile.search_mode.value) - searches == 1
+        assert sample("profile_searches_total", endpoint="autocomplete", mode="prefix") - suggestions == 1
+
+    def test_metrics_endpoint(self):
+        """
+        Test the metrics exposition with the database pool gauges
+        """
+        response = self.client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'db_pool_connections{pool="requests",state="checked_out"}' in response.text
+        assert sample("db_pool_checkouts_total", pool="requests") > 0
+        assert "connection_search_visited_profiles_bucket" in response.text
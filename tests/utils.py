@@ -65,3 +65,15 @@ def create_friendships(client: TestClient, db: Session, num_profiles: int):
     for i in range(1, num_profiles):
         for j in range(i+1, num_profiles+1):
             create_friendship(client, i, j)
+
+
+def create_named_profiles(client: TestClient, names: list[tuple[str, str]]):
+    """
+    Helper function to create profiles with the given (first name, last name) pairs
+    """
+    response = client.post(
+        "/v1/profile/bulk",
+        json=[{**PROFILE_DATA, "first_name": first_name, "last_name": last_name}
+              for (first_name, last_name) in names])
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == len(names)